@@ -0,0 +1,34 @@
+"""zone_measurements (zone_id, timestamp DESC) index
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_zone_measurements_zone_id_timestamp"
+
+
+def upgrade() -> None:
+    # 表由应用启动时的 create_all 创建（新建的表已包含该索引），这里只为已有的表补建索引
+    if not sa.inspect(op.get_bind()).has_table("zone_measurements"):
+        return
+    op.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} "
+        "ON zone_measurements (zone_id, timestamp DESC)"
+    )
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
@@ -0,0 +1,105 @@
+"""partition zone_measurements by month (PostgreSQL, optional)
+
+仅当 MEASUREMENT_PARTITIONING=true 且数据库为 PostgreSQL 时执行转换，否则为空操作。
+转换后主键变为 (id, timestamp)，id 仍由原序列生成；历史数据按月份写入对应分区，
+超出已建分区范围的数据落入默认分区，由调度器建新分区时迁出。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:30:00
+
+"""
+from datetime import timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.services.partition_service import (
+    DEFAULT_PARTITION,
+    ensure_measurement_partitions,
+    is_measurements_partitioned,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_indexes() -> None:
+    op.execute("CREATE INDEX ix_zone_measurements_id ON zone_measurements (id)")
+    op.execute(
+        "CREATE INDEX ix_zone_measurements_zone_id_timestamp "
+        "ON zone_measurements (zone_id, timestamp DESC)"
+    )
+
+
+def _rename_existing_table() -> None:
+    """将现有表改名为 zone_measurements_old，释放主键和索引名"""
+    op.execute("ALTER TABLE zone_measurements RENAME TO zone_measurements_old")
+    op.execute(
+        "ALTER TABLE zone_measurements_old "
+        "RENAME CONSTRAINT zone_measurements_pkey TO zone_measurements_old_pkey"
+    )
+    op.execute("DROP INDEX IF EXISTS ix_zone_measurements_id")
+    op.execute("DROP INDEX IF EXISTS ix_zone_measurements_zone_id_timestamp")
+
+
+def _copy_from_old_table() -> None:
+    op.execute(
+        "INSERT INTO zone_measurements (id, zone_id, ndvi, carbon_absorption, timestamp) "
+        "SELECT id, zone_id, ndvi, carbon_absorption, timestamp FROM zone_measurements_old"
+    )
+    op.execute("ALTER SEQUENCE zone_measurements_id_seq OWNED BY zone_measurements.id")
+    op.execute("DROP TABLE zone_measurements_old CASCADE")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not settings.measurement_partitioning or bind.dialect.name != "postgresql":
+        return
+    if not sa.inspect(bind).has_table("zone_measurements") or is_measurements_partitioned(bind):
+        return
+
+    earliest = bind.execute(sa.text("SELECT min(timestamp) FROM zone_measurements")).scalar()
+
+    _rename_existing_table()
+    op.execute("""
+        CREATE TABLE zone_measurements (
+            id INTEGER NOT NULL DEFAULT nextval('zone_measurements_id_seq'),
+            zone_id INTEGER NOT NULL REFERENCES carbon_zones (id),
+            ndvi DOUBLE PRECISION NOT NULL,
+            carbon_absorption DOUBLE PRECISION NOT NULL,
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT zone_measurements_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF zone_measurements DEFAULT")
+    # 先建好覆盖已有数据的月分区再复制，避免数据先落入默认分区再被迁出
+    ensure_measurement_partitions(bind, start=earliest.astimezone(timezone.utc).date() if earliest else None)
+    _copy_from_old_table()
+    _create_indexes()
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not is_measurements_partitioned(bind):
+        return
+
+    _rename_existing_table()
+    op.execute("""
+        CREATE TABLE zone_measurements (
+            id INTEGER NOT NULL DEFAULT nextval('zone_measurements_id_seq'),
+            zone_id INTEGER NOT NULL REFERENCES carbon_zones (id),
+            ndvi DOUBLE PRECISION NOT NULL,
+            carbon_absorption DOUBLE PRECISION NOT NULL,
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT zone_measurements_pkey PRIMARY KEY (id)
+        )
+    """)
+    _copy_from_old_table()
+    _create_indexes()
@@ -0,0 +1,31 @@
+"""carbon_prices (timestamp, id) index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_carbon_prices_timestamp_id"
+
+
+def upgrade() -> None:
+    # 表由应用启动时的 create_all 创建（新建的表已包含该索引），这里只为已有的表补建索引
+    if not sa.inspect(op.get_bind()).has_table("carbon_prices"):
+        return
+    op.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON carbon_prices (timestamp, id)")
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
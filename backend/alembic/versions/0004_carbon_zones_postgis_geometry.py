@@ -0,0 +1,78 @@
+"""carbon_zones PostGIS geometry column (PostgreSQL with PostGIS, optional)
+
+仅当数据库为 PostgreSQL 且服务器安装了 PostGIS 扩展时执行，否则为空操作（应用使用进程内 STRtree 索引）。
+geom 列由触发器根据 coordinates（JSON 坐标数组）维护，应用代码和 ORM 模型不直接写入。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_carbon_zones_geom"
+TRIGGER_NAME = "trg_carbon_zones_geom"
+FUNCTION_NAME = "carbon_zones_sync_geom"
+
+
+def _postgis_installable(bind) -> bool:
+    if bind.dialect.name != "postgresql":
+        return False
+    return bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'postgis')"
+    )).scalar()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _postgis_installable(bind) or not sa.inspect(bind).has_table("carbon_zones"):
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+    op.execute("ALTER TABLE carbon_zones ADD COLUMN IF NOT EXISTS geom geometry(Polygon, 4326)")
+    op.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON carbon_zones USING GIST (geom)")
+
+    # 坐标为 [{"lat": ..., "lng": ...}, ...]，按顺序连成闭合环；无法构成多边形时 geom 为空
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION {FUNCTION_NAME}() RETURNS trigger AS $$
+        DECLARE
+            points geometry[];
+        BEGIN
+            SELECT array_agg(ST_MakePoint((point->>'lng')::float8, (point->>'lat')::float8) ORDER BY position)
+              INTO points
+              FROM json_array_elements(NEW.coordinates::json) WITH ORDINALITY AS t(point, position);
+            NEW.geom := ST_SetSRID(ST_MakePolygon(ST_MakeLine(points || points[1])), 4326);
+            RETURN NEW;
+        EXCEPTION WHEN others THEN
+            NEW.geom := NULL;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f"DROP TRIGGER IF EXISTS {TRIGGER_NAME} ON carbon_zones")
+    op.execute(
+        f"CREATE TRIGGER {TRIGGER_NAME} BEFORE INSERT OR UPDATE OF coordinates ON carbon_zones "
+        f"FOR EACH ROW EXECUTE FUNCTION {FUNCTION_NAME}()"
+    )
+    # 为已有区域填充几何列
+    op.execute("UPDATE carbon_zones SET coordinates = coordinates")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    op.execute(f"DROP TRIGGER IF EXISTS {TRIGGER_NAME} ON carbon_zones")
+    op.execute(f"DROP FUNCTION IF EXISTS {FUNCTION_NAME}()")
+    op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+    op.execute("ALTER TABLE carbon_zones DROP COLUMN IF EXISTS geom")
@@ -0,0 +1,73 @@
+"""unique (zone_id, timestamp) on zone_measurements
+
+批量写入接口按 (zone_id, timestamp) upsert，需要唯一索引作为冲突目标。
+先删除重复数据（保留ID最大即最后写入的一条），并删除受影响区域的汇总统计和聚合，
+由应用启动时的 rebuild_missing_rollups 任务按当前数据重新建立（重建前读接口临时计算统计）；
+再将原 (zone_id, timestamp DESC) 索引替换为同名的唯一索引（分区表上同样适用，索引包含分区键）。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_zone_measurements_zone_id_timestamp"
+
+
+def _delete_duplicates(bind) -> list:
+    """删除重复的 (zone_id, timestamp)，返回受影响的区域ID"""
+    if bind.dialect.name == "postgresql":
+        return list(bind.execute(sa.text(
+            "DELETE FROM zone_measurements older USING zone_measurements newer "
+            "WHERE older.zone_id = newer.zone_id AND older.timestamp = newer.timestamp "
+            "AND older.id < newer.id "
+            "RETURNING older.zone_id"
+        )).scalars())
+    zone_ids = list(bind.execute(sa.text(
+        "SELECT DISTINCT zone_id FROM zone_measurements "
+        "GROUP BY zone_id, timestamp HAVING count(*) > 1"
+    )).scalars())
+    if zone_ids:
+        bind.execute(sa.text(
+            "DELETE FROM zone_measurements WHERE id NOT IN "
+            "(SELECT max(id) FROM zone_measurements GROUP BY zone_id, timestamp)"
+        ))
+    return zone_ids
+
+
+def upgrade() -> None:
+    # 表由应用启动时的 create_all 创建（新建的表已包含唯一索引），这里只处理已有的表
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("zone_measurements"):
+        return
+
+    zone_ids = sorted(set(_delete_duplicates(bind)))
+    if zone_ids:
+        # 汇总统计和聚合中计入了被删除的重复数据，删除后由启动时的重建任务补齐
+        for table in ("zone_measurement_stats", "zone_measurement_rollups"):
+            if sa.inspect(bind).has_table(table):
+                bind.execute(
+                    sa.text(f"DELETE FROM {table} WHERE zone_id IN :zone_ids").bindparams(
+                        sa.bindparam("zone_ids", expanding=True)
+                    ),
+                    {"zone_ids": zone_ids}
+                )
+
+    op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+    op.execute(f"CREATE UNIQUE INDEX {INDEX_NAME} ON zone_measurements (zone_id, timestamp DESC)")
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+    op.execute(f"CREATE INDEX {INDEX_NAME} ON zone_measurements (zone_id, timestamp DESC)")
@@ -1,11 +1,13 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from ..core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import get_async_db
 from ..core.security import verify_password, create_access_token, get_password_hash
 from ..core.config import settings
-from ..core.dependencies import get_current_user
+from ..core.dependencies import CurrentUser, get_current_user
 from ..models import User, UserRole
 from ..schemas import UserCreate, User as UserSchema, Token, LoginRequest
 
@@ -13,10 +15,10 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=UserSchema)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """用户注册"""
     # 检查用户名是否已存在
-    db_user = db.query(User).filter(User.username == user_data.username).first()
+    db_user = (await db.execute(select(User).where(User.username == user_data.username))).scalars().first()
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -24,7 +26,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # 检查邮箱是否已存在
-    db_user = db.query(User).filter(User.email == user_data.email).first()
+    db_user = (await db.execute(select(User).where(User.email == user_data.email))).scalars().first()
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -38,8 +40,8 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             detail="Password must contain at least one uppercase letter, one lowercase letter, and one number"
         )
 
-    # 创建用户
-    hashed_password = get_password_hash(user_data.password)
+    # 创建用户（密码哈希计算较慢，放到线程池中执行）
+    hashed_password = await run_in_threadpool(get_password_hash, user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -47,16 +49,16 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         role=UserRole.user
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """用户登录"""
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    user = (await db.execute(select(User).where(User.username == form_data.username))).scalars().first()
+    if not user or not await run_in_threadpool(verify_password, form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -82,9 +84,18 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
 
 @router.get("/me", response_model=UserSchema)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     """获取当前登录用户信息"""
-    return current_user
+    user = await db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
 
 
 def _validate_password_complexity(password: str) -> bool:
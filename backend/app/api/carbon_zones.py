@@ -1,21 +1,38 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 import json
 import logging
-import threading
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from shapely.geometry import Polygon
-from ..core.database import get_db, SessionLocal
-from ..core.dependencies import get_current_user
-from ..models import CarbonZone as CarbonZoneModel, ZoneStatus, User
+from ..core.config import settings
+from ..core.database import get_db, get_async_db
+from ..core.dependencies import CurrentUser, get_current_user, get_current_admin
+from ..models import CarbonZone as CarbonZoneModel, ZoneStatus
 from ..schemas import (
     CarbonZoneCreate,
     CarbonZoneUpdate,
     CarbonZone as CarbonZoneSchema,
     CarbonZoneWithMeasurements,
+    CarbonZoneCreated,
+    ExportFormat,
 )
-from ..services.measurement_service import get_zone_stats
-from ..services.measurement_generator import generate_historical_measurements_for_zone
+from ..services.measurement_service import get_zones_stats_async
+from ..services.measurement_generator import invalidate_zone_profile
+from ..services.history_jobs import submit_zone_history_job
+from ..services.export_service import EXPORT_MEDIA_TYPES, parquet_available, stream_measurements_export
+from ..services.response_cache import cached_json_response, get_user_zones_version, get_zone_version
+from ..services.spatial_service import (
+    overlapping_zones,
+    polygon_area_m2,
+    user_zones_lock,
+    zone_polygon,
+    zones_at_point,
+    zones_in_bbox,
+)
+from ..utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, keyset_condition, next_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -30,25 +47,68 @@ def _parse_coords(zone: CarbonZoneModel) -> List[dict]:
         return []
 
 
+def _check_overlap(db: Session, user_id: int, polygon, exclude_id: Optional[int] = None) -> None:
+    """不允许区域重叠时，与用户已有区域重叠返回409"""
+    if settings.zone_allow_overlap:
+        return
+    overlapping = overlapping_zones(db, user_id, polygon, exclude_ids=[exclude_id] if exclude_id else ())
+    if overlapping:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Zone overlaps existing zones: {', '.join(str(zone_id) for zone_id in overlapping)}"
+        )
+
+
 @router.get("/", response_model=List[CarbonZoneWithMeasurements])
 async def get_zones(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取用户的碳汇监测区列表"""
-    zones = (
-        db.query(CarbonZoneModel)
-        .filter(CarbonZoneModel.user_id == current_user.id)
-        .offset(skip)
-        .limit(limit)
-        .all()
+    """
+    获取用户的碳汇监测区列表（按ID排序）
+
+    传入上一页响应头 X-Next-Cursor 中的 cursor 时按 id 键集分页，忽略 skip；
+    响应带 ETag，区域和测量数据未变化时返回缓存结果或 304
+    """
+    query = (
+        select(CarbonZoneModel)
+        .where(CarbonZoneModel.user_id == current_user.id)
+        .order_by(CarbonZoneModel.id)
     )
+    if cursor:
+        try:
+            query = query.where(
+                keyset_condition((CarbonZoneModel.id,), decode_cursor(cursor, (int,)), descending=False)
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    else:
+        query = query.offset(skip)
+
+    async def build(headers: dict):
+        zones = (await db.execute(query.limit(limit))).scalars().all()
+
+        cursor_value = next_cursor(zones, limit, lambda zone: (zone.id,))
+        if cursor_value:
+            headers[NEXT_CURSOR_HEADER] = cursor_value
+        return await _zones_with_stats(db, zones)
+
+    version = await get_user_zones_version(db, current_user.id)
+    return await cached_json_response(request, version, build, user_id=current_user.id)
+
+
+async def _zones_with_stats(db: AsyncSession, zones: List[CarbonZoneModel]) -> List[CarbonZoneWithMeasurements]:
+    """为区域附加统计数据（列表和详情接口共用）"""
+    # 整页区域的统计数据一次查询取回，避免逐个区域查询
+    zones_stats = await get_zones_stats_async(db, [zone.id for zone in zones])
 
     result = []
     for zone in zones:
-        stats = get_zone_stats(db, zone.id)
+        stats = zones_stats[zone.id]
         zone_data = CarbonZoneWithMeasurements(
             id=zone.id,
             name=zone.name,
@@ -66,10 +126,10 @@ async def get_zones(
     return result
 
 
-@router.post("/", response_model=CarbonZoneSchema)
-async def create_zone(
+@router.post("/", response_model=CarbonZoneCreated)
+def create_zone(
     zone_data: CarbonZoneCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """创建碳汇监测区"""
@@ -85,66 +145,40 @@ async def create_zone(
             detail="Maximum 7 coordinate points allowed"
         )
 
-    # 计算面积
-    coords = [(coord.lng, coord.lat) for coord in zone_data.coordinates]
+    # 计算面积（多边形自相交等无效坐标返回400）
     try:
-        polygon = Polygon(coords)
-        area = polygon.area * 111319.5 * 111319.5  # 转换为平方米（近似计算）
+        polygon = zone_polygon(zone_data.coordinates)
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid coordinates"
         )
+    area = polygon_area_m2(polygon)
 
-    # 创建监测区
-    coords_json = [{"lat": coord.lat, "lng": coord.lng} for coord in zone_data.coordinates]
-    db_zone = CarbonZoneModel(
-        name=zone_data.name,
-        coordinates=json.dumps(coords_json),  # 存储为JSON字符串
-        area=area,
-        user_id=current_user.id,
-        status=ZoneStatus.active
-    )
+    # 重叠检查与写入在同一用户的锁内完成，并发创建的区域不会都通过检查
+    with user_zones_lock(db, current_user.id):
+        _check_overlap(db, current_user.id, polygon)
 
-    db.add(db_zone)
-    db.commit()
+        # 创建监测区
+        coords_json = [{"lat": coord.lat, "lng": coord.lng} for coord in zone_data.coordinates]
+        db_zone = CarbonZoneModel(
+            name=zone_data.name,
+            coordinates=json.dumps(coords_json),  # 存储为JSON字符串
+            area=area,
+            user_id=current_user.id,
+            status=ZoneStatus.active
+        )
+
+        db.add(db_zone)
+        db.commit()
     db.refresh(db_zone)
 
-    # 在后台异步生成历史数据（不阻塞API响应）
-    def generate_history_in_background(zone_id: int):
-        """在后台线程中生成历史数据"""
-        try:
-            background_db = SessionLocal()
-            try:
-                zone = background_db.query(CarbonZoneModel).filter(
-                    CarbonZoneModel.id == zone_id
-                ).first()
-                if zone:
-                    logger.info(f"Starting historical data generation for new zone {zone_id}")
-                    count = generate_historical_measurements_for_zone(
-                        background_db, zone, days=180, hours_interval=12, force_regenerate=False
-                    )
-                    logger.info(f"Generated {count} historical measurements for zone {zone_id}")
-                else:
-                    logger.warning(f"Zone {zone_id} not found for historical data generation")
-            except Exception as e:
-                logger.error(f"Error generating historical data for zone {zone_id}: {e}")
-            finally:
-                background_db.close()
-        except Exception as e:
-            logger.error(f"Error in background thread for zone {zone_id}: {e}")
-    
-    # 启动后台线程生成历史数据
-    thread = threading.Thread(
-        target=generate_history_in_background,
-        args=(db_zone.id,),
-        daemon=True
-    )
-    thread.start()
-    logger.info(f"Started background thread to generate historical data for zone {db_zone.id}")
+    # 提交后台任务生成历史数据（不阻塞API响应，任务队列限制并发数）
+    job = submit_zone_history_job(db_zone.id, owner_id=current_user.id)
+    logger.info(f"Submitted job {job['id']} to generate historical data for zone {db_zone.id}")
 
     # 返回时将坐标字符串解析为列表，避免Pydantic校验错误
-    return CarbonZoneSchema(
+    return CarbonZoneCreated(
         id=db_zone.id,
         name=db_zone.name,
         coordinates=coords_json,
@@ -152,47 +186,161 @@ async def create_zone(
         status=db_zone.status,
         created_at=db_zone.created_at,
         user_id=db_zone.user_id,
+        history_job_id=job["id"],
+    )
+
+
+async def _get_user_zone(db: AsyncSession, zone_id: int, user: CurrentUser) -> CarbonZoneModel:
+    """查询当前用户的监测区，不存在时返回404"""
+    result = await db.execute(
+        select(CarbonZoneModel).where(
+            CarbonZoneModel.id == zone_id,
+            CarbonZoneModel.user_id == user.id
+        )
     )
+    zone = result.scalars().first()
+    if not zone:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Zone not found"
+        )
+    return zone
+
+
+async def _zones_by_ids(db: AsyncSession, zone_ids: List[int]) -> List[CarbonZoneWithMeasurements]:
+    if not zone_ids:
+        return []
+    zones = (await db.execute(
+        select(CarbonZoneModel).where(CarbonZoneModel.id.in_(zone_ids)).order_by(CarbonZoneModel.id)
+    )).scalars().all()
+    return await _zones_with_stats(db, zones)
+
+
+@router.get("/bbox", response_model=List[CarbonZoneWithMeasurements])
+async def get_zones_in_bbox(
+    request: Request,
+    west: float = Query(..., ge=-180, le=180),
+    south: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取与经纬度范围相交的监测区（地图按当前视野加载）"""
+    if west > east or south > north:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+
+    async def build(headers: dict):
+        zone_ids = await db.run_sync(
+            lambda session: zones_in_bbox(session, current_user.id, (west, south, east, north))
+        )
+        return await _zones_by_ids(db, zone_ids)
+
+    version = await get_user_zones_version(db, current_user.id)
+    return await cached_json_response(request, version, build, user_id=current_user.id)
+
+
+@router.get("/at", response_model=List[CarbonZoneWithMeasurements])
+async def get_zones_at_point(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取包含某个点的监测区"""
+    zone_ids = await db.run_sync(lambda session: zones_at_point(session, current_user.id, lat, lng))
+    return await _zones_by_ids(db, zone_ids)
+
+
+def _export_response(
+    request: Request,
+    export_format: ExportFormat,
+    filename: str,
+    zone_ids: Optional[List[int]],
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> StreamingResponse:
+    """以流式响应返回测量数据导出文件，客户端支持时使用gzip压缩（Parquet本身已压缩）"""
+    if export_format == ExportFormat.parquet and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet export requires pyarrow to be installed"
+        )
+
+    use_gzip = (
+        export_format != ExportFormat.parquet and
+        "gzip" in request.headers.get("accept-encoding", "")
+    )
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"',
+        # 响应内容随 Accept-Encoding（是否gzip）变化，共享缓存/CDN 须分别缓存
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        stream_measurements_export(export_format, zone_ids, start, end, gzip=use_gzip),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers=headers
+    )
+
+
+@router.get("/export")
+async def export_zones_measurements(
+    request: Request,
+    format: ExportFormat = ExportFormat.csv,
+    zone_ids: Optional[List[int]] = Query(default=None),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_admin: CurrentUser = Depends(get_current_admin)
+):
+    """导出多个监测区的测量数据（管理员功能），不指定 zone_ids 时导出全部区域"""
+    return _export_response(request, format, "measurements", zone_ids, start, end)
+
+
+@router.get("/{zone_id}/export")
+async def export_zone_measurements(
+    zone_id: int,
+    request: Request,
+    format: ExportFormat = ExportFormat.csv,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """流式导出单个监测区的测量数据（CSV / NDJSON / Parquet）"""
+    await _get_user_zone(db, zone_id, current_user)
+    return _export_response(request, format, f"zone_{zone_id}_measurements", [zone_id], start, end)
 
 
 @router.get("/{zone_id}", response_model=CarbonZoneWithMeasurements)
 async def get_zone(
     zone_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取单个碳汇监测区"""
-    zone = db.query(CarbonZoneModel).filter(
-        CarbonZoneModel.id == zone_id,
-        CarbonZoneModel.user_id == current_user.id
-    ).first()
-
-    if not zone:
+    """获取单个碳汇监测区（带 ETag，数据未变化时返回缓存结果或 304）"""
+    version = await get_zone_version(db, zone_id, current_user.id)
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Zone not found"
         )
 
-    stats = get_zone_stats(db, zone.id)
-    return CarbonZoneWithMeasurements(
-        id=zone.id,
-        name=zone.name,
-        coordinates=_parse_coords(zone),
-        area=zone.area,
-        status=zone.status,
-        created_at=zone.created_at,
-        user_id=zone.user_id,
-        total_carbon_absorption=stats.total_carbon_absorption,
-        current_ndvi=stats.average_ndvi,
-        measurements_count=stats.measurements_count,
-    )
+    async def build(headers: dict):
+        zone = await _get_user_zone(db, zone_id, current_user)
+        return (await _zones_with_stats(db, [zone]))[0]
+
+    return await cached_json_response(request, version, build, user_id=current_user.id)
 
 
 @router.put("/{zone_id}", response_model=CarbonZoneSchema)
-async def update_zone(
+def update_zone(
     zone_id: int,
     zone_update: CarbonZoneUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """更新碳汇监测区"""
@@ -222,25 +370,30 @@ async def update_zone(
                 detail="Maximum 7 coordinate points allowed"
             )
         # 重新计算面积
-        coord_tuples = [(coord.lng, coord.lat) for coord in coords]
         try:
-            polygon = Polygon(coord_tuples)
-            update_data["area"] = polygon.area * 111319.5 * 111319.5
-            coords_json = [{"lat": c.lat, "lng": c.lng} for c in coords]
-            update_data["coordinates"] = json.dumps(coords_json)
+            polygon = zone_polygon(coords)
         except Exception:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid coordinates"
             )
+        update_data["area"] = polygon_area_m2(polygon)
+        update_data["coordinates"] = json.dumps([{"lat": c["lat"], "lng": c["lng"]} for c in coords])
     if "status" in update_data:
         update_data["status"] = ZoneStatus(update_data["status"])
 
-    for field, value in update_data.items():
-        setattr(zone, field, value)
-
-    db.commit()
+    # 重叠检查与写入在同一用户的锁内完成
+    with user_zones_lock(db, current_user.id):
+        if "coordinates" in update_data:
+            _check_overlap(db, current_user.id, polygon, exclude_id=zone.id)
+        for field, value in update_data.items():
+            setattr(zone, field, value)
+        db.commit()
     db.refresh(zone)
+
+    # 名称或坐标变化会影响生态系统类型、纬度和面积，需要重建区域画像
+    if "name" in update_data or "coordinates" in update_data:
+        invalidate_zone_profile(zone.id)
     return CarbonZoneSchema(
         id=zone.id,
         name=zone.name,
@@ -253,9 +406,9 @@ async def update_zone(
 
 
 @router.delete("/{zone_id}")
-async def delete_zone(
+def delete_zone(
     zone_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """删除碳汇监测区"""
@@ -272,4 +425,5 @@ async def delete_zone(
 
     db.delete(zone)
     db.commit()
+    invalidate_zone_profile(zone_id)
     return {"message": "Zone deleted successfully"}
\ No newline at end of file
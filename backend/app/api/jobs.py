@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from ..core.dependencies import CurrentUser, get_current_user, get_current_admin
+from ..schemas import JobInfo, HistoricalDataGenerateRequest
+from ..services.job_service import job_registry, FINISHED_STATUSES
+from ..services.history_jobs import submit_historical_generation_job
+
+router = APIRouter()
+
+# 进度事件流的轮询间隔（秒）
+EVENT_POLL_INTERVAL = 1.0
+
+
+async def _get_job_for_user(job_id: str, current_user: CurrentUser) -> dict:
+    """获取任务快照并校验权限：普通用户只能访问自己提交的任务"""
+    job = await run_in_threadpool(job_registry.get, job_id)
+    if not job or (current_user.role != "admin" and job["owner_id"] != current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@router.get("/", response_model=List[JobInfo])
+async def list_jobs(current_user: CurrentUser = Depends(get_current_user)):
+    """获取后台任务列表（管理员可查看所有任务）"""
+    owner_id = None if current_user.role == "admin" else current_user.id
+    return await run_in_threadpool(job_registry.list_jobs, owner_id)
+
+
+@router.post("/historical", response_model=JobInfo, status_code=status.HTTP_202_ACCEPTED)
+async def submit_historical_generation(
+    request: HistoricalDataGenerateRequest,
+    current_admin: CurrentUser = Depends(get_current_admin)
+):
+    """提交批量生成历史数据的后台任务（管理员功能），立即返回任务信息"""
+    return await run_in_threadpool(
+        submit_historical_generation_job,
+        owner_id=current_admin.id,
+        days=request.days,
+        hours_interval=request.hours_interval,
+        force_regenerate=request.force_regenerate,
+        zone_ids=request.zone_ids,
+        seed=request.seed,
+        workers=request.workers
+    )
+
+
+@router.get("/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str, current_user: CurrentUser = Depends(get_current_user)):
+    """查询任务状态和进度"""
+    return await _get_job_for_user(job_id, current_user)
+
+
+@router.post("/{job_id}/cancel", response_model=JobInfo)
+async def cancel_job(job_id: str, current_user: CurrentUser = Depends(get_current_user)):
+    """取消任务：排队中的任务不再执行，执行中的任务在下一批数据写入后中断"""
+    job = await _get_job_for_user(job_id, current_user)
+    return await run_in_threadpool(job_registry.cancel, job["id"])
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, current_user: CurrentUser = Depends(get_current_user)):
+    """
+    以 Server-Sent Events 推送任务进度，进度变化时发送一条事件，任务结束后关闭连接
+    进度从数据库读取，任务可以在其他 worker 中执行
+    """
+    await _get_job_for_user(job_id, current_user)
+
+    async def event_stream():
+        last_payload = None
+        while True:
+            snapshot = await run_in_threadpool(job_registry.get, job_id)
+            if snapshot is None:
+                break
+            payload = json.dumps(jsonable_encoder(JobInfo(**snapshot)), ensure_ascii=False)
+            if payload != last_payload:
+                yield f"data: {payload}\n\n"
+                last_payload = payload
+            if snapshot["status"] in FINISHED_STATUSES:
+                break
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
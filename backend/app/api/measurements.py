@@ -1,72 +1,234 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..core.database import get_db
-from ..core.dependencies import get_current_user, get_current_admin
-from ..models import ZoneMeasurement, CarbonZone, User
-from ..schemas import ZoneMeasurement, ZoneMeasurementCreate, MeasurementChartData, HistoricalDataGenerateRequest, HistoricalDataGenerateResponse
-from ..services.measurement_service import get_zone_measurements_chart_data
+from ..core.config import settings
+from ..core.database import get_db, get_async_db
+from ..core.dependencies import CurrentUser, get_current_user, get_current_admin
+from ..models import ZoneMeasurement as ZoneMeasurementModel, CarbonZone
+from ..schemas import (
+    ZoneMeasurement, ZoneMeasurementCreate, ZoneMeasurementBatchItem, ZoneMeasurementBatchResponse,
+    MeasurementChartData, ChartBucket, HistoricalDataGenerateRequest, HistoricalDataGenerateResponse
+)
+from ..services.measurement_service import (
+    get_zone_measurements_chart_data_async,
+    get_zone_measurements_bucketed,
+    get_zone_measurements_lttb,
+    record_measurement
+)
 from ..services.measurement_generator import generate_historical_measurements_for_all_zones
+from ..services.ingest_service import ingest_measurements
+from ..services.response_cache import cached_json_response, get_zone_version
+from ..utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, keyset_condition, next_cursor
 
 router = APIRouter()
 
+_batch_adapter = TypeAdapter(List[ZoneMeasurementBatchItem])
+_item_adapter = TypeAdapter(ZoneMeasurementBatchItem)
+
+
+def _too_many_rows() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Too many measurements in one batch (max {settings.measurement_batch_max_rows})"
+    )
+
+
+async def _read_ndjson_items(request: Request) -> List[ZoneMeasurementBatchItem]:
+    """
+    逐行解析 NDJSON 请求体，不需要先读入完整的请求体
+    请求体总大小受 measurement_batch_max_bytes 限制，单行长度受 measurement_batch_max_line_bytes 限制
+    """
+    items = []
+    buffer = bytearray()
+    line_number = 0
+    max_line = settings.measurement_batch_max_line_bytes
+
+    def parse(line: bytes):
+        nonlocal line_number
+        line_number += 1
+        if len(line) > max_line:
+            raise _line_too_long(line_number)
+        if not line.strip():
+            return
+        try:
+            items.append(_item_adapter.validate_json(line))
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=422,
+                detail={"line": line_number, "errors": json.loads(e.json())}
+            )
+        if len(items) > settings.measurement_batch_max_rows:
+            raise _too_many_rows()
+
+    async for chunk in _stream_limited_body(request):
+        buffer += chunk
+        # 只扫描上次剩余的不完整行和新数据块，剩余部分不超过单行上限，整体为线性时间
+        start = 0
+        while (newline := buffer.find(b"\n", start)) >= 0:
+            parse(bytes(buffer[start:newline]))
+            start = newline + 1
+        del buffer[:start]
+        if len(buffer) > max_line:
+            raise _line_too_long(line_number + 1)
+    parse(bytes(buffer))
+    return items
+
+
+async def _check_zone_access(db: AsyncSession, zone_id: int, user: CurrentUser) -> str:
+    """验证监测区属于当前用户，返回区域的数据版本（用于 ETag）"""
+    version = await get_zone_version(db, zone_id, user.id)
+    if version is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Zone not found or access denied"
+        )
+    return version
+
+
+def _body_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Request body too large (max {settings.measurement_batch_max_bytes} bytes)"
+    )
+
+
+def _line_too_long(line_number: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail={
+            "line": line_number,
+            "error": f"Line too long (max {settings.measurement_batch_max_line_bytes} bytes)",
+        }
+    )
+
+
+async def _stream_limited_body(request: Request) -> AsyncIterator[bytes]:
+    """逐块读取请求体，超过 measurement_batch_max_bytes 时立即返回 413（不等待读完）"""
+    limit = settings.measurement_batch_max_bytes
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise _body_too_large()
+
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _body_too_large()
+        yield chunk
+
+
+async def _read_limited_body(request: Request) -> bytes:
+    """读取完整的请求体（受 measurement_batch_max_bytes 限制）"""
+    body = bytearray()
+    async for chunk in _stream_limited_body(request):
+        body += chunk
+    return bytes(body)
+
+
+async def _read_json_items(request: Request) -> List[ZoneMeasurementBatchItem]:
+    """解析 JSON 数组请求体（大批量数据请使用 NDJSON）"""
+    try:
+        items = _batch_adapter.validate_json(await _read_limited_body(request))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json()))
+    if len(items) > settings.measurement_batch_max_rows:
+        raise _too_many_rows()
+    return items
+
 
 @router.get("/zone/{zone_id}", response_model=List[ZoneMeasurement])
 async def get_zone_measurements(
     zone_id: int,
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取碳汇监测区的测量数据"""
+    """
+    获取碳汇监测区的测量数据（按时间倒序）
+
+    传入上一页响应头 X-Next-Cursor 中的 cursor 时按 (timestamp, id) 键集分页，忽略 skip；
+    本页已满时响应头返回下一页的游标。
+    """
     # 验证用户权限
-    zone = db.query(CarbonZone).filter(
-        CarbonZone.id == zone_id,
-        CarbonZone.user_id == current_user.id
-    ).first()
+    version = await _check_zone_access(db, zone_id, current_user)
 
-    if not zone:
-        raise HTTPException(
-            status_code=404,
-            detail="Zone not found or access denied"
-        )
+    sort_columns = (ZoneMeasurementModel.timestamp, ZoneMeasurementModel.id)
+    query = select(ZoneMeasurementModel).where(
+        ZoneMeasurementModel.zone_id == zone_id
+    ).order_by(*(column.desc() for column in sort_columns))
+
+    if cursor:
+        try:
+            query = query.where(keyset_condition(sort_columns, decode_cursor(cursor, (datetime, int))))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    else:
+        query = query.offset(skip)
 
-    measurements = db.query(ZoneMeasurement).filter(
-        ZoneMeasurement.zone_id == zone_id
-    ).order_by(ZoneMeasurement.timestamp.desc()).offset(skip).limit(limit).all()
+    async def build(headers: dict):
+        measurements = (await db.execute(query.limit(limit))).scalars().all()
 
-    return measurements
+        cursor_value = next_cursor(measurements, limit, lambda m: (m.timestamp, m.id))
+        if cursor_value:
+            headers[NEXT_CURSOR_HEADER] = cursor_value
+        return [ZoneMeasurement.model_validate(m) for m in measurements]
+
+    return await cached_json_response(request, version, build, user_id=current_user.id)
 
 
 @router.get("/zone/{zone_id}/chart", response_model=MeasurementChartData)
 async def get_zone_chart_data(
     zone_id: int,
+    request: Request,
     limit: int = 10,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Optional[ChartBucket] = None,
+    points: int = Query(default=200, ge=3, le=2000),
+    lttb: bool = False,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取碳汇监测区的图表数据"""
+    """
+    获取碳汇监测区的图表数据
+
+    - 不带 start/end/bucket/lttb 参数时返回最近 limit 个测量点
+    - 指定 start/end/bucket 时按时间桶在数据库中聚合（bucket 默认 auto，点数不超过 points）
+    - lttb=true 时对时间范围内的原始数据做LTTB降采样，返回不超过 points 个原始点
+
+    响应带 ETag，测量数据未变化时返回缓存结果或 304
+    """
     # 验证用户权限
-    zone = db.query(CarbonZone).filter(
-        CarbonZone.id == zone_id,
-        CarbonZone.user_id == current_user.id
-    ).first()
+    version = await _check_zone_access(db, zone_id, current_user)
 
-    if not zone:
-        raise HTTPException(
-            status_code=404,
-            detail="Zone not found or access denied"
-        )
+    async def build(headers: dict):
+        # 时间范围查询由多条SQL组成，通过 run_sync 在异步连接上复用同步实现
+        if lttb:
+            chart_data = await db.run_sync(get_zone_measurements_lttb, zone_id, start, end, points)
+        elif start is not None or end is not None or bucket is not None:
+            chart_data = await db.run_sync(
+                get_zone_measurements_bucketed, zone_id, start, end, bucket or ChartBucket.auto, points
+            )
+        else:
+            chart_data = await get_zone_measurements_chart_data_async(db, zone_id, limit)
+        return MeasurementChartData(**chart_data)
 
-    chart_data = get_zone_measurements_chart_data(db, zone_id, limit)
-    return chart_data
+    return await cached_json_response(request, version, build, user_id=current_user.id)
 
 
 @router.post("/", response_model=ZoneMeasurement)
-async def create_measurement(
+def create_measurement(
     measurement_data: ZoneMeasurementCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """创建测量数据（主要用于数据生成服务）"""
@@ -82,32 +244,84 @@ async def create_measurement(
             detail="Zone not found or access denied"
         )
 
-    db_measurement = ZoneMeasurement(
+    db_measurement = ZoneMeasurementModel(
         zone_id=measurement_data.zone_id,
         ndvi=measurement_data.ndvi,
         carbon_absorption=measurement_data.carbon_absorption
     )
 
     db.add(db_measurement)
+    db.flush()
+    # 时间戳由数据库生成，需先读回再计入汇总统计
+    db.refresh(db_measurement)
+    record_measurement(db, db_measurement)
     db.commit()
     db.refresh(db_measurement)
     return db_measurement
 
 
+@router.post("/batch", response_model=ZoneMeasurementBatchResponse)
+async def create_measurements_batch(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    批量写入测量数据（接入卫星/传感器数据）
+
+    请求体为 JSON 数组，或 Content-Type 为 application/x-ndjson 时每行一条数据，
+    每条数据包含 zone_id、ndvi、carbon_absorption、timestamp。
+    同一区域同一时间的数据重复提交时覆盖旧数据（幂等）。
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        items = await _read_ndjson_items(request)
+    else:
+        items = await _read_json_items(request)
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No measurements provided")
+
+    def check_and_ingest():
+        # 一次查询校验整批数据涉及的所有区域
+        zone_ids = {item.zone_id for item in items}
+        owned_ids = {
+            zone_id for (zone_id,) in db.query(CarbonZone.id).filter(
+                CarbonZone.id.in_(zone_ids),
+                CarbonZone.user_id == current_user.id
+            )
+        }
+        denied = sorted(zone_ids - owned_ids)
+        if denied:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Zones not found or access denied: {denied}"
+            )
+        return ingest_measurements(db, items)
+
+    # 批量写入使用同步会话（PostgreSQL 下通过 psycopg2 执行 COPY），在线程池中运行
+    result = await run_in_threadpool(check_and_ingest)
+    return ZoneMeasurementBatchResponse(**result)
+
+
 @router.post("/generate-historical", response_model=HistoricalDataGenerateResponse)
 async def generate_historical_measurements(
     request: HistoricalDataGenerateRequest,
-    current_admin: User = Depends(get_current_admin)
+    current_admin: CurrentUser = Depends(get_current_admin)
 ):
     """
     为所有活跃的监测区生成历史测量数据（管理员功能）
     """
     try:
-        results = generate_historical_measurements_for_all_zones(
+        # 在线程池中运行，避免长时间的回填阻塞事件循环
+        results = await run_in_threadpool(
+            generate_historical_measurements_for_all_zones,
             days=request.days,
             hours_interval=request.hours_interval,
             force_regenerate=request.force_regenerate,
-            zone_ids=request.zone_ids
+            zone_ids=request.zone_ids,
+            seed=request.seed,
+            workers=request.workers
         )
         return HistoricalDataGenerateResponse(**results)
     except Exception as e:
@@ -0,0 +1,34 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.cache import get_cache_stats
+from ..core.database import get_pool_metrics, get_async_db
+from ..core.dependencies import CurrentUser, get_current_admin
+from ..models import ScheduledJobState
+from ..schemas import PoolStats, CacheStats, SchedulerJobStats
+from ..services.scheduler_service import get_scheduler_states
+
+router = APIRouter()
+
+
+@router.get("/db-pool", response_model=List[PoolStats])
+async def get_db_pool_metrics(current_admin: CurrentUser = Depends(get_current_admin)):
+    """获取数据库连接池指标：占用数、等待时间、超时和溢出连接（管理员功能）"""
+    return get_pool_metrics()
+
+
+@router.get("/cache", response_model=List[CacheStats])
+async def get_cache_metrics(current_admin: CurrentUser = Depends(get_current_admin)):
+    """获取各缓存的条目数和命中率（管理员功能）"""
+    return get_cache_stats()
+
+
+@router.get("/scheduler", response_model=List[SchedulerJobStats])
+async def get_scheduler_metrics(
+    current_admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取定时任务最近一次执行的周期、耗时、延迟和错误（所有进程共享的运行状态，管理员功能）"""
+    states = (await db.execute(select(ScheduledJobState))).scalars().all()
+    return get_scheduler_states(states)
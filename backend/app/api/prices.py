@@ -1,48 +1,100 @@
-from typing import List
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..core.database import get_db
-from ..models import CarbonPrice
-from ..schemas import CarbonPrice as CarbonPriceSchema
-from ..services.price_service import get_current_price, generate_mock_price
+from ..core.config import settings
+from ..core.database import get_db, get_async_db
+from ..schemas import CarbonPrice as CarbonPriceSchema, ChartBucket, PriceHistoryBuckets
+from ..services.price_service import (
+    get_current_price_async,
+    get_price_history_async,
+    get_price_history_bucketed,
+    generate_mock_price
+)
+from ..services.response_cache import cached_json_response, get_price_version
+from ..utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
 
 router = APIRouter()
 
 
 @router.get("/current")
-async def get_current_carbon_price(db: Session = Depends(get_db)):
-    """获取当前碳汇价格"""
-    price = get_current_price(db)
-    if not price:
-        # 如果没有价格数据，生成模拟数据
-        price = generate_mock_price(db)
+async def get_current_carbon_price(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """获取当前碳汇价格（从内存中的最近价格读取，带 ETag）"""
+    async def build(headers: dict):
+        price = await get_current_price_async(db)
+        if not price:
+            raise HTTPException(status_code=404, detail="No price data available")
 
-    return {
-        "price": price.price,
-        "timestamp": price.timestamp,
-        "source": price.source
-    }
+        return {
+            "price": price.price,
+            "timestamp": price.timestamp,
+            "source": price.source
+        }
+
+    version = await get_price_version(db)
+    return await cached_json_response(request, version, build, max_age=settings.price_cache_max_age)
 
 
 @router.get("/history", response_model=List[CarbonPriceSchema])
 async def get_price_history(
-    limit: int = 30,
-    db: Session = Depends(get_db)
+    request: Request,
+    limit: int = Query(default=30, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    获取碳汇价格历史数据（按时间倒序）
+
+    传入上一页响应头 X-Next-Cursor 中的 cursor 继续向前翻页；
+    最近的价格从内存返回，更早的数据查询数据库。响应带 ETag，价格未更新时返回缓存结果或 304
+    """
+    before = None
+    if cursor:
+        try:
+            before = tuple(decode_cursor(cursor, (datetime, int)))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    async def build(headers: dict):
+        prices = await get_price_history_async(db, limit, before)
+
+        cursor_value = next_cursor(prices, limit, lambda price: (price.timestamp, price.id))
+        if cursor_value:
+            headers[NEXT_CURSOR_HEADER] = cursor_value
+        return prices
+
+    version = await get_price_version(db)
+    return await cached_json_response(request, version, build, max_age=settings.price_cache_max_age)
+
+
+@router.get("/history/buckets", response_model=PriceHistoryBuckets)
+async def get_price_history_buckets(
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: ChartBucket = ChartBucket.auto,
+    points: int = Query(default=200, ge=3, le=2000),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取碳汇价格历史数据"""
-    prices = db.query(CarbonPrice).order_by(
-        CarbonPrice.timestamp.desc()
-    ).limit(limit).all()
+    """
+    按时间桶聚合的价格走势（均价/最低/最高），用于较长的时间范围
+    bucket 默认 auto，桶数量不超过 points
+    """
+    async def build(headers: dict):
+        data = await db.run_sync(get_price_history_bucketed, start, end, bucket, points)
+        return PriceHistoryBuckets(**data)
 
-    return prices
+    version = await get_price_version(db)
+    return await cached_json_response(request, version, build, max_age=settings.price_cache_max_age)
 
 
 @router.post("/generate-mock")
-async def generate_mock_prices(db: Session = Depends(get_db)):
+def generate_mock_prices(db: Session = Depends(get_db)):
     """生成模拟价格数据（开发环境使用）"""
     price = generate_mock_price(db)
     return {
         "message": "Mock price generated",
         "price": price.price,
         "timestamp": price.timestamp
-    }
\ No newline at end of file
+    }
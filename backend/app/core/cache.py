@@ -0,0 +1,332 @@
+import functools
+import inspect
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from .config import settings
+
+try:
+    import redis
+except ImportError:  # 共享缓存为可选功能
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def format_key(key: Hashable) -> str:
+    """缓存键统一转换为字符串，元组各部分以冒号连接（便于按前缀删除）"""
+    if isinstance(key, tuple):
+        return ":".join(str(part) for part in key)
+    return str(key)
+
+
+class CacheBackend:
+    """
+    缓存接口：条目超过 ttl 秒后失效，记录命中/未命中次数
+    ttl 或 maxsize 不大于0时缓存不保存任何条目
+
+    每次删除/清空时递增代数（generation）：先读取代数再计算缓存值，写入时传入该代数，
+    计算期间发生过失效则不写入，避免把失效前读到的旧数据写回缓存
+    """
+
+    backend_name = "base"
+
+    def __init__(self, namespace: str, maxsize: int, ttl: float):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _effective_ttl(self, ttl: Optional[float]) -> float:
+        """ttl 为空时使用默认值（可传入更短的 ttl，例如令牌的剩余有效期）"""
+        return self.ttl if ttl is None else min(ttl, self.ttl)
+
+    def _record(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._get(format_key(key))
+        self._record(value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None
+    ) -> None:
+        """写入条目；传入 generation 时，只有代数未变（期间没有失效）才保留该条目"""
+        ttl = self._effective_ttl(ttl)
+        if not self.enabled or ttl <= 0:
+            return
+        if generation is not None and self.generation() != generation:
+            return
+        cache_key = format_key(key)
+        self._set(cache_key, value, ttl)
+        # 检查与写入之间发生的失效：失效先递增代数再删除，写入后代数已变化说明条目可能是旧数据
+        if generation is not None and self.generation() != generation:
+            self._delete(cache_key)
+
+    def delete(self, key: Hashable) -> None:
+        self._bump_generation()
+        self._delete(format_key(key))
+
+    def delete_prefix(self, prefix: Hashable) -> None:
+        """删除以 prefix 开头的复合键，例如 delete_prefix(zone_id) 删除 (zone_id, limit) 的所有条目"""
+        self._bump_generation()
+        self._delete_prefix(format_key(prefix) + ":")
+
+    def generation(self) -> int:
+        """当前代数，每次删除/清空后递增"""
+        raise NotImplementedError
+
+    def _bump_generation(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "namespace": self.namespace,
+            "backend": self.backend_name,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        }
+
+    def _get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _delete_prefix(self, prefix: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class TTLCache(CacheBackend):
+    """线程安全的进程内缓存，超过 maxsize 时淘汰最久未使用的条目"""
+
+    backend_name = "memory"
+
+    def __init__(self, maxsize: int, ttl: float, namespace: str = "default"):
+        super().__init__(namespace, maxsize, ttl)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        return self._generation
+
+    def _bump_generation(self) -> None:
+        with self._lock:
+            self._generation += 1
+
+    def _get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return _MISSING
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache(CacheBackend):
+    """
+    Redis（或兼容 Redis 协议的服务）上的共享缓存，多个 uvicorn worker 共享条目和失效
+    - 键带命名空间前缀，值以 pickle 序列化（仅连接受信任的内部服务）
+    - 条目上限和 LRU 淘汰由服务端的 maxmemory / maxmemory-policy 负责
+    - 服务不可用时读取视为未命中、写入和删除被忽略，请求回退到数据库
+    """
+
+    backend_name = "redis"
+
+    def __init__(self, client, namespace: str, maxsize: int, ttl: float):
+        super().__init__(namespace, maxsize, ttl)
+        self._client = client
+        self._prefix = f"{settings.cache_key_prefix}:{namespace}:"
+        # 代数计数器放在命名空间前缀之外，clear() 按前缀删除条目时不会把它一并删除
+        self._generation_key = f"{settings.cache_key_prefix}:generation:{namespace}"
+
+    def generation(self) -> int:
+        data = self._call("get", lambda: self._client.get(self._generation_key))
+        return int(data) if data is not None else 0
+
+    def _bump_generation(self) -> None:
+        self._call("incr", lambda: self._client.incr(self._generation_key))
+
+    def _call(self, operation: str, func: Callable, default: Any = None) -> Any:
+        try:
+            return func()
+        except redis.RedisError as e:
+            logger.warning(f"Cache {self.namespace} {operation} failed: {e}")
+            return default
+
+    def _get(self, key: str) -> Any:
+        data = self._call("get", lambda: self._client.get(self._prefix + key))
+        return _MISSING if data is None else pickle.loads(data)
+
+    def _set(self, key: str, value: Any, ttl: float) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._call("set", lambda: self._client.set(self._prefix + key, data, px=max(1, int(ttl * 1000))))
+
+    def _delete(self, key: str) -> None:
+        self._call("delete", lambda: self._client.delete(self._prefix + key))
+
+    def _delete_matching(self, pattern: str) -> None:
+        def delete_all():
+            keys = list(self._client.scan_iter(match=pattern, count=500))
+            for start in range(0, len(keys), 500):
+                self._client.delete(*keys[start:start + 500])
+        self._call("delete", delete_all)
+
+    def _delete_prefix(self, prefix: str) -> None:
+        self._delete_matching(_escape_glob(self._prefix + prefix) + "*")
+
+    def clear(self) -> None:
+        self._bump_generation()
+        self._delete_matching(_escape_glob(self._prefix) + "*")
+
+    def __len__(self) -> int:
+        pattern = _escape_glob(self._prefix) + "*"
+        return self._call(
+            "scan", lambda: sum(1 for _ in self._client.scan_iter(match=pattern, count=500)), default=0
+        )
+
+
+def _escape_glob(value: str) -> str:
+    for char in "\\*?[]":
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+# 本进程创建的缓存（按命名空间），用于导出指标
+_caches: Dict[str, CacheBackend] = {}
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def _get_redis_client():
+    global _redis_client
+    with _redis_lock:
+        if _redis_client is None:
+            _redis_client = redis.Redis.from_url(
+                settings.cache_redis_url,
+                socket_timeout=settings.cache_redis_timeout,
+                socket_connect_timeout=settings.cache_redis_timeout,
+            )
+        return _redis_client
+
+
+def create_cache(namespace: str, maxsize: int, ttl: float, shared: bool = True) -> CacheBackend:
+    """
+    创建缓存：配置 cache_backend=redis 时使用共享缓存，否则使用进程内 LRU 缓存
+    shared=False 时始终使用进程内缓存（用于不需要跨进程共享的条目）
+    """
+    if shared and settings.cache_backend == "redis":
+        if redis is None:
+            logger.warning("cache_backend=redis requires the redis package, falling back to in-memory cache")
+            cache = TTLCache(maxsize, ttl, namespace=namespace)
+        else:
+            cache = RedisCache(_get_redis_client(), namespace, maxsize, ttl)
+    else:
+        cache = TTLCache(maxsize, ttl, namespace=namespace)
+    _caches[namespace] = cache
+    return cache
+
+
+def get_cache_stats() -> List[dict]:
+    """返回本进程内各缓存的命中统计"""
+    return [cache.stats() for cache in _caches.values()]
+
+
+def memoize(cache: CacheBackend, key: Callable[..., Hashable]):
+    """
+    以 cache 缓存函数的返回值（支持同步和异步函数），key 接收与被装饰函数相同的参数并返回缓存键
+    返回值为 None 时同样缓存；被装饰函数通过 .cache 访问所用的缓存以便失效
+    计算前读取缓存代数，计算期间缓存被失效时本次结果不写入缓存
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = key(*args, **kwargs)
+                value = cache.get(cache_key, _MISSING)
+                if value is _MISSING:
+                    generation = cache.generation()
+                    value = await func(*args, **kwargs)
+                    cache.set(cache_key, value, generation=generation)
+                return value
+            async_wrapper.cache = cache
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            value = cache.get(cache_key, _MISSING)
+            if value is _MISSING:
+                generation = cache.generation()
+                value = func(*args, **kwargs)
+                cache.set(cache_key, value, generation=generation)
+            return value
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
@@ -1,18 +1,209 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
 
+
+class PoolMetrics:
+    """
+    连接池指标：获取连接的次数和等待时间、超时次数和超出 pool_size 的溢出连接数
+    计数通过连接池的公开事件（connect/checkout/checkin）收集；
+    当前占用/空闲/溢出数量在读取快照时从引擎当前的连接池获取（dispose 后重建的连接池同样适用）
+    """
+
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.checkouts = 0
+        self.checkins = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+        self.overflow_connections = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def record_overflow(self) -> None:
+        with self._lock:
+            self.overflow_connections += 1
+
+    def snapshot(self) -> dict:
+        """返回连接池当前状态和累计指标"""
+        pool = self.engine.pool
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            data = {
+                "name": self.name,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / waits, 6) if waits else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "timeouts": self.timeouts,
+                "overflow_connections": self.overflow_connections,
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "max_overflow": settings.db_max_overflow,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return data
+
+
+# 本进程内已注册指标的连接池（历史数据生成子进程中创建的引擎不注册）
+pool_metrics: dict = {}
+
+
+class _TimedConnectMixin:
+    """
+    计时公开的 Pool.connect()：连接池事件只在取得连接之后触发，等待空闲连接的时间和超时只能在这里测量
+    指标挂在连接池类上（同步/异步引擎各用一个类），dispose() 后按同一个类重建的连接池沿用
+    """
+
+    metrics: PoolMetrics = None
+
+    def connect(self):
+        metrics = type(self).metrics
+        if metrics is None:
+            return super().connect()
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except sa_exc.TimeoutError:
+            metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedConnectMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedConnectMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url: str, is_async: bool = False) -> dict:
+    """根据配置生成引擎参数（连接池大小、超时、回收时间、SQL执行超时和会话时区）"""
+    options = {"pool_pre_ping": True, "echo": settings.db_echo}
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        # SQLite 使用 SQLAlchemy 默认的连接池，不支持 pool_size 等参数
+        return options
+
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    if backend == "postgresql":
+        # 会话时区固定为UTC：不带时区的时间参数和 date_trunc 等函数都按UTC解释，与服务器默认时区无关
+        server_settings = {"timezone": "UTC"}
+        if settings.db_statement_timeout_ms:
+            server_settings["statement_timeout"] = str(int(settings.db_statement_timeout_ms))
+        if is_async:
+            options["connect_args"] = {"server_settings": server_settings}
+        else:
+            options["connect_args"] = {
+                "options": " ".join(f"-c {name}={value}" for name, value in server_settings.items())
+            }
+    return options
+
+
+def _register_pool_metrics(name: str, engine) -> None:
+    """通过连接池事件收集引擎的连接池指标（事件注册在引擎上，dispose 后重建的连接池同样生效）"""
+    pool_class = type(engine.pool)
+    if not issubclass(pool_class, _TimedConnectMixin):
+        return
+    metrics = PoolMetrics(name, engine)
+    pool_class.metrics = metrics
+    pool_metrics[name] = metrics
+
+    @event.listens_for(engine, "connect")
+    def _count_overflow(dbapi_connection, connection_record):
+        # QueuePool 在新建连接前已增加 overflow 计数，大于0说明超出了 pool_size
+        if engine.pool.overflow() > 0:
+            metrics.record_overflow()
+
+    @event.listens_for(engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.record_checkout()
+
+    @event.listens_for(engine, "checkin")
+    def _count_checkin(dbapi_connection, connection_record):
+        metrics.record_checkin()
+
+
+def create_db_engine():
+    """创建数据库引擎（历史数据生成的子进程需要各自独立的引擎）"""
+    return create_engine(settings.database_url, **_engine_options(settings.database_url))
+
+
 # 创建数据库引擎
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    echo=settings.debug
-)
+engine = create_db_engine()
+_register_pool_metrics("sync", engine)
 
 # 创建Session工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步驱动（API路由使用；调度器和数据生成仍使用上面的同步引擎）
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url() -> str:
+    """由 DATABASE_URL 推导异步驱动的连接串，也可通过 ASYNC_DATABASE_URL 单独指定"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise NotImplementedError(f"No async driver configured for database {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+# 创建异步数据库引擎
+async_engine = create_async_engine(
+    get_async_database_url(),
+    **_engine_options(get_async_database_url(), is_async=True)
+)
+_register_pool_metrics("async", async_engine.sync_engine)
+
+# 创建异步Session工厂（提交后不过期对象，避免在异步上下文中触发隐式加载）
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # 声明式基类
 Base = declarative_base()
 
@@ -22,4 +213,27 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_pool_metrics() -> list:
+    """返回本进程内各连接池的指标快照"""
+    return [metrics.snapshot() for metrics in pool_metrics.values()]
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def dialect_insert(db: Session, model):
+    """
+    返回当前数据库方言的 insert 构造（支持 on_conflict_do_update 的 upsert）
+    目前支持 PostgreSQL 和 SQLite
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql_insert(model)
+    if dialect == "sqlite":
+        return sqlite_insert(model)
+    raise NotImplementedError(f"Upsert is not supported for dialect {dialect}")
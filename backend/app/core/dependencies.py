@@ -1,18 +1,88 @@
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from ..core.database import get_db
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from ..core.cache import create_cache
+from ..core.config import settings
+from ..core.database import get_async_db
 from ..core.security import verify_token
 from ..models import User
 
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """当前登录用户的不可变快照（路由只需要 id 和角色，完整信息按 id 查询）"""
+    id: int
+    username: str
+    role: str
+    is_active: bool
+
+    @classmethod
+    def from_model(cls, user: User) -> "CurrentUser":
+        role = user.role.value if hasattr(user.role, "value") else user.role
+        return cls(id=user.id, username=user.username, role=role, is_active=user.is_active)
+
+
+# 当前用户快照，按令牌中的用户名缓存；角色或启用状态变化时失效
+user_cache = create_cache("auth_users", settings.auth_user_cache_size, settings.auth_cache_ttl_seconds)
+
+
+# 会话中记录本次事务修改过的用户名，提交后使其缓存失效
+CHANGED_USERS_KEY = "auth_changed_users"
+
+
+def invalidate_user_cache(username: str) -> None:
+    user_cache.delete(username)
+
+
+def _mark_user_changed(target: User, usernames) -> None:
+    """在 flush 时记录需要失效的用户名，事务提交后再失效（回滚时丢弃）"""
+    session = object_session(target)
+    if session is None:
+        for username in usernames:
+            invalidate_user_cache(username)
+        return
+    session.info.setdefault(CHANGED_USERS_KEY, set()).update(usernames)
+
+
+@event.listens_for(User, "after_update")
+def _track_changed_user(mapper, connection, target):
+    state = inspect(target)
+    username_history = state.attrs.username.history
+    if (
+        state.attrs.role.history.has_changes() or
+        state.attrs.is_active.history.has_changes() or
+        username_history.has_changes()
+    ):
+        # 用户名变化时旧用户名对应的缓存同样失效
+        _mark_user_changed(target, {target.username, *(username_history.deleted or ())})
+
+
+@event.listens_for(User, "after_delete")
+def _track_deleted_user(mapper, connection, target):
+    _mark_user_changed(target, {target.username})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for username in session.info.pop(CHANGED_USERS_KEY, ()):
+        invalidate_user_cache(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_users(session):
+    session.info.pop(CHANGED_USERS_KEY, None)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """获取当前登录用户"""
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    """获取当前登录用户（优先使用缓存的用户快照，避免每个请求都查询用户表）"""
     token = credentials.credentials
     payload = verify_token(token)
     if not payload:
@@ -22,12 +92,20 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.query(User).filter(User.username == payload.get("sub")).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
+    username = payload.get("sub")
+    user = user_cache.get(username)
+    if user is None:
+        # 查询前读取缓存代数：查询与写入缓存之间提交的角色/状态变更使本次结果不写入缓存
+        generation = user_cache.generation()
+        result = await db.execute(select(User).where(User.username == username))
+        db_user = result.scalars().first()
+        if not db_user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        user = CurrentUser.from_model(db_user)
+        user_cache.set(username, user, generation=generation)
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -36,7 +114,7 @@ async def get_current_user(
     return user
 
 
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """获取当前管理员用户"""
     if current_user.role != "admin":
         raise HTTPException(
@@ -1,7 +1,10 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from .cache import create_cache
 from .config import settings
 
 # 密码加密上下文
@@ -12,6 +15,9 @@ pwd_context = CryptContext(
     deprecated="auto"
 )
 
+# 已验证的JWT载荷，按令牌哈希缓存，条目不会超过令牌本身的有效期
+token_payload_cache = create_cache("auth_tokens", settings.auth_token_cache_size, settings.auth_cache_ttl_seconds)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """创建JWT访问令牌"""
     to_encode = data.copy()
@@ -37,9 +43,16 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_token(token: str) -> Optional[dict]:
-    """验证JWT令牌"""
+    """验证JWT令牌（验证通过的载荷会被缓存，避免重复解码和验签）"""
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    payload = token_payload_cache.get(key)
+    if payload is not None:
+        return dict(payload)
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    expires_at = payload.get("exp")
+    ttl = expires_at - time.time() if isinstance(expires_at, (int, float)) else None
+    token_payload_cache.set(key, dict(payload), ttl=ttl)
+    return payload
\ No newline at end of file
@@ -1,20 +1,24 @@
 import asyncio
 import logging
-import threading
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-import schedule
-from .core.database import engine, get_db
+from .core.database import engine, async_engine, get_db
 from .core.config import settings
 from .core.security import verify_token
 from .core.dependencies import get_current_user, get_current_admin
 from .models import Base, User, UserRole
-from .api import auth, carbon_zones, measurements, prices
-from .services.measurement_generator import generate_measurements_for_active_zones
-from .services.price_service import update_price_hourly
+from .api import auth, carbon_zones, measurements, prices, jobs, metrics
+from .services.measurement_generator import generate_measurements_and_rollups
+from .services.price_service import update_price_hourly, load_price_buffer, seed_initial_price
+from .services.partition_service import maintain_measurement_partitions
+from .services.rollup_service import rebuild_missing_rollups
+from .services.response_cache import invalidate_zones
+from .services.job_service import job_registry
+from .services.scheduler_service import AsyncScheduler, EXECUTOR_PROCESS, register_job, scheduled_jobs
+from .utils.pagination import NEXT_CURSOR_HEADER
 from .core.security import get_password_hash
 
 logging.basicConfig(level=logging.INFO)
@@ -52,8 +56,20 @@ def create_initial_admin_user():
         db.close()
 
 
-def run_scheduler():
-    """运行定时任务调度器"""
+# 定时任务（cron 表达式，UTC）：每个周期在所有 worker / 副本中只由取得锁的一个进程执行一次
+# 每12小时生成一次监测数据（每天2次），在子进程中生成，完成后使本进程中对应区域的缓存失效
+register_job(
+    "measurements", generate_measurements_and_rollups, "0 */12 * * *",
+    executor=EXECUTOR_PROCESS, on_result=invalidate_zones
+)
+# 每小时更新一次碳汇价格（在本进程中执行，写入价格缓冲）
+register_job("prices", update_price_hourly, "0 * * * *")
+# 每天检查一次测量数据分区（仅分区表生效），首次启动时立即执行
+register_job("measurement_partitions", maintain_measurement_partitions, "@daily")
+
+
+def start_scheduler() -> AsyncScheduler:
+    """启动定时任务调度器（在事件循环中运行）"""
     # #region agent log
     import json, time, urllib.request
     def _agent_log(payload):
@@ -69,28 +85,23 @@ def run_scheduler():
             )
         except Exception:
             pass
-    _agent_log({"sessionId":"debug-session","runId":"run1","hypothesisId":"B","location":"backend/app/main.py:run_scheduler","message":"run_scheduler called","data":{},"timestamp":int(time.time()*1000)})
+    _agent_log({"sessionId":"debug-session","runId":"run1","hypothesisId":"B","location":"backend/app/main.py:start_scheduler","message":"start_scheduler called","data":{},"timestamp":int(time.time()*1000)})
     # #endregion
-    # 每12小时生成一次监测数据（每天2次）
-    schedule.every(12).hours.do(generate_measurements_for_active_zones)
     # #region agent log
-    try:
-        jobs = schedule.get_jobs()
-        _agent_log({"sessionId":"debug-session","runId":"run1","hypothesisId":"B","location":"backend/app/main.py:run_scheduler","message":"Schedule jobs registered (after measurement job)","data":{"job_count":len(jobs)},"timestamp":int(time.time()*1000)})
-    except Exception:
-        pass
+    _agent_log({"sessionId":"debug-session","runId":"run1","hypothesisId":"B","location":"backend/app/main.py:start_scheduler","message":"Schedule jobs registered (after measurement job)","data":{"job_count":len(scheduled_jobs)},"timestamp":int(time.time()*1000)})
     # #endregion
-    
-    # 每小时更新一次碳汇价格
-    schedule.every().hour.do(update_price_hourly)
-    
+
+    scheduler = AsyncScheduler()
+    scheduler.start()
+    # 以下一次性任务在多个进程同时启动时只由一个进程执行
+    # 没有任何价格数据时生成初始价格（其他 worker 在缓冲同步时取得）
+    scheduler.run_once("seed_initial_price", seed_initial_price)
+    # 为升级前已有的测量数据建立汇总统计和聚合（读接口不再写入缺失的汇总行）
+    scheduler.run_once("rebuild_missing_rollups", rebuild_missing_rollups)
+
     logger.info("Measurement data scheduler started (runs every 12 hours, twice per day)")
     logger.info("Price update scheduler started (runs every hour)")
-    
-    while True:
-        schedule.run_pending()
-        import time
-        time.sleep(60)  # 每分钟检查一次
+    return scheduler
 
 
 @asynccontextmanager
@@ -121,19 +132,24 @@ async def lifespan(app: FastAPI):
         create_initial_admin_user()
     except Exception as e:
         logger.warning(f"Could not create initial admin user: {e}")
+
+    # 加载最近的价格到内存（没有价格数据时由调度器生成一条，/current 不在读请求中写入）
+    load_price_buffer()
     
-    # 启动后台任务线程
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    logger.info("Background scheduler thread started")
+    # 启动定时任务调度器
+    scheduler = start_scheduler() if settings.scheduler_enabled else None
     
-    # 注意：不再在启动时立即生成监测数据。
-    # 监测数据应仅由定时任务（每12小时）生成，以避免重启服务时产生密集时间戳的数据。
+    # 注意：监测数据仅由定时任务按周期（UTC 00:00/12:00）生成，周期已执行过时重启服务不会再次生成，
+    # 以避免产生密集时间戳的数据；停机期间错过的周期在启动后合并补执行一次。
     
     yield
     
     # 关闭时
     logger.info("Shutting down CarbonCount API...")
+    if scheduler is not None:
+        await scheduler.stop()
+    job_registry.shutdown()
+    await async_engine.dispose()
 
 
 # 创建FastAPI应用
@@ -153,6 +169,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
 # 路由注册
@@ -180,6 +197,18 @@ app.include_router(
     tags=["prices"]
 )
 
+app.include_router(
+    jobs.router,
+    prefix="/api/jobs",
+    tags=["jobs"]
+)
+
+app.include_router(
+    metrics.router,
+    prefix="/api/metrics",
+    tags=["metrics"]
+)
+
 @app.get("/")
 async def root():
     return {"message": "CarbonCount API", "version": "1.0.0"}
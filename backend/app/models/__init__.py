@@ -3,6 +3,10 @@ from .user import User, UserRole
 from .carbon_zone import CarbonZone, ZoneStatus
 from .carbon_price import CarbonPrice
 from .zone_measurement import ZoneMeasurement
+from .zone_measurement_stats import ZoneMeasurementStats
+from .zone_measurement_rollup import ZoneMeasurementRollup
+from .scheduled_job_state import ScheduledJobState
+from .background_job import BackgroundJob
 
 # 确保所有模型都被注册到Base.metadata
 from ..core.database import Base
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON
+from ..core.database import Base
+
+
+class BackgroundJob(Base):
+    """后台任务的状态和进度（多个进程共享，任意 worker 都能查询和取消）"""
+    __tablename__ = "background_jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(64), nullable=False)  # 任务类型
+    owner_id = Column(Integer, nullable=True, index=True)  # 提交任务的用户
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(String(16), nullable=False, index=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)  # 其他进程请求取消，由执行进程在同步时读取
+    runner = Column(String(255), nullable=True)  # 执行任务的进程（主机名:进程号）
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False)  # 执行进程的心跳，长时间未更新视为进程已退出
+
+    def __repr__(self):
+        return f"<BackgroundJob(id={self.id}, kind={self.kind}, status={self.status})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime
+from sqlalchemy import Column, Integer, Float, String, DateTime, Index
 from sqlalchemy.sql import func
 from ..core.database import Base
 
@@ -11,5 +11,10 @@ class CarbonPrice(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     source = Column(String(100), nullable=False)  # 数据来源
 
+    __table_args__ = (
+        # 历史价格按 (timestamp, id) 倒序翻页、按时间范围聚合时走此索引
+        Index("ix_carbon_prices_timestamp_id", timestamp, id),
+    )
+
     def __repr__(self):
         return f"<CarbonPrice(id={self.id}, price={self.price}, timestamp={self.timestamp})>"
\ No newline at end of file
@@ -25,6 +25,8 @@ class CarbonZone(Base):
     # 关联关系
     user = relationship("User", back_populates="carbon_zones")
     measurements = relationship("ZoneMeasurement", back_populates="carbon_zone", cascade="all, delete-orphan")
+    measurement_stats = relationship("ZoneMeasurementStats", uselist=False, cascade="all, delete-orphan")
+    measurement_rollups = relationship("ZoneMeasurementRollup", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<CarbonZone(id={self.id}, name={self.name}, status={self.status}, area={self.area:.2f}m²)>"
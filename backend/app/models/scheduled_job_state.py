@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class ScheduledJobState(Base):
+    """定时任务的运行状态（多个进程共享，用于保证每个周期只执行一次）"""
+    __tablename__ = "scheduled_job_states"
+
+    name = Column(String(64), primary_key=True)  # 任务名称
+    last_slot = Column(DateTime(timezone=True), nullable=True)  # 最近一次执行对应的周期起点
+    last_started_at = Column(DateTime(timezone=True), nullable=True)
+    last_finished_at = Column(DateTime(timezone=True), nullable=True)
+    last_duration_seconds = Column(Float, nullable=True)  # 最近一次执行耗时（秒）
+    last_lag_seconds = Column(Float, nullable=True)  # 最近一次开始时间相对周期起点的延迟（秒）
+    last_missed_slots = Column(Integer, nullable=False, default=0)  # 最近一次执行前错过（合并执行）的周期数
+    last_error = Column(Text, nullable=True)  # 最近一次执行的错误信息，成功时为空
+    last_runner = Column(String(255), nullable=True)  # 执行任务的进程（主机名:进程号）
+    run_count = Column(Integer, nullable=False, default=0)
+    failure_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<ScheduledJobState(name={self.name}, last_slot={self.last_slot})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
@@ -16,5 +16,11 @@ class ZoneMeasurement(Base):
     # 关联关系
     carbon_zone = relationship("CarbonZone", back_populates="measurements")
 
+    __table_args__ = (
+        # 按区域过滤、按时间倒序读取（最新数据、图表、区间查询）走此索引
+        # 同一区域同一时间只有一条数据（批量写入按此 upsert）
+        Index("ix_zone_measurements_zone_id_timestamp", zone_id, timestamp.desc(), unique=True),
+    )
+
     def __repr__(self):
         return f"<ZoneMeasurement(id={self.id}, zone_id={self.zone_id}, ndvi={self.ndvi:.4f}, carbon_absorption={self.carbon_absorption:.6f})>"
\ No newline at end of file
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class ZoneMeasurementRollup(Base):
+    """监测区测量数据按日/周/月的聚合（由调度器和历史数据回填维护）"""
+    __tablename__ = "zone_measurement_rollups"
+
+    zone_id = Column(Integer, ForeignKey("carbon_zones.id", ondelete="CASCADE"), primary_key=True)
+    granularity = Column(String(10), primary_key=True)  # day / week / month
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)  # 时间桶起点
+    measurements_count = Column(Integer, nullable=False)  # 样本数
+    carbon_sum = Column(Float, nullable=False)  # 碳吸收量求和
+    carbon_min = Column(Float, nullable=False)
+    carbon_max = Column(Float, nullable=False)
+    ndvi_sum = Column(Float, nullable=False)  # NDVI求和（用于计算均值）
+    ndvi_min = Column(Float, nullable=False)
+    ndvi_max = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<ZoneMeasurementRollup(zone_id={self.zone_id}, granularity={self.granularity}, bucket_start={self.bucket_start}, count={self.measurements_count})>"
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class ZoneMeasurementStats(Base):
+    """监测区测量数据的汇总统计（随测量数据的写入增量维护）"""
+    __tablename__ = "zone_measurement_stats"
+
+    zone_id = Column(Integer, ForeignKey("carbon_zones.id", ondelete="CASCADE"), primary_key=True)
+    measurements_count = Column(Integer, nullable=False, default=0)  # 测量次数
+    carbon_sum = Column(Float, nullable=False, default=0.0)  # 碳吸收量累计
+    ndvi_sum = Column(Float, nullable=False, default=0.0)  # NDVI累计（用于计算均值）
+    latest_timestamp = Column(DateTime(timezone=True), nullable=True)  # 最新测量时间
+    latest_measurement_id = Column(Integer, nullable=True)  # 最新测量记录ID
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<ZoneMeasurementStats(zone_id={self.zone_id}, count={self.measurements_count}, carbon_sum={self.carbon_sum:.6f})>"
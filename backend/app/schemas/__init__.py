@@ -5,11 +5,14 @@ from .user import (
 )
 from .carbon_zone import (
     CarbonZone, CarbonZoneCreate, CarbonZoneUpdate,
-    CarbonZoneWithMeasurements, Coordinate
+    CarbonZoneWithMeasurements, CarbonZoneCreated, Coordinate
 )
 from .measurement import (
-    CarbonPrice, CarbonPriceCreate,
+    CarbonPrice, CarbonPriceCreate, PriceHistoryBuckets,
     ZoneMeasurement, ZoneMeasurementCreate,
-    MeasurementChartData, ZoneStats,
+    ZoneMeasurementBatchItem, ZoneMeasurementBatchResponse,
+    MeasurementChartData, ChartBucket, ExportFormat, ZoneStats,
     HistoricalDataGenerateRequest, HistoricalDataGenerateResponse
-)
\ No newline at end of file
+)
+from .job import JobInfo
+from .metrics import PoolStats, CacheStats, SchedulerJobStats
\ No newline at end of file
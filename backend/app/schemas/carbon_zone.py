@@ -43,4 +43,9 @@ class CarbonZoneWithMeasurements(CarbonZone):
     measurements_count: int = 0
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class CarbonZoneCreated(CarbonZone):
+    """创建监测区的响应，附带历史数据生成任务ID（可通过 /api/jobs/{id} 查询进度）"""
+    history_job_id: Optional[str] = None
\ No newline at end of file
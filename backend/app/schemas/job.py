@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+from datetime import datetime
+
+
+class JobInfo(BaseModel):
+    id: str
+    kind: str
+    owner_id: Optional[int] = None
+    params: dict = {}
+    status: str
+    total: int = 0              # 预计生成的数据条数
+    completed: int = 0          # 已生成的数据条数
+    progress: float = 0.0       # 完成比例（0-1）
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
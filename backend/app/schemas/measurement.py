@@ -1,3 +1,4 @@
+import enum
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
@@ -29,6 +30,17 @@ class ZoneMeasurementCreate(ZoneMeasurementBase):
     zone_id: int
 
 
+class ZoneMeasurementBatchItem(ZoneMeasurementCreate):
+    timestamp: datetime = Field(..., description="观测时间（不带时区时按UTC处理）")
+
+
+class ZoneMeasurementBatchResponse(BaseModel):
+    received: int  # 请求中的数据条数
+    written: int  # 写入条数（同一区域同一时间的重复数据只保留最后一条）
+    replaced: int  # 覆盖的已有数据条数
+    zone_ids: List[int]
+
+
 class ZoneMeasurement(ZoneMeasurementBase):
     id: int
     zone_id: int
@@ -39,10 +51,41 @@ class ZoneMeasurement(ZoneMeasurementBase):
 
 
 # 数据可视化相关
+class ChartBucket(str, enum.Enum):
+    hour = "hour"
+    day = "day"
+    week = "week"
+    month = "month"
+    auto = "auto"    # 按时间范围自动选择，使点数不超过目标点数
+
+
+class PriceHistoryBuckets(BaseModel):
+    bucket: ChartBucket
+    timestamps: List[datetime]  # 时间桶起点
+    prices: List[float]         # 桶内均价
+    price_min: List[float]
+    price_max: List[float]
+    counts: List[int]
+
+
+class ExportFormat(str, enum.Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    parquet = "parquet"
+
+
 class MeasurementChartData(BaseModel):
     timestamps: List[datetime]
-    ndvi_values: List[float]
-    carbon_values: List[float]
+    ndvi_values: List[float]  # 按时间桶聚合时为桶内均值
+    carbon_values: List[float]  # 按时间桶聚合时为桶内均值
+    # 以下字段仅在按时间桶聚合时返回
+    bucket: Optional[ChartBucket] = None
+    counts: Optional[List[int]] = None
+    ndvi_min: Optional[List[float]] = None
+    ndvi_max: Optional[List[float]] = None
+    carbon_min: Optional[List[float]] = None
+    carbon_max: Optional[List[float]] = None
+    carbon_sums: Optional[List[float]] = None
 
 
 class ZoneStats(BaseModel):
@@ -57,6 +100,8 @@ class HistoricalDataGenerateRequest(BaseModel):
     hours_interval: int = Field(default=12, ge=1, le=24, description="测量间隔（小时）")
     force_regenerate: bool = Field(default=False, description="是否强制重新生成（删除旧数据）")
     zone_ids: Optional[List[int]] = Field(default=None, description="指定区域ID列表，如果为None则处理所有活跃区域")
+    seed: Optional[int] = Field(default=None, ge=0, le=2**32 - 1, description="随机种子，指定后可重复生成相同的数据集")
+    workers: Optional[int] = Field(default=None, ge=1, le=32, description="并行进程数，为None时使用服务端配置")
 
 
 class HistoricalDataGenerateResponse(BaseModel):
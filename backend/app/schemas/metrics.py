@@ -0,0 +1,47 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+
+class PoolStats(BaseModel):
+    name: str                          # sync：调度器/数据生成；async：API路由
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    checked_out: Optional[int] = None  # 当前占用的连接数
+    checked_in: Optional[int] = None   # 当前空闲的连接数
+    overflow: Optional[int] = None     # 当前超出 pool_size 的连接数
+    checkouts: int = 0                 # 累计获取连接次数
+    checkins: int = 0                  # 累计归还连接次数
+    wait_seconds_total: float = 0.0    # 累计等待空闲连接的时间
+    wait_seconds_avg: float = 0.0
+    wait_seconds_max: float = 0.0
+    timeouts: int = 0                  # 等待超过 pool_timeout 的次数
+    overflow_connections: int = 0      # 累计新建的溢出连接数
+
+
+class CacheStats(BaseModel):
+    namespace: str
+    backend: str                       # memory / redis
+    size: int                          # 当前条目数（redis 为该命名空间下的键数）
+    maxsize: int
+    ttl_seconds: float
+    hits: int                          # 本进程的命中次数
+    misses: int
+    hit_ratio: float
+
+
+class SchedulerJobStats(BaseModel):
+    name: str
+    schedule: str                      # cron 表达式（UTC）
+    executor: str                      # thread / process
+    next_slot: datetime                # 下一个周期的起点
+    last_slot: Optional[datetime] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_seconds: Optional[float] = None  # 最近一次执行耗时
+    last_lag_seconds: Optional[float] = None       # 开始时间相对周期起点的延迟
+    last_missed_slots: int = 0         # 停机等原因错过、合并执行的周期数
+    last_error: Optional[str] = None
+    last_runner: Optional[str] = None  # 执行任务的进程（主机名:进程号）
+    run_count: int = 0
+    failure_count: int = 0
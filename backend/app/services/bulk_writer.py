@@ -0,0 +1,168 @@
+import csv
+import io
+import logging
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import func, insert, select, text, tuple_
+from sqlalchemy.orm import Session
+from ..core.database import dialect_insert
+from ..models import ZoneMeasurement
+
+logger = logging.getLogger(__name__)
+
+# 写入 zone_measurements 的列（顺序与 COPY 列表一致）
+MEASUREMENT_COLUMNS = ("zone_id", "ndvi", "carbon_absorption", "timestamp")
+
+# 每次 COPY / executemany 处理的行数，限制内存中缓冲区的大小
+BULK_WRITE_CHUNK_SIZE = 5000
+
+# upsert 时 COPY 的目标临时表（事务结束时自动删除）
+STAGING_TABLE = "zone_measurements_staging"
+
+
+def _chunked(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _copy_rows(cursor, rows: Sequence[dict], table: str = ZoneMeasurement.__tablename__) -> None:
+    """将一批数据写入内存CSV缓冲区，再通过 COPY ... FROM STDIN 导入 table"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow((
+            row["zone_id"],
+            repr(float(row["ndvi"])),
+            repr(float(row["carbon_absorption"])),
+            row["timestamp"].isoformat(),
+        ))
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(MEASUREMENT_COLUMNS)}) "
+        "FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+
+def write_measurements(
+    db: Session,
+    rows: Iterable[dict],
+    chunk_size: int = BULK_WRITE_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    批量写入测量数据（不提交事务，由调用方决定提交时机）
+
+    PostgreSQL 使用 psycopg2 的 copy_expert 执行 COPY ... FROM STDIN；
+    其他数据库（如SQLite）退化为 executemany 多行插入。
+
+    Args:
+        db: 数据库会话
+        rows: 包含 zone_id/ndvi/carbon_absorption/timestamp 的字典序列
+        chunk_size: 每批写入的行数
+        on_chunk: 每写入一批后调用 on_chunk(已写入行数)
+
+    Returns:
+        写入的行数
+    """
+    connection = db.connection()
+    use_copy = connection.dialect.name == "postgresql"
+    cursor = connection.connection.cursor() if use_copy else None
+
+    written = 0
+    try:
+        for chunk in _chunked(rows, chunk_size):
+            if use_copy:
+                _copy_rows(cursor, chunk)
+            else:
+                db.execute(insert(ZoneMeasurement), chunk)
+            written += len(chunk)
+            if on_chunk:
+                on_chunk(written)
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+    return written
+
+
+def _upsert_via_staging(db: Session, cursor, rows: Sequence[dict]) -> Tuple[int, int]:
+    """PostgreSQL：COPY 到临时表，再 INSERT ... SELECT ... ON CONFLICT 合并到正式表"""
+    db.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+        "(zone_id integer, ndvi double precision, carbon_absorption double precision, "
+        "timestamp timestamptz) ON COMMIT DROP"
+    ))
+    db.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+    _copy_rows(cursor, rows, STAGING_TABLE)
+    columns = ", ".join(MEASUREMENT_COLUMNS)
+    # xmax = 0 表示本次新插入的行，否则为冲突后更新的已有行
+    inserted, total = db.execute(text(
+        f"WITH upserted AS ("
+        f"INSERT INTO {ZoneMeasurement.__tablename__} ({columns}) "
+        f"SELECT {columns} FROM {STAGING_TABLE} "
+        "ON CONFLICT (zone_id, timestamp) DO UPDATE "
+        "SET ndvi = EXCLUDED.ndvi, carbon_absorption = EXCLUDED.carbon_absorption "
+        "RETURNING (xmax = 0) AS inserted) "
+        "SELECT count(*) FILTER (WHERE inserted), count(*) FROM upserted"
+    )).one()
+    return total, total - inserted
+
+
+def _upsert_rows(db: Session, rows: Sequence[dict]) -> Tuple[int, int]:
+    """其他数据库：先统计已存在的键，再多行 INSERT ... ON CONFLICT DO UPDATE"""
+    existing = db.execute(
+        select(func.count()).select_from(ZoneMeasurement).where(
+            tuple_(ZoneMeasurement.zone_id, ZoneMeasurement.timestamp).in_(
+                [(row["zone_id"], row["timestamp"]) for row in rows]
+            )
+        )
+    ).scalar()
+    stmt = dialect_insert(db, ZoneMeasurement)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["zone_id", "timestamp"],
+            set_={"ndvi": stmt.excluded.ndvi, "carbon_absorption": stmt.excluded.carbon_absorption}
+        ),
+        list(rows)
+    )
+    return len(rows), existing
+
+
+def upsert_measurements(
+    db: Session,
+    rows: Iterable[dict],
+    chunk_size: int = BULK_WRITE_CHUNK_SIZE
+) -> Tuple[int, int]:
+    """
+    按 (zone_id, timestamp) 唯一索引批量 upsert 测量数据（不提交事务）
+
+    同一区域同一时间的已有数据被覆盖；并发写入相同的键时由唯一索引保证只保留一条。
+    rows 中不能包含重复的 (zone_id, timestamp)（同一条语句不能两次更新同一行）。
+
+    Returns:
+        (写入的行数, 其中覆盖已有数据的行数)
+    """
+    connection = db.connection()
+    use_copy = connection.dialect.name == "postgresql"
+    cursor = connection.connection.cursor() if use_copy else None
+
+    written = replaced = 0
+    try:
+        for chunk in _chunked(rows, chunk_size):
+            if use_copy:
+                chunk_written, chunk_replaced = _upsert_via_staging(db, cursor, chunk)
+            else:
+                chunk_written, chunk_replaced = _upsert_rows(db, chunk)
+            written += chunk_written
+            replaced += chunk_replaced
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+    return written, replaced
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence
+from sqlalchemy import select
+from ..core.database import SessionLocal
+from ..models import ZoneMeasurement
+from ..schemas import ExportFormat
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet 导出为可选功能
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ("id", "zone_id", "timestamp", "ndvi", "carbon_absorption")
+
+# 服务端游标每次取回的行数，同时也是 Parquet 的行组大小
+EXPORT_BATCH_SIZE = 10000
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv; charset=utf-8",
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def iter_measurement_batches(
+    zone_ids: Optional[Sequence[int]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[tuple]]:
+    """
+    按 (zone_id, timestamp) 顺序分批读取测量数据
+
+    使用独立的会话和服务端游标（yield_per 会启用 stream_results），
+    内存中最多只保留一批数据，与导出总行数无关。
+    zone_ids 为None时导出所有区域。
+    """
+    query = select(*(getattr(ZoneMeasurement, column) for column in EXPORT_COLUMNS))
+    if zone_ids is not None:
+        query = query.where(ZoneMeasurement.zone_id.in_(zone_ids))
+    if start is not None:
+        query = query.where(ZoneMeasurement.timestamp >= start)
+    if end is not None:
+        query = query.where(ZoneMeasurement.timestamp < end)
+    query = query.order_by(ZoneMeasurement.zone_id, ZoneMeasurement.timestamp, ZoneMeasurement.id)
+
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+    finally:
+        db.close()
+
+
+def _iter_csv(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode("utf-8")
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for measurement_id, zone_id, timestamp, ndvi, carbon in batch:
+            writer.writerow((measurement_id, zone_id, timestamp.isoformat(), ndvi, carbon))
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _iter_ndjson(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        lines = []
+        for measurement_id, zone_id, timestamp, ndvi, carbon in batch:
+            lines.append(json.dumps({
+                "id": measurement_id,
+                "zone_id": zone_id,
+                "timestamp": timestamp.isoformat(),
+                "ndvi": ndvi,
+                "carbon_absorption": carbon,
+            }, separators=(",", ":")))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _iter_parquet(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    """每批数据写为一个行组，写完即把缓冲区内容输出，文件尾在最后输出"""
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("zone_id", pa.int64()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("ndvi", pa.float64()),
+        ("carbon_absorption", pa.float64()),
+    ])
+    sink = io.BytesIO()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    try:
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield drain()
+    finally:
+        writer.close()
+    yield drain()
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_measurements_export(
+    export_format: ExportFormat,
+    zone_ids: Optional[Sequence[int]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    gzip: bool = False
+) -> Iterator[bytes]:
+    """生成导出文件的字节流（用于 StreamingResponse）"""
+    batches = iter_measurement_batches(zone_ids, start, end)
+    if export_format == ExportFormat.parquet:
+        chunks = _iter_parquet(batches)
+    elif export_format == ExportFormat.ndjson:
+        chunks = _iter_ndjson(batches)
+    else:
+        chunks = _iter_csv(batches)
+    return _gzip(chunks) if gzip else chunks
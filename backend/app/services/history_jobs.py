@@ -0,0 +1,80 @@
+import logging
+from typing import List, Optional
+from ..core.database import SessionLocal
+from ..models import CarbonZone
+from .job_service import Job, job_registry
+from .measurement_generator import (
+    generate_historical_measurements_for_zone,
+    generate_historical_measurements_for_all_zones,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def submit_zone_history_job(
+    zone_id: int,
+    owner_id: Optional[int],
+    days: int = 180,
+    hours_interval: int = 12
+) -> dict:
+    """提交为单个新建区域生成历史数据的后台任务，返回任务快照"""
+
+    def run(job: Job) -> dict:
+        db = SessionLocal()
+        try:
+            zone = db.query(CarbonZone).filter(CarbonZone.id == zone_id).first()
+            if not zone:
+                raise ValueError(f"Zone {zone_id} not found")
+            logger.info(f"Starting historical data generation for zone {zone_id} (job {job.id})")
+            count = generate_historical_measurements_for_zone(
+                db, zone, days=days, hours_interval=hours_interval,
+                force_regenerate=False, progress_callback=job.report_progress
+            )
+            logger.info(f"Generated {count} historical measurements for zone {zone_id}")
+            return {"zone_id": zone_id, "measurements_generated": count}
+        finally:
+            db.close()
+
+    return job_registry.submit(
+        "zone_history",
+        run,
+        owner_id=owner_id,
+        params={"zone_id": zone_id, "days": days, "hours_interval": hours_interval}
+    )
+
+
+def submit_historical_generation_job(
+    owner_id: Optional[int],
+    days: int = 180,
+    hours_interval: int = 12,
+    force_regenerate: bool = False,
+    zone_ids: Optional[List[int]] = None,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None
+) -> dict:
+    """提交为所有（或指定）活跃区域批量生成历史数据的后台任务，返回任务快照"""
+
+    def run(job: Job) -> dict:
+        return generate_historical_measurements_for_all_zones(
+            days=days,
+            hours_interval=hours_interval,
+            force_regenerate=force_regenerate,
+            zone_ids=zone_ids,
+            seed=seed,
+            workers=workers,
+            progress_callback=job.report_progress
+        )
+
+    return job_registry.submit(
+        "historical_generation",
+        run,
+        owner_id=owner_id,
+        params={
+            "days": days,
+            "hours_interval": hours_interval,
+            "force_regenerate": force_regenerate,
+            "zone_ids": zone_ids,
+            "seed": seed,
+            "workers": workers,
+        }
+    )
@@ -0,0 +1,62 @@
+import logging
+from datetime import timezone
+from typing import Dict, List, Sequence, Tuple
+from sqlalchemy.orm import Session
+from ..schemas import ZoneMeasurementBatchItem
+from .bulk_writer import upsert_measurements
+from .measurement_service import refresh_zone_stats
+from .rollup_service import refresh_zone_rollups
+
+logger = logging.getLogger(__name__)
+
+def _normalize_timestamp(item: ZoneMeasurementBatchItem):
+    """带时区的时间统一转换为UTC，不带时区的按UTC处理"""
+    if item.timestamp.tzinfo is None:
+        return item.timestamp.replace(tzinfo=timezone.utc)
+    return item.timestamp.astimezone(timezone.utc)
+
+
+def _dedupe(items: Sequence[ZoneMeasurementBatchItem]) -> Dict[Tuple[int, object], dict]:
+    """按 (zone_id, timestamp) 去重，同一批次中后出现的数据覆盖先出现的"""
+    rows = {}
+    for item in items:
+        timestamp = _normalize_timestamp(item)
+        rows[(item.zone_id, timestamp)] = {
+            "zone_id": item.zone_id,
+            "ndvi": item.ndvi,
+            "carbon_absorption": item.carbon_absorption,
+            "timestamp": timestamp,
+        }
+    return rows
+
+
+def ingest_measurements(db: Session, items: Sequence[ZoneMeasurementBatchItem]) -> dict:
+    """
+    批量写入测量数据（幂等）：同一区域同一时间的已有数据会被覆盖
+
+    在一个事务中按 (zone_id, timestamp) 唯一索引 upsert（PostgreSQL 经临时表 COPY 后
+    INSERT ... ON CONFLICT DO UPDATE），并发提交相同的数据也不会产生重复行；
+    最后对涉及的区域各刷新一次汇总统计和聚合。区域权限由调用方校验。
+    """
+    rows = _dedupe(items)
+    keys: List[Tuple[int, object]] = list(rows.keys())
+    zone_ids = sorted({zone_id for zone_id, _ in keys})
+
+    try:
+        written, replaced = upsert_measurements(db, rows.values())
+
+        earliest = min(timestamp for _, timestamp in keys) if keys else None
+        refresh_zone_stats(db, zone_ids)
+        refresh_zone_rollups(db, zone_ids, since=earliest)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+    logger.info(f"Ingested {written} measurements for {len(zone_ids)} zones ({replaced} replaced)")
+    return {
+        "received": len(items),
+        "written": written,
+        "replaced": replaced,
+        "zone_ids": zone_ids,
+    }
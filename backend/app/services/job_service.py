@@ -0,0 +1,344 @@
+import enum
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import select, update
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models import BackgroundJob
+from .scheduler_service import RUNNER_ID, utcnow
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, enum.Enum):
+    pending = "pending"        # 排队中
+    running = "running"        # 执行中
+    succeeded = "succeeded"    # 已完成
+    failed = "failed"          # 失败
+    cancelled = "cancelled"    # 已取消
+
+
+FINISHED_STATUSES = (JobStatus.succeeded, JobStatus.failed, JobStatus.cancelled)
+ACTIVE_STATUSES = (JobStatus.pending.value, JobStatus.running.value)
+
+# 执行进程长时间未更新心跳时写入的错误信息
+WORKER_LOST_ERROR = "Worker process exited before the job finished"
+
+
+class JobCancelled(Exception):
+    """任务被取消时由进度回调抛出，用于中断正在执行的任务"""
+
+
+class Job:
+    """本进程执行的后台任务：在内存中记录进度，由 JobRegistry 定期同步到数据库"""
+
+    def __init__(self, kind: str, owner_id: Optional[int], params: Optional[dict] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner_id = owner_id
+        self.params = params or {}
+        self.total = 0
+        self.completed = 0
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def report_progress(self, completed: int, total: int) -> None:
+        """
+        更新任务进度，可直接作为生成器的 progress_callback 使用
+        任务已被请求取消（包括在其他进程中请求）时抛出 JobCancelled
+        """
+        with self._lock:
+            self.completed = completed
+            self.total = total
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} cancelled")
+
+    def progress(self) -> tuple:
+        with self._lock:
+            return self.completed, self.total
+
+
+def _snapshot(row: BackgroundJob) -> dict:
+    """任务状态的快照（用于API响应）"""
+    progress = row.completed / row.total if row.total else 0.0
+    return {
+        "id": row.id,
+        "kind": row.kind,
+        "owner_id": row.owner_id,
+        "params": row.params or {},
+        "status": row.status,
+        "total": row.total,
+        "completed": row.completed,
+        "progress": round(min(progress, 1.0), 4),
+        "result": row.result,
+        "error": row.error,
+        "created_at": row.created_at,
+        "started_at": row.started_at,
+        "finished_at": row.finished_at,
+    }
+
+
+class JobRegistry:
+    """
+    后台任务队列：本进程的有界线程池执行任务，任务状态保存在 background_jobs 表中，
+    因此任意 worker 都能查询、取消任务和推送进度，重启后也能看到历史任务
+
+    执行任务的进程每 sync_interval 秒把进度写入数据库（同时作为心跳），并读取其他进程的取消请求；
+    心跳超过 stale_after 秒未更新的未结束任务视为执行进程已退出，由同步线程标记为失败。
+    查询（包括进度事件流的轮询）只读数据库。
+    已结束的任务最多保留 history_limit 个，超出后按提交时间淘汰
+    """
+
+    def __init__(self, max_workers: int, history_limit: int, sync_interval: float, stale_after: float):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._history_limit = history_limit
+        self._sync_interval = sync_interval
+        self._stale_after = stale_after
+        # 本进程排队或执行中的任务
+        self._local: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sync_thread: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        kind: str,
+        func: Callable[[Job], Any],
+        owner_id: Optional[int] = None,
+        params: Optional[dict] = None
+    ) -> dict:
+        """
+        提交任务，func 接收 Job 对象，应通过 job.report_progress 汇报进度
+        返回任务的快照
+        """
+        job = Job(kind, owner_id, params)
+        now = utcnow()
+        db = SessionLocal()
+        try:
+            row = BackgroundJob(
+                id=job.id, kind=kind, owner_id=owner_id, params=job.params,
+                status=JobStatus.pending.value, runner=RUNNER_ID, created_at=now, updated_at=now
+            )
+            db.add(row)
+            self._prune(db)
+            db.commit()
+            snapshot = _snapshot(row)
+        finally:
+            db.close()
+
+        with self._lock:
+            self._local[job.id] = job
+        self._ensure_sync_thread()
+        self._executor.submit(self._run, job, func)
+        logger.info(f"Job {job.id} ({kind}) submitted")
+        return snapshot
+
+    def _update(self, job_id: str, condition=None, **values) -> bool:
+        """在单独的短事务中更新任务状态，返回是否更新了行"""
+        db = SessionLocal()
+        try:
+            stmt = update(BackgroundJob).where(BackgroundJob.id == job_id)
+            if condition is not None:
+                stmt = stmt.where(condition)
+            updated = db.execute(stmt.values(updated_at=utcnow(), **values)).rowcount
+            db.commit()
+            return updated > 0
+        finally:
+            db.close()
+
+    def _run(self, job: Job, func: Callable[[Job], Any]) -> None:
+        try:
+            # 排队期间已被取消（可能在其他进程中）的任务直接跳过
+            started = self._update(
+                job.id,
+                condition=BackgroundJob.status == JobStatus.pending.value,
+                status=JobStatus.running.value,
+                started_at=utcnow()
+            )
+            if not started:
+                return
+            try:
+                result = func(job)
+            except JobCancelled:
+                logger.info(f"Job {job.id} ({job.kind}) cancelled")
+                self._finish(job, JobStatus.cancelled)
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+                self._finish(job, JobStatus.failed, error=str(e))
+            else:
+                self._finish(job, JobStatus.succeeded, result=result)
+        except Exception as e:
+            logger.error(f"Failed to record state of job {job.id}: {e}")
+        finally:
+            with self._lock:
+                self._local.pop(job.id, None)
+
+    def _finish(
+        self,
+        job: Job,
+        status: JobStatus,
+        result: Optional[Any] = None,
+        error: Optional[str] = None
+    ) -> None:
+        completed, total = job.progress()
+        self._update(
+            job.id,
+            status=status.value,
+            completed=completed,
+            total=total,
+            result=result,
+            error=error,
+            finished_at=utcnow()
+        )
+
+    def _ensure_sync_thread(self) -> None:
+        with self._lock:
+            if self._sync_thread is None or not self._sync_thread.is_alive():
+                self._sync_thread = threading.Thread(target=self._sync_loop, name="job-sync", daemon=True)
+                self._sync_thread.start()
+
+    def _sync_loop(self) -> None:
+        last_expired = 0.0
+        while not self._stop_event.wait(self._sync_interval):
+            try:
+                self._sync_local_jobs()
+            except Exception as e:
+                logger.warning(f"Failed to sync job progress: {e}")
+            # 过期检查不需要每次同步都执行，间隔取心跳超时的一部分
+            now = time.monotonic()
+            if now - last_expired >= self._stale_after / 4:
+                last_expired = now
+                try:
+                    self._expire_stale()
+                except Exception as e:
+                    logger.warning(f"Failed to expire stale jobs: {e}")
+
+    def _sync_local_jobs(self) -> None:
+        """把本进程任务的进度写入数据库（心跳），并读取其他进程发出的取消请求"""
+        with self._lock:
+            jobs = list(self._local.values())
+        if not jobs:
+            return
+        db = SessionLocal()
+        try:
+            now = utcnow()
+            for job in jobs:
+                completed, total = job.progress()
+                db.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.id == job.id, BackgroundJob.status.in_(ACTIVE_STATUSES))
+                    .values(completed=completed, total=total, updated_at=now)
+                )
+            cancelled = db.execute(
+                select(BackgroundJob.id).where(
+                    BackgroundJob.id.in_([job.id for job in jobs]),
+                    BackgroundJob.cancel_requested.is_(True)
+                )
+            ).scalars().all()
+            db.commit()
+        finally:
+            db.close()
+        for job in jobs:
+            if job.id in cancelled:
+                job._cancel_event.set()
+
+    def _expire_stale(self) -> None:
+        """心跳超时的未结束任务（执行进程已退出）标记为失败（在同步线程中执行）"""
+        now = utcnow()
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(BackgroundJob)
+                .where(
+                    BackgroundJob.status.in_(ACTIVE_STATUSES),
+                    BackgroundJob.updated_at < now - timedelta(seconds=self._stale_after)
+                )
+                .values(status=JobStatus.failed.value, error=WORKER_LOST_ERROR, finished_at=now, updated_at=now)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _prune(self, db) -> None:
+        """淘汰最早的已结束任务（在调用方的事务中执行）"""
+        keep = select(BackgroundJob.id).where(
+            BackgroundJob.status.notin_(ACTIVE_STATUSES)
+        ).order_by(BackgroundJob.created_at.desc()).limit(self._history_limit)
+        db.query(BackgroundJob).filter(
+            BackgroundJob.status.notin_(ACTIVE_STATUSES),
+            BackgroundJob.id.notin_(keep.scalar_subquery())
+        ).delete(synchronize_session=False)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """返回任务的快照，不存在时返回 None"""
+        # 只执行过查询的进程也需要同步线程清理心跳超时的任务
+        self._ensure_sync_thread()
+        db = SessionLocal()
+        try:
+            row = db.get(BackgroundJob, job_id)
+            return _snapshot(row) if row else None
+        finally:
+            db.close()
+
+    def list_jobs(self, owner_id: Optional[int] = None) -> List[dict]:
+        """按提交时间倒序列出任务快照，指定 owner_id 时只返回该用户的任务"""
+        self._ensure_sync_thread()
+        db = SessionLocal()
+        try:
+            query = select(BackgroundJob).order_by(BackgroundJob.created_at.desc())
+            if owner_id is not None:
+                query = query.where(BackgroundJob.owner_id == owner_id)
+            return [_snapshot(row) for row in db.execute(query).scalars()]
+        finally:
+            db.close()
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        请求取消任务：排队中的任务直接标记为已取消，不会再执行；
+        执行中的任务由执行进程在下次同步时读取取消请求，并在下次汇报进度时中断
+        """
+        self._update(
+            job_id,
+            condition=BackgroundJob.status.in_(ACTIVE_STATUSES),
+            cancel_requested=True
+        )
+        self._update(
+            job_id,
+            condition=BackgroundJob.status == JobStatus.pending.value,
+            status=JobStatus.cancelled.value,
+            finished_at=utcnow()
+        )
+        with self._lock:
+            job = self._local.get(job_id)
+        if job is not None:
+            job._cancel_event.set()
+        return self.get(job_id)
+
+    def shutdown(self) -> None:
+        """取消本进程所有未结束的任务并关闭线程池（应用关闭时调用）"""
+        with self._lock:
+            job_ids = list(self._local.keys())
+        for job_id in job_ids:
+            try:
+                self.cancel(job_id)
+            except Exception as e:
+                logger.warning(f"Failed to cancel job {job_id} on shutdown: {e}")
+        self._stop_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_registry = JobRegistry(
+    max_workers=settings.job_max_workers,
+    history_limit=settings.job_history_limit,
+    sync_interval=settings.job_sync_seconds,
+    stale_after=settings.job_stale_seconds
+)
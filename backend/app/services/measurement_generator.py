@@ -1,15 +1,110 @@
-import random
 import math
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, List, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..core.database import SessionLocal
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, List, Tuple, Sequence, Union, Dict, Callable
+import numpy as np
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import func, insert
+from ..core.config import settings
+from ..core.database import SessionLocal, create_db_engine
 from ..models import CarbonZone, ZoneMeasurement, ZoneStatus
+from .job_service import JobCancelled
+from .bulk_writer import write_measurements
+from .measurement_service import (
+    as_utc, get_latest_measurements, record_measurement, record_measurements, refresh_zone_stats
+)
+from .rollup_service import refresh_recent_rollups, refresh_zone_rollups
+from .response_cache import invalidate_zones
 
 logger = logging.getLogger(__name__)
+# 进度回调：(已生成条数, 总条数)，可抛出 JobCancelled 中断生成
+ProgressCallback = Callable[[int, int], None]
+
+
+# ==================== 随机数流 ====================
+# 生成器不使用 random 模块的全局状态：随机游走等连续抽样使用每个区域独立的
+# numpy Generator；天气事件使用以 (seed, zone_id, 时间戳, 通道) 为键的计数器式
+# 哈希流，同一区域同一时刻的天气与生成顺序、线程无关，可复现、可并行。
+
+# 天气事件：0=正常（90%），1=干旱（5%），2=降雨（5%）
+WEATHER_NORMAL, WEATHER_DROUGHT, WEATHER_RAINY = 0, 1, 2
+WEATHER_CUMULATIVE_WEIGHTS = np.array([0.90, 0.95])
+# 天气事件对碳吸收量的乘数（正常/干旱/降雨）
+WEATHER_CARBON_MULTIPLIERS = np.array([1.0, 0.82, 1.12])
+
+# 天气流通道：NDVI与碳吸收量的天气事件相互独立
+WEATHER_CHANNEL_NDVI = 0
+WEATHER_CHANNEL_CARBON = 1
+
+# 未指定种子时天气流使用的默认种子
+DEFAULT_WEATHER_SEED = 0
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 终混函数（uint64 数组，溢出按模 2^64 回绕）"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def make_zone_rng(zone_id: int, seed: Optional[int] = None) -> np.random.Generator:
+    """
+    创建区域独立的随机数生成器
+    指定 seed 时由 (seed, zone_id) 派生，结果可复现；否则使用系统熵
+    """
+    if seed is None:
+        return np.random.default_rng()
+    return np.random.default_rng(np.random.SeedSequence([seed, zone_id]))
+
+
+def weather_uniforms(
+    zone_id: Union[int, np.ndarray],
+    timestamps: np.ndarray,
+    channel: int,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    计数器式随机流：对每个 (seed, zone_id, 时间戳, 通道) 返回 [0, 1) 上的均匀随机数
+    timestamps 为 datetime64 数组；zone_id 也可以是与 timestamps 等长（或单个时间点）的区域ID数组
+    """
+    if seed is None:
+        seed = DEFAULT_WEATHER_SEED
+    with np.errstate(over='ignore'):
+        zone_key = np.asarray(zone_id, dtype=np.uint64)
+        key = _mix64(np.array([seed], dtype=np.uint64) + _GOLDEN_GAMMA * zone_key)
+        key = _mix64(key + _GOLDEN_GAMMA * np.uint64(channel + 1))
+        counters = timestamps.astype('datetime64[s]').astype(np.int64).view(np.uint64)
+        bits = _mix64(counters ^ key)
+    return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def get_weather_events(
+    zone_id: Union[int, np.ndarray],
+    timestamps: np.ndarray,
+    channel: int,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """批量获取天气事件（0=正常，1=干旱，2=降雨）"""
+    uniforms = weather_uniforms(zone_id, timestamps, channel, seed)
+    return np.searchsorted(WEATHER_CUMULATIVE_WEIGHTS, uniforms, side='right')
+
+
+def get_weather_event(
+    zone_id: int,
+    timestamp: datetime,
+    channel: int,
+    seed: Optional[int] = None
+) -> int:
+    """获取单个时间点的天气事件"""
+    return int(get_weather_events(zone_id, to_datetime64([timestamp]), channel, seed)[0])
+
 
 # ==================== 辅助函数 ====================
 
@@ -146,29 +241,14 @@ def get_latitude_carbon_factor(latitude: Optional[float]) -> float:
         return 1.0 - 0.05 * min(1.0, (latitude - 35) / 20)  # 0.95-1.0
 
 
-def apply_weather_carbon_effect(
-    base_carbon: float, 
-    date: datetime,
-    ndvi: float
-) -> float:
+def apply_weather_carbon_effect(base_carbon: float, weather_event: int) -> float:
     """
     应用天气事件对碳吸收量的直接影响
-    与NDVI的天气影响同步（使用相同的随机种子或状态）
-    """
-    # 使用日期和NDVI的组合作为随机种子，确保与NDVI的天气影响一致
-    # 保存当前随机状态
-    random_state = random.getstate()
-    random.seed(int(date.timestamp()) + int(ndvi * 10000))
-    weather_event = random.choices(
-        ['normal', 'drought', 'rainy'],
-        weights=[0.90, 0.05, 0.05]
-    )[0]
-    # 恢复随机状态
-    random.setstate(random_state)
-    
-    if weather_event == 'drought':
+    天气事件由 get_weather_event 按 (区域, 时间戳) 确定，不修改全局随机状态
+    """
+    if weather_event == WEATHER_DROUGHT:
         return base_carbon * 0.82  # 下降18%
-    elif weather_event == 'rainy':
+    elif weather_event == WEATHER_RAINY:
         return base_carbon * 1.12  # 上升12%
     return base_carbon
 
@@ -186,7 +266,7 @@ def get_ecosystem_maturity_factor(zone: CarbonZone) -> float:
         return 1.0
     
     try:
-        age_years = (datetime.now() - zone.created_at).days / 365.0
+        age_years = (datetime.now(timezone.utc) - as_utc(zone.created_at)).days / 365.0
         
         if age_years < 1:
             return 0.8 + 0.1 * age_years  # 0.8-0.9
@@ -220,89 +300,150 @@ def calculate_base_carbon_rate(ndvi: float, ecosystem_type: str) -> float:
 
 
 def calculate_carbon_absorption(
-    ndvi: float, 
-    area: float, 
-    ecosystem_type: str,
+    ndvi: float,
     timestamp: datetime,
-    zone: CarbonZone
+    profile: "ZoneProfile",
+    rng: np.random.Generator,
+    seed: Optional[int] = None
 ) -> float:
     """
     优化后的碳吸收量计算（考虑多种因素）
     基于NDVI、面积、生态系统类型、时间、地理位置、成熟度等因素
+    区域相关因子（面积、规模效应、纬度、成熟度）取自区域画像
     """
     # 1. 基础速率（基于NDVI和生态系统类型）
-    base_rate = calculate_base_carbon_rate(ndvi, ecosystem_type)
+    base_rate = calculate_base_carbon_rate(ndvi, profile.ecosystem_type)
     
-    # 2. 面积调整（考虑规模效应）
-    area_hectares = area / 10000
-    area_factor = get_area_efficiency_factor(area_hectares)
-    
-    # 3. 季节性因子
+    # 2. 季节性因子
     seasonal_factor = get_seasonal_carbon_factor(timestamp)
     
-    # 4. 地理位置因子
-    latitude = get_latitude_from_coordinates(zone)
-    latitude_factor = get_latitude_carbon_factor(latitude)
-    
-    # 5. 生态系统成熟度因子
-    maturity_factor = get_ecosystem_maturity_factor(zone)
-    
-    # 6. 计算总碳吸收量
-    carbon_absorption = (
-        base_rate * 
-        area_hectares * 
-        area_factor * 
-        seasonal_factor * 
-        latitude_factor * 
-        maturity_factor
-    )
+    # 3. 计算总碳吸收量（面积、地理位置、成熟度因子已在画像中预先计算）
+    carbon_absorption = base_rate * seasonal_factor * profile.carbon_zone_factor
     
-    # 7. 应用天气事件影响
-    carbon_absorption = apply_weather_carbon_effect(
-        carbon_absorption, timestamp, ndvi
-    )
+    # 4. 应用天气事件影响
+    weather_event = get_weather_event(profile.zone_id, timestamp, WEATHER_CHANNEL_CARBON, seed)
+    carbon_absorption = apply_weather_carbon_effect(carbon_absorption, weather_event)
     
-    # 8. 添加小幅随机波动（±3%，因为已经有很多因子了）
-    carbon_absorption *= random.uniform(0.97, 1.03)
+    # 5. 添加小幅随机波动（±3%，因为已经有很多因子了）
+    carbon_absorption *= rng.uniform(0.97, 1.03)
     
     return max(0.00001, round(carbon_absorption, 6))
 
 
-def apply_weather_effect(base_ndvi: float, date: datetime) -> float:
+def apply_weather_effect(base_ndvi: float, weather_event: int) -> float:
     """
-    模拟天气事件对NDVI的影响
+    模拟天气事件对NDVI的影响（5%概率干旱，5%概率降雨）
     """
-    # 5%概率出现干旱，5%概率出现降雨
-    weather_event = random.choices(
-        ['normal', 'drought', 'rainy'],
-        weights=[0.90, 0.05, 0.05]
-    )[0]
-    
-    if weather_event == 'drought':
+    if weather_event == WEATHER_DROUGHT:
         return max(0.2, base_ndvi * 0.88)  # 下降12%
-    elif weather_event == 'rainy':
+    elif weather_event == WEATHER_RAINY:
         return min(0.95, base_ndvi * 1.08)  # 上升8%
     return base_ndvi
 
 
+# ==================== 区域画像缓存 ====================
+
+@dataclass(frozen=True, slots=True)
+class ZoneProfile:
+    """
+    区域画像：生成测量数据时用到的、与时间点无关的区域参数
+    每个区域只构建一次，生成器和定时任务使用它代替 ORM 的 CarbonZone
+    """
+    zone_id: int
+    version: int                # 区域属性指纹，名称/坐标/面积变化后随之变化
+    name: str
+    ecosystem_type: str
+    min_ndvi: float
+    max_ndvi: float
+    latitude: Optional[float]
+    area_hectares: float
+    area_factor: float
+    latitude_factor: float
+    maturity_factor: float
+    built_on: date              # 构建日期，成熟度因子按天刷新
+
+    @property
+    def carbon_zone_factor(self) -> float:
+        """面积、规模效应、纬度和成熟度因子的乘积"""
+        return self.area_hectares * self.area_factor * self.latitude_factor * self.maturity_factor
+
+
+_zone_profiles: Dict[int, ZoneProfile] = {}
+_zone_profiles_lock = threading.Lock()
+
+
+def get_zone_profile_version(zone: CarbonZone) -> int:
+    """计算区域属性指纹（用于判断缓存的画像是否过期）"""
+    return hash((zone.name, zone.coordinates, zone.area, zone.created_at))
+
+
+def build_zone_profile(zone: CarbonZone) -> ZoneProfile:
+    """根据 ORM 区域对象构建区域画像"""
+    ecosystem_type = infer_ecosystem_type(zone)
+    min_ndvi, max_ndvi = get_base_ndvi_range(zone, ecosystem_type)
+    latitude = get_latitude_from_coordinates(zone)
+    area_hectares = zone.area / 10000
+    return ZoneProfile(
+        zone_id=zone.id,
+        version=get_zone_profile_version(zone),
+        name=zone.name,
+        ecosystem_type=ecosystem_type,
+        min_ndvi=min_ndvi,
+        max_ndvi=max_ndvi,
+        latitude=latitude,
+        area_hectares=area_hectares,
+        area_factor=get_area_efficiency_factor(area_hectares),
+        latitude_factor=get_latitude_carbon_factor(latitude),
+        maturity_factor=get_ecosystem_maturity_factor(zone),
+        built_on=date.today()
+    )
+
+
+def get_zone_profile(zone: CarbonZone) -> ZoneProfile:
+    """
+    获取区域画像（带缓存）
+    缓存按区域ID存储，指纹不一致或跨天时重新构建
+    """
+    version = get_zone_profile_version(zone)
+    profile = _zone_profiles.get(zone.id)
+    if profile is not None and profile.version == version and profile.built_on == date.today():
+        return profile
+
+    profile = build_zone_profile(zone)
+    with _zone_profiles_lock:
+        _zone_profiles[zone.id] = profile
+    return profile
+
+
+def invalidate_zone_profile(zone_id: int) -> None:
+    """使指定区域的画像缓存失效（区域名称或坐标变更、区域删除时调用）"""
+    with _zone_profiles_lock:
+        _zone_profiles.pop(zone_id, None)
+
+
 # ==================== 核心生成函数 ====================
 
 def generate_measurement_at_time(
-    zone: CarbonZone,
+    profile: ZoneProfile,
     timestamp: datetime,
     previous_ndvi: Optional[float] = None,
-    ecosystem_type: Optional[str] = None
+    rng: Optional[np.random.Generator] = None,
+    seed: Optional[int] = None
 ) -> Tuple[float, float]:
     """
     为指定区域在指定时间生成测量数据
     
+    Args:
+        rng: 区域独立的随机数生成器，为None时按 seed 新建
+        seed: 随机种子（同时用于天气事件流）
+    
     返回: (ndvi, carbon_absorption)
     """
-    if ecosystem_type is None:
-        ecosystem_type = infer_ecosystem_type(zone)
+    if rng is None:
+        rng = make_zone_rng(profile.zone_id, seed)
     
     # 获取基础NDVI范围
-    min_ndvi, max_ndvi = get_base_ndvi_range(zone, ecosystem_type)
+    min_ndvi, max_ndvi = profile.min_ndvi, profile.max_ndvi
     
     # 计算季节性因子
     seasonal_factor = get_seasonal_factor(timestamp)
@@ -315,39 +456,251 @@ def generate_measurement_at_time(
     # 如果有历史数据，基于历史数据生成连续变化
     if previous_ndvi is not None:
         # 计算趋势（季节性变化）
-        target_ndvi = base_ndvi_range + (max_ndvi - min_ndvi) * 0.2 * random.uniform(-1, 1)
+        target_ndvi = base_ndvi_range + (max_ndvi - min_ndvi) * 0.2 * rng.uniform(-1, 1)
         # 平滑过渡（每次变化不超过5%）
         change_limit = abs(previous_ndvi) * 0.05
-        change = random.uniform(-change_limit, change_limit)
+        change = rng.uniform(-change_limit, change_limit)
         # 向目标值靠近
         direction = 1 if target_ndvi > previous_ndvi else -1
         change = direction * min(abs(change), abs(target_ndvi - previous_ndvi) * 0.3)
         ndvi = previous_ndvi + change
     else:
         # 初始NDVI
-        ndvi = base_ndvi_range + random.uniform(-0.1, 0.1) * (max_ndvi - min_ndvi)
+        ndvi = base_ndvi_range + rng.uniform(-0.1, 0.1) * (max_ndvi - min_ndvi)
     
     # 应用天气影响
-    ndvi = apply_weather_effect(ndvi, timestamp)
+    ndvi = apply_weather_effect(
+        ndvi, get_weather_event(profile.zone_id, timestamp, WEATHER_CHANNEL_NDVI, seed)
+    )
     
     # 确保在合理范围内
     ndvi = max(0.2, min(0.95, ndvi))
     ndvi = round(ndvi, 4)
     
     # 计算碳吸收量（使用优化后的函数，传递所有必要参数）
-    carbon_absorption = calculate_carbon_absorption(
-        ndvi, zone.area, ecosystem_type, timestamp, zone
-    )
+    carbon_absorption = calculate_carbon_absorption(ndvi, timestamp, profile, rng, seed)
     
     return (ndvi, carbon_absorption)
 
 
+# ==================== 批量向量化生成 ====================
+
+def _naive_utc(value: datetime) -> datetime:
+    # numpy 的 datetime64 不支持时区，带时区的时间先转换为不带时区的UTC时间
+    return as_utc(value).replace(tzinfo=None)
+
+
+def to_datetime64(timestamps: Union[Sequence[datetime], np.ndarray]) -> np.ndarray:
+    """将时间点序列转换为 datetime64[us] 数组（UTC）"""
+    if isinstance(timestamps, np.ndarray):
+        return timestamps.astype('datetime64[us]')
+    return np.asarray([_naive_utc(timestamp) for timestamp in timestamps], dtype='datetime64[us]')
+
+
+def get_months_array(timestamps: np.ndarray) -> np.ndarray:
+    """提取 datetime64 数组中每个时间点的月份（1-12）"""
+    return timestamps.astype('datetime64[M]').astype(np.int64) % 12 + 1
+
+
+def get_seasonal_factor_array(months: np.ndarray) -> np.ndarray:
+    """get_seasonal_factor 的向量化版本"""
+    seasonal = 0.5 + 0.4 * np.sin((months - 3) * np.pi / 6)
+    return np.clip(seasonal, 0.4, 1.0)
+
+
+def get_seasonal_carbon_factor_array(months: np.ndarray) -> np.ndarray:
+    """get_seasonal_carbon_factor 的向量化版本"""
+    seasonal = 0.95 + 0.25 * np.sin((months - 3) * np.pi / 6)
+    return np.clip(seasonal, 0.7, 1.2)
+
+
+def calculate_base_carbon_rate_array(ndvi: np.ndarray, ecosystem_type: str) -> np.ndarray:
+    """calculate_base_carbon_rate 的向量化版本"""
+    _, _, carbon_coeff = get_ecosystem_params(ecosystem_type)
+    return base_carbon_rate_from_coeff(ndvi, carbon_coeff)
+
+
+def base_carbon_rate_from_coeff(ndvi: np.ndarray, carbon_coeff: Union[float, np.ndarray]) -> np.ndarray:
+    """按碳吸收系数计算基础碳吸收速率（系数可以是与 ndvi 等长的数组，用于多个区域一起计算）"""
+    mid_rate = carbon_coeff * 0.5 * ((ndvi - 0.3) / 0.3)
+    # 先截断再求幂，避免低NDVI分支中出现负数的非整数次幂
+    high_rate = carbon_coeff * (0.5 + 0.5 * (np.clip(ndvi - 0.6, 0.0, None) / 0.4) ** 1.3)
+    return np.where(ndvi < 0.3, 0.00001, np.where(ndvi < 0.6, mid_rate, high_rate))
+
+
+def build_time_points(end_time: datetime, days: int, hours_interval: int) -> np.ndarray:
+    """
+    生成从 end_time 往前 days 天、按 hours_interval 小时间隔的时间点数组（UTC，datetime64）
+    起点对齐到UTC整点（00:00或12:00）
+    """
+    end_time = _naive_utc(end_time)
+    start_time = end_time - timedelta(days=days)
+    if start_time.hour < 12:
+        start_time = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        start_time = start_time.replace(hour=12, minute=0, second=0, microsecond=0)
+
+    step = np.timedelta64(hours_interval, 'h')
+    # arange 不包含终点，加1微秒以保留恰好等于 end_time 的时间点
+    return np.arange(
+        np.datetime64(start_time, 'us'),
+        np.datetime64(end_time, 'us') + np.timedelta64(1, 'us'),
+        step
+    )
+
+
+def generate_measurements_batch(
+    profile: ZoneProfile,
+    timestamps: Union[Sequence[datetime], np.ndarray],
+    previous_ndvi: Optional[float] = None,
+    rng: Optional[np.random.Generator] = None,
+    seed: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    为指定区域在一组时间点上批量生成测量数据（generate_measurement_at_time 的批量版本）
+
+    区域相关的因子（生态系统、NDVI范围、纬度、面积、成熟度）取自区域画像，
+    季节因子和随机数按数组一次性生成。NDVI随机游走每一步依赖上一步的结果，
+    因此仍按顺序递推，但循环内只剩纯浮点运算。输出分布与逐点生成一致。
+
+    Args:
+        rng: 区域独立的随机数生成器，为None时按 seed 新建
+        seed: 随机种子（同时用于天气事件流），相同种子生成相同的数据
+
+    返回: (ndvi数组, carbon_absorption数组)
+    """
+    if rng is None:
+        rng = make_zone_rng(profile.zone_id, seed)
+
+    timestamps = to_datetime64(timestamps)
+    n = len(timestamps)
+    if n == 0:
+        return np.empty(0), np.empty(0)
+
+    months = get_months_array(timestamps)
+
+    # ---------- NDVI ----------
+    min_ndvi, max_ndvi = profile.min_ndvi, profile.max_ndvi
+    ndvi_spread = max_ndvi - min_ndvi
+    base_ndvi = min_ndvi + ndvi_spread * (get_seasonal_factor_array(months) - 0.4) / 0.6
+
+    # 一次性抽取所有随机数
+    target_ndvi = (base_ndvi + ndvi_spread * 0.2 * rng.uniform(-1, 1, n)).tolist()
+    change_draws = rng.uniform(-1, 1, n).tolist()
+    initial_offset = rng.uniform(-0.1, 0.1) * ndvi_spread
+    ndvi_weather = get_weather_events(profile.zone_id, timestamps, WEATHER_CHANNEL_NDVI, seed).tolist()
+    base_ndvi = base_ndvi.tolist()
+
+    ndvi_values = []
+    previous = previous_ndvi
+    for i in range(n):
+        if previous is not None:
+            # 每次变化不超过5%，并向目标值靠近
+            change = abs(previous) * 0.05 * change_draws[i]
+            gap = target_ndvi[i] - previous
+            direction = 1 if gap > 0 else -1
+            value = previous + direction * min(abs(change), abs(gap) * 0.3)
+        else:
+            value = base_ndvi[i] + initial_offset
+
+        if ndvi_weather[i] == WEATHER_DROUGHT:
+            value = max(0.2, value * 0.88)
+        elif ndvi_weather[i] == WEATHER_RAINY:
+            value = min(0.95, value * 1.08)
+
+        value = round(max(0.2, min(0.95, value)), 4)
+        ndvi_values.append(value)
+        previous = value
+
+    ndvi = np.array(ndvi_values)
+
+    # ---------- 碳吸收量 ----------
+    carbon = (
+        calculate_base_carbon_rate_array(ndvi, profile.ecosystem_type) *
+        get_seasonal_carbon_factor_array(months) *
+        profile.carbon_zone_factor
+    )
+    carbon *= WEATHER_CARBON_MULTIPLIERS[
+        get_weather_events(profile.zone_id, timestamps, WEATHER_CHANNEL_CARBON, seed)
+    ]
+    carbon *= rng.uniform(0.97, 1.03, n)
+    carbon = np.maximum(0.00001, np.round(carbon, 6))
+
+    return ndvi, carbon
+
+
+def generate_measurements_for_profiles(
+    profiles: Sequence[ZoneProfile],
+    timestamp: datetime,
+    previous_ndvi: Sequence[Optional[float]],
+    rng: Optional[np.random.Generator] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    为多个区域在同一时间点各生成一条测量数据（定时任务使用，generate_measurement_at_time 的跨区域批量版本）
+
+    每个区域只有一步随机游走，因此所有区域可以在一次数组运算中完成，输出分布与逐个区域生成一致。
+
+    Args:
+        profiles: 区域画像
+        timestamp: 测量时间
+        previous_ndvi: 各区域最近一次的NDVI，没有历史数据时为None
+        rng: 随机数生成器，为None时使用系统熵新建
+
+    返回: (ndvi数组, carbon_absorption数组)，顺序与 profiles 一致
+    """
+    n = len(profiles)
+    if n == 0:
+        return np.empty(0), np.empty(0)
+    if rng is None:
+        rng = np.random.default_rng()
+
+    zone_ids = np.array([profile.zone_id for profile in profiles], dtype=np.int64)
+    timestamps = to_datetime64([timestamp])
+    month = get_months_array(timestamps)
+
+    # ---------- NDVI ----------
+    min_ndvi = np.array([profile.min_ndvi for profile in profiles])
+    ndvi_spread = np.array([profile.max_ndvi for profile in profiles]) - min_ndvi
+    base_ndvi = min_ndvi + ndvi_spread * (get_seasonal_factor_array(month) - 0.4) / 0.6
+
+    previous = np.array([np.nan if value is None else value for value in previous_ndvi], dtype=np.float64)
+    has_previous = ~np.isnan(previous)
+    target_ndvi = base_ndvi + ndvi_spread * 0.2 * rng.uniform(-1, 1, n)
+    change = np.abs(previous) * 0.05 * rng.uniform(-1, 1, n)
+    gap = target_ndvi - previous
+    direction = np.where(gap > 0, 1.0, -1.0)
+    walked = previous + direction * np.minimum(np.abs(change), np.abs(gap) * 0.3)
+    initial = base_ndvi + rng.uniform(-0.1, 0.1, n) * ndvi_spread
+    ndvi = np.where(has_previous, walked, initial)
+
+    ndvi_weather = get_weather_events(zone_ids, timestamps, WEATHER_CHANNEL_NDVI)
+    ndvi = np.where(ndvi_weather == WEATHER_DROUGHT, np.maximum(0.2, ndvi * 0.88), ndvi)
+    ndvi = np.where(ndvi_weather == WEATHER_RAINY, np.minimum(0.95, ndvi * 1.08), ndvi)
+    ndvi = np.round(np.clip(ndvi, 0.2, 0.95), 4)
+
+    # ---------- 碳吸收量 ----------
+    carbon_coeff = np.array([get_ecosystem_params(profile.ecosystem_type)[2] for profile in profiles])
+    zone_factor = np.array([profile.carbon_zone_factor for profile in profiles])
+    carbon = (
+        base_carbon_rate_from_coeff(ndvi, carbon_coeff) *
+        get_seasonal_carbon_factor_array(month) *
+        zone_factor
+    )
+    carbon *= WEATHER_CARBON_MULTIPLIERS[get_weather_events(zone_ids, timestamps, WEATHER_CHANNEL_CARBON)]
+    carbon *= rng.uniform(0.97, 1.03, n)
+    carbon = np.maximum(0.00001, np.round(carbon, 6))
+
+    return ndvi, carbon
+
+
 def generate_historical_measurements_for_zone(
     db: Session,
     zone: CarbonZone,
     days: int = 180,
     hours_interval: int = 12,
-    force_regenerate: bool = False
+    force_regenerate: bool = False,
+    seed: Optional[int] = None,
+    progress_callback: Optional[ProgressCallback] = None
 ) -> int:
     """
     为指定区域生成历史测量数据
@@ -358,6 +711,10 @@ def generate_historical_measurements_for_zone(
         days: 生成多少天的历史数据（默认180天，即半年）
         hours_interval: 测量间隔（小时，默认12小时）
         force_regenerate: 是否强制重新生成（删除旧数据）
+        seed: 随机种子，指定后同一区域、同一时间范围生成相同的数据
+        progress_callback: 进度回调，每写入一批数据调用一次
+    
+    整个区域的删除与写入在一个事务中完成（PostgreSQL 下通过 COPY 导入）
     
     Returns:
         生成的数据条数
@@ -371,76 +728,202 @@ def generate_historical_measurements_for_zone(
         logger.info(f"Zone {zone.id} already has {existing_count} measurements, skipping")
         return 0
     
-    # 如果强制重新生成，删除旧数据
-    if force_regenerate and existing_count > 0:
-        db.query(ZoneMeasurement).filter(
-            ZoneMeasurement.zone_id == zone.id
-        ).delete()
-        db.commit()
-        logger.info(f"Deleted {existing_count} existing measurements for zone {zone.id}")
-    
-    # 计算时间范围
-    end_time = datetime.now()
-    start_time = end_time - timedelta(days=days)
-    
-    # 生成时间点列表（每12小时一次）
-    time_points = []
-    current_time = start_time
-    # 对齐到整点（00:00或12:00）
-    if current_time.hour < 12:
-        current_time = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
-    else:
-        current_time = current_time.replace(hour=12, minute=0, second=0, microsecond=0)
-    
-    while current_time <= end_time:
-        time_points.append(current_time)
-        current_time += timedelta(hours=hours_interval)
-    
-    logger.info(f"Generating {len(time_points)} measurements for zone {zone.id} ({zone.name})")
-    
-    # 推断生态系统类型
-    ecosystem_type = infer_ecosystem_type(zone)
-    
-    # 批量生成数据
-    measurements = []
-    previous_ndvi = None
-    
-    for i, timestamp in enumerate(time_points):
-        ndvi, carbon_absorption = generate_measurement_at_time(
-            zone, timestamp, previous_ndvi, ecosystem_type
-        )
-        previous_ndvi = ndvi
-        
-        measurements.append({
+    # 生成时间点数组（每 hours_interval 小时一次，对齐到整点）
+    time_points = build_time_points(datetime.now(timezone.utc), days, hours_interval)
+    total_points = len(time_points)
+
+    logger.info(f"Generating {total_points} measurements for zone {zone.id} ({zone.name})")
+
+    # 一次性生成全部NDVI和碳吸收量
+    ndvi_values, carbon_values = generate_measurements_batch(
+        get_zone_profile(zone), time_points, seed=seed
+    )
+    rows = (
+        {
             'zone_id': zone.id,
             'ndvi': ndvi,
-            'carbon_absorption': carbon_absorption,
-            'timestamp': timestamp
-        })
-        
-        # 每100条记录批量插入一次
-        if len(measurements) >= 100:
-            db.bulk_insert_mappings(ZoneMeasurement, measurements)
-            db.commit()
-            measurements = []
-            if (i + 1) % 500 == 0:
-                logger.info(f"Generated {i + 1}/{len(time_points)} measurements for zone {zone.id}")
-    
-    # 插入剩余数据
-    if measurements:
-        db.bulk_insert_mappings(ZoneMeasurement, measurements)
+            'carbon_absorption': carbon,
+            'timestamp': timestamp.replace(tzinfo=timezone.utc)
+        }
+        for timestamp, ndvi, carbon in zip(
+            time_points.tolist(), ndvi_values.tolist(), carbon_values.tolist()
+        )
+    )
+
+    def on_chunk(written: int) -> None:
+        logger.info(f"Generated {written}/{total_points} measurements for zone {zone.id}")
+        if progress_callback:
+            progress_callback(written, total_points)
+
+    # 删除旧数据和写入新数据在同一个事务中完成，中途失败或取消时整体回滚
+    try:
+        if force_regenerate and existing_count > 0:
+            db.query(ZoneMeasurement).filter(
+                ZoneMeasurement.zone_id == zone.id
+            ).delete(synchronize_session=False)
+            logger.info(f"Deleting {existing_count} existing measurements for zone {zone.id}")
+
+        write_measurements(db, rows, on_chunk=on_chunk)
+        refresh_zone_stats(db, [zone.id])
+        refresh_zone_rollups(db, [zone.id])
         db.commit()
-    
-    total_generated = len(time_points)
+    except BaseException:
+        db.rollback()
+        raise
+
+    total_generated = total_points
     logger.info(f"Generated {total_generated} historical measurements for zone {zone.id}")
     return total_generated
 
 
+def _generate_historical_for_zones(
+    db: Session,
+    zone_ids: List[int],
+    days: int,
+    hours_interval: int,
+    force_regenerate: bool,
+    seed: Optional[int],
+    progress_callback: Optional[ProgressCallback] = None
+) -> dict:
+    """
+    在给定会话中依次为一组区域生成历史数据
+    进度按 (已处理条数, 预计总条数) 汇报，跳过的区域按其预计条数计入已处理
+
+    Returns:
+        {'total_measurements': int, 'zones': {zone_id: {...}}}
+    """
+    results = {'total_measurements': 0, 'zones': {}}
+    zones = db.query(CarbonZone).filter(CarbonZone.id.in_(zone_ids)).all()
+    points_per_zone = len(build_time_points(datetime.now(timezone.utc), days, hours_interval))
+    expected_total = points_per_zone * len(zones)
+
+    for index, zone in enumerate(zones):
+        zone_callback = None
+        if progress_callback:
+            offset = index * points_per_zone
+
+            def zone_callback(done: int, total: int, offset: int = offset) -> None:
+                progress_callback(offset + done, expected_total)
+
+        try:
+            count = generate_historical_measurements_for_zone(
+                db, zone, days, hours_interval, force_regenerate, seed, zone_callback
+            )
+            results['zones'][zone.id] = {
+                'name': zone.name,
+                'measurements_generated': count
+            }
+            results['total_measurements'] += count
+        except JobCancelled:
+            db.rollback()
+            raise
+        except Exception as e:
+            logger.error(f"Error generating historical data for zone {zone.id}: {e}")
+            db.rollback()
+            results['zones'][zone.id] = {
+                'name': zone.name,
+                'error': str(e)
+            }
+        if progress_callback:
+            progress_callback((index + 1) * points_per_zone, expected_total)
+    return results
+
+
+def _generate_historical_shard(
+    zone_ids: List[int],
+    days: int,
+    hours_interval: int,
+    force_regenerate: bool,
+    seed: Optional[int]
+) -> dict:
+    """
+    进程池工作函数：在子进程中使用独立的数据库引擎和会话处理一个分片的区域
+    """
+    shard_engine = create_db_engine()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)()
+    try:
+        return _generate_historical_for_zones(
+            db, zone_ids, days, hours_interval, force_regenerate, seed
+        )
+    finally:
+        db.close()
+        shard_engine.dispose()
+
+
+def _generate_historical_in_parallel(
+    zones: List[Tuple[int, str]],
+    workers: int,
+    days: int,
+    hours_interval: int,
+    force_regenerate: bool,
+    seed: Optional[int],
+    progress_callback: Optional[ProgressCallback] = None
+) -> dict:
+    """
+    将区域按ID轮转分片，交给进程池并行生成，并合并各分片结果
+    子进程无法回传逐条进度，进度在每个分片完成时汇报
+    """
+    shards = [
+        [zone_id for zone_id, _ in zones[i::workers]]
+        for i in range(workers)
+    ]
+    zone_names = dict(zones)
+    results = {'total_measurements': 0, 'zones': {}}
+    points_per_zone = len(build_time_points(datetime.now(timezone.utc), days, hours_interval))
+    expected_total = points_per_zone * len(zones)
+    finished_zones = 0
+
+    # 使用 spawn 启动子进程，避免 fork 继承父进程的连接池和调度线程的锁
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(
+                _generate_historical_shard,
+                shard, days, hours_interval, force_regenerate, seed
+            ): shard
+            for shard in shards if shard
+        }
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                shard_results = future.result()
+            except Exception as e:
+                logger.error(f"Historical generation worker failed for zones {shard}: {e}")
+                for zone_id in shard:
+                    results['zones'][zone_id] = {
+                        'name': zone_names[zone_id],
+                        'error': str(e)
+                    }
+            else:
+                results['zones'].update(shard_results['zones'])
+                results['total_measurements'] += shard_results['total_measurements']
+
+            finished_zones += len(shard)
+            # 子进程提交的数据不会触发本进程的缓存失效（分片失败时也可能已提交部分区域）
+            invalidate_zones(shard)
+            if progress_callback:
+                try:
+                    progress_callback(finished_zones * points_per_zone, expected_total)
+                except JobCancelled:
+                    # 尚未开始的分片不再执行，已在运行的子进程会完成当前分片
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+    # 按区域ID排序，使合并结果与串行模式一致
+    results['zones'] = dict(sorted(results['zones'].items()))
+    return results
+
+
 def generate_historical_measurements_for_all_zones(
     days: int = 180,
     hours_interval: int = 12,
     force_regenerate: bool = False,
-    zone_ids: Optional[List[int]] = None
+    zone_ids: Optional[List[int]] = None,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    progress_callback: Optional[ProgressCallback] = None
 ) -> dict:
     """
     为所有活跃的监测区生成历史数据
@@ -450,48 +933,50 @@ def generate_historical_measurements_for_all_zones(
         hours_interval: 测量间隔（小时）
         force_regenerate: 是否强制重新生成
         zone_ids: 指定区域ID列表，如果为None则处理所有活跃区域
+        seed: 随机种子（各区域的随机流由 seed 和区域ID共同派生）
+        workers: 并行进程数，为None时使用配置项 historical_generation_workers；
+                 大于1时区域分片到进程池中并行生成，每个进程使用独立的数据库连接
+        progress_callback: 进度回调 (已处理条数, 预计总条数)
     
     Returns:
         生成结果统计
     """
+    if workers is None:
+        workers = settings.historical_generation_workers
+
     db = SessionLocal()
     try:
-        query = db.query(CarbonZone).filter(CarbonZone.status == ZoneStatus.active)
+        query = db.query(CarbonZone.id, CarbonZone.name).filter(
+            CarbonZone.status == ZoneStatus.active
+        )
         if zone_ids:
             query = query.filter(CarbonZone.id.in_(zone_ids))
         
-        active_zones = query.all()
+        active_zones = [(zone_id, name) for zone_id, name in query.order_by(CarbonZone.id).all()]
         
         if not active_zones:
             logger.info("No active zones found")
             return {'total_zones': 0, 'total_measurements': 0, 'zones': {}}
-        
-        results = {
-            'total_zones': len(active_zones),
-            'total_measurements': 0,
-            'zones': {}
-        }
-        
-        for zone in active_zones:
-            try:
-                count = generate_historical_measurements_for_zone(
-                    db, zone, days, hours_interval, force_regenerate
-                )
-                results['zones'][zone.id] = {
-                    'name': zone.name,
-                    'measurements_generated': count
-                }
-                results['total_measurements'] += count
-            except Exception as e:
-                logger.error(f"Error generating historical data for zone {zone.id}: {e}")
-                results['zones'][zone.id] = {
-                    'name': zone.name,
-                    'error': str(e)
-                }
+
+        workers = max(1, min(workers, len(active_zones)))
+        if workers > 1:
+            logger.info(f"Generating historical data for {len(active_zones)} zones with {workers} worker processes")
+            results = _generate_historical_in_parallel(
+                active_zones, workers, days, hours_interval, force_regenerate, seed,
+                progress_callback
+            )
+        else:
+            results = _generate_historical_for_zones(
+                db, [zone_id for zone_id, _ in active_zones],
+                days, hours_interval, force_regenerate, seed, progress_callback
+            )
+        results['total_zones'] = len(active_zones)
         
         logger.info(f"Generated historical data: {results['total_measurements']} measurements for {results['total_zones']} zones")
         return results
         
+    except JobCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error in generate_historical_measurements_for_all_zones: {e}")
         raise
@@ -506,7 +991,7 @@ def generate_mock_measurement_for_zone(db: Session, zone: CarbonZone, timestamp:
     为指定区域生成模拟监测数据（增强版，保持向后兼容）
     """
     if timestamp is None:
-        timestamp = datetime.now()
+        timestamp = datetime.now(timezone.utc)
     
     # 获取该区域的最新测量数据
     latest_measurement = db.query(ZoneMeasurement).filter(
@@ -515,9 +1000,9 @@ def generate_mock_measurement_for_zone(db: Session, zone: CarbonZone, timestamp:
     
     previous_ndvi = latest_measurement.ndvi if latest_measurement else None
     
-    # 使用增强的生成函数
+    # 使用增强的生成函数（区域参数取自缓存的区域画像）
     ndvi, carbon_absorption = generate_measurement_at_time(
-        zone, timestamp, previous_ndvi
+        get_zone_profile(zone), timestamp, previous_ndvi
     )
     
     measurement = ZoneMeasurement(
@@ -528,6 +1013,8 @@ def generate_mock_measurement_for_zone(db: Session, zone: CarbonZone, timestamp:
     )
     
     db.add(measurement)
+    db.flush()
+    record_measurement(db, measurement)
     db.commit()
     db.refresh(measurement)
     
@@ -535,8 +1022,197 @@ def generate_mock_measurement_for_zone(db: Session, zone: CarbonZone, timestamp:
     return measurement
 
 
-def generate_measurements_for_active_zones():
-    """为所有活跃的监测区生成模拟监测数据"""
+# ==================== 停机补齐 ====================
+
+# 定时任务生成测量数据的间隔（小时），与调度周期一致
+MEASUREMENT_INTERVAL_HOURS = 12
+
+
+def build_gap_time_points(
+    last_timestamp: datetime,
+    until: datetime,
+    hours_interval: int = MEASUREMENT_INTERVAL_HOURS,
+    max_days: Optional[int] = None
+) -> List[datetime]:
+    """
+    计算 last_timestamp 之后、until 之前缺失的时间点（UTC，沿用最后一条数据的间隔相位）
+    距 until 不足半个间隔的时间点留给本次定时生成；max_days 限制最多补齐多少天
+    """
+    last_timestamp, until = as_utc(last_timestamp), as_utc(until)
+    step = timedelta(hours=hours_interval)
+    end = until - step / 2
+    start = last_timestamp + step
+    if max_days is not None:
+        earliest = until - timedelta(days=max_days)
+        if start < earliest:
+            start += ((earliest - start) // step + 1) * step
+    if start > end:
+        return []
+    return [start + i * step for i in range((end - start) // step + 1)]
+
+
+def fill_measurement_gaps(
+    db: Session,
+    zones: Sequence[CarbonZone],
+    until: Optional[datetime] = None,
+    hours_interval: int = MEASUREMENT_INTERVAL_HOURS,
+    max_days: Optional[int] = None,
+    chunk_rows: Optional[int] = None
+) -> dict:
+    """
+    补齐停机期间缺失的测量数据
+
+    - 各区域的最新测量时间和NDVI通过一次查询取得，没有任何数据的区域不处理（由历史数据生成负责）
+    - 每个区域的缺失时间点沿用历史数据生成的批量路径，从最新NDVI继续随机游走
+    - 按 chunk_rows 行分批写入（PostgreSQL 下通过 COPY）并分别提交，长时间停机不会产生超大事务；
+      每批写入后重新计算该批区域的汇总统计和聚合，某一批失败时只影响该批中的区域
+
+    返回: {"generated": 补齐的条数, "zone_ids": 补齐了数据的区域ID, "failed_zones": {区域ID: 错误信息}}
+    """
+    if until is None:
+        until = datetime.now(timezone.utc)
+    if max_days is None:
+        max_days = settings.measurement_catch_up_max_days
+    if chunk_rows is None:
+        chunk_rows = settings.measurement_catch_up_chunk_rows
+    result = {"generated": 0, "zone_ids": [], "failed_zones": {}}
+    if max_days <= 0 or not zones:
+        return result
+
+    latest = get_latest_measurements(db, [zone.id for zone in zones])
+    pending_rows: List[dict] = []
+    pending_zones: Dict[int, datetime] = {}
+
+    def flush() -> None:
+        if not pending_rows:
+            return
+        try:
+            write_measurements(db, pending_rows)
+            refresh_zone_stats(db, pending_zones)
+            refresh_zone_rollups(db, list(pending_zones), since=min(pending_zones.values()))
+            db.commit()
+            result["generated"] += len(pending_rows)
+            result["zone_ids"].extend(pending_zones)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error writing catch-up measurements for zones {list(pending_zones)}: {e}")
+            for zone_id in pending_zones:
+                result["failed_zones"][zone_id] = str(e)
+        pending_rows.clear()
+        pending_zones.clear()
+
+    for zone in zones:
+        if zone.id not in latest:
+            continue
+        last_timestamp, last_ndvi = latest[zone.id]
+        try:
+            time_points = build_gap_time_points(last_timestamp, until, hours_interval, max_days)
+            if not time_points:
+                continue
+            ndvi_values, carbon_values = generate_measurements_batch(
+                get_zone_profile(zone), time_points, previous_ndvi=last_ndvi
+            )
+        except Exception as e:
+            logger.error(f"Error generating catch-up measurements for zone {zone.id}: {e}")
+            result["failed_zones"][zone.id] = str(e)
+            continue
+
+        pending_rows.extend(
+            {
+                "zone_id": zone.id,
+                "ndvi": ndvi,
+                "carbon_absorption": carbon,
+                "timestamp": timestamp,
+            }
+            for timestamp, ndvi, carbon in zip(time_points, ndvi_values.tolist(), carbon_values.tolist())
+        )
+        pending_zones[zone.id] = time_points[0]
+        logger.info(f"Catching up {len(time_points)} missed measurements for zone {zone.id} since {last_timestamp}")
+        if len(pending_rows) >= chunk_rows:
+            flush()
+    flush()
+    return result
+
+
+def _insert_tick_rows(db: Session, rows: List[dict]) -> None:
+    """插入一批测量数据（每个区域一条）并计入汇总统计，不提交事务"""
+    inserted = db.execute(
+        insert(ZoneMeasurement).returning(ZoneMeasurement.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    record_measurements(db, [{**row, "id": measurement_id} for row, measurement_id in zip(rows, inserted)])
+
+
+def generate_tick_measurements(
+    db: Session,
+    zones: Sequence[CarbonZone],
+    timestamp: Optional[datetime] = None
+) -> dict:
+    """
+    定时任务的一次批量生成：为每个区域在同一时间点生成一条测量数据
+
+    - 各区域最近的NDVI通过一次查询取得（以汇总表的最新测量ID为索引）
+    - 所有区域在一次向量化计算中生成，一条多行 INSERT 写入，统计在同一事务中更新
+    - 整批写入失败时回滚并逐个区域重试，失败的区域不影响其他区域
+
+    返回: {"generated": 成功条数, "zone_ids": 写入成功的区域ID, "failed_zones": {区域ID: 错误信息}}
+    """
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc)
+    failed_zones: Dict[int, str] = {}
+
+    profiles = []
+    for zone in zones:
+        try:
+            profiles.append(get_zone_profile(zone))
+        except Exception as e:
+            failed_zones[zone.id] = str(e)
+    if not profiles:
+        return {"generated": 0, "zone_ids": [], "failed_zones": failed_zones}
+
+    latest = get_latest_measurements(db, [profile.zone_id for profile in profiles])
+    ndvi, carbon = generate_measurements_for_profiles(
+        profiles, timestamp, [latest[profile.zone_id][1] if profile.zone_id in latest else None for profile in profiles]
+    )
+    rows = [
+        {
+            "zone_id": profile.zone_id,
+            "ndvi": float(ndvi[i]),
+            "carbon_absorption": float(carbon[i]),
+            "timestamp": timestamp,
+        }
+        for i, profile in enumerate(profiles)
+    ]
+
+    try:
+        _insert_tick_rows(db, rows)
+        db.commit()
+        return {
+            "generated": len(rows),
+            "zone_ids": [row["zone_id"] for row in rows],
+            "failed_zones": failed_zones
+        }
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Batch measurement insert failed, retrying zone by zone: {e}")
+
+    zone_ids = []
+    for row in rows:
+        try:
+            _insert_tick_rows(db, [row])
+            db.commit()
+            zone_ids.append(row["zone_id"])
+        except Exception as e:
+            db.rollback()
+            failed_zones[row["zone_id"]] = str(e)
+    return {"generated": len(zone_ids), "zone_ids": zone_ids, "failed_zones": failed_zones}
+
+
+def generate_measurements_for_active_zones() -> Optional[dict]:
+    """
+    为所有活跃的监测区生成模拟监测数据（一次批量生成，见 generate_tick_measurements）
+    停机导致缺失的时间点先由 fill_measurement_gaps 补齐
+    """
     # #region agent log
     import json, time, urllib.request, traceback
     def _agent_log(payload):
@@ -571,21 +1247,40 @@ def generate_measurements_for_active_zones():
 
         if not active_zones:
             logger.info("No active zones found, skipping measurement generation")
-            return
+            return {"generated": 0, "zone_ids": [], "failed_zones": {}}
 
-        generated_count = 0
-        for zone in active_zones:
-            try:
-                generate_mock_measurement_for_zone(db, zone)
-                generated_count += 1
-            except Exception as e:
-                logger.error(f"Error generating measurement for zone {zone.id}: {e}")
+        # 测量时间统一写入带时区的UTC时间，与数据库端按UTC截断的时间桶一致
+        timestamp = datetime.now(timezone.utc)
+        # 先补齐停机期间错过的周期，本次的数据从补齐后的最新NDVI继续
+        catch_up = fill_measurement_gaps(db, active_zones, until=timestamp)
+        if catch_up["generated"]:
+            logger.info(f"Caught up {catch_up['generated']} missed measurements for {len(catch_up['zone_ids'])} zones")
+
+        result = generate_tick_measurements(db, active_zones, timestamp)
+        generated_count = result["generated"]
+        result["caught_up"] = catch_up["generated"]
+        result["zone_ids"] = sorted(set(result["zone_ids"]) | set(catch_up["zone_ids"]))
+        result["failed_zones"] = {**catch_up["failed_zones"], **result["failed_zones"]}
 
         logger.info(f"Generated measurements for {generated_count} active zones")
+        if result["failed_zones"]:
+            logger.error(f"Measurement generation failed for zones: {result['failed_zones']}")
         # #region agent log
         _agent_log({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"backend/app/services/measurement_generator.py:generate_measurements_for_active_zones","message":"generate_measurements_for_active_zones completed","data":{"generated_count":generated_count},"timestamp":int(time.time()*1000)})
         # #endregion
+        return result
     except Exception as e:
         logger.error(f"Error in generate_measurements_for_active_zones: {e}")
     finally:
         db.close()
+
+
+def generate_measurements_and_rollups() -> List[int]:
+    """
+    定时任务：生成活跃区域的测量数据，随后增量刷新日/周/月聚合
+    在调度器的子进程中执行，返回数据有变化的区域ID，由调度进程使对应的缓存失效
+    """
+    result = generate_measurements_for_active_zones() or {}
+    zone_ids = set(result.get("zone_ids", []))
+    zone_ids.update(refresh_recent_rollups())
+    return sorted(zone_ids)
@@ -1,15 +1,257 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..models import ZoneMeasurement
-from ..schemas import ZoneStats
+from sqlalchemy import DateTime, bindparam, case, func, select, type_coerce
+from ..core.cache import create_cache, memoize
+from ..core.config import settings
+from ..core.database import dialect_insert
+from ..models import ZoneMeasurement, ZoneMeasurementStats, ZoneMeasurementRollup
+from ..schemas import ZoneStats, ChartBucket
+from ..utils.downsampling import lttb_indices
+from .response_cache import mark_zones_changed, on_zones_invalidated
 
+# 各时间桶的近似长度（秒），用于自动选择时间桶
+CHART_BUCKET_SECONDS = {
+    ChartBucket.hour: 3600,
+    ChartBucket.day: 86400,
+    ChartBucket.week: 7 * 86400,
+    ChartBucket.month: 30 * 86400,
+}
+
+# 维护聚合表（zone_measurement_rollups）的时间桶
+ROLLUP_BUCKETS = (ChartBucket.day, ChartBucket.week, ChartBucket.month)
+
+# SQLite 没有 date_trunc，用 strftime 截断到桶起点
+# 输出格式与 SQLAlchemy 在 SQLite 中存储 DateTime 的格式一致，保证字符串比较正确
+SQLITE_BUCKET_EXPRESSIONS = {
+    ChartBucket.hour: lambda column: func.strftime("%Y-%m-%d %H:00:00.000000", column),
+    ChartBucket.day: lambda column: func.strftime("%Y-%m-%d 00:00:00.000000", column),
+    # 先回退6天再前进到周一，得到所在周的周一（与 PostgreSQL 的 date_trunc('week') 一致）
+    ChartBucket.week: lambda column: func.strftime("%Y-%m-%d 00:00:00.000000", column, "-6 days", "weekday 1"),
+    ChartBucket.month: lambda column: func.strftime("%Y-%m-01 00:00:00.000000", column),
+}
+
+
+# 区域统计和最近测量点图表数据的缓存，区域有新数据的事务提交后失效
+zone_stats_cache = create_cache("zone_stats", settings.service_cache_size, settings.service_cache_ttl_seconds)
+zone_chart_cache = create_cache("zone_chart", settings.service_cache_size, settings.service_cache_ttl_seconds)
+
+
+@on_zones_invalidated
+def _invalidate_zone_caches(zone_ids: List[int]) -> None:
+    for zone_id in zone_ids:
+        zone_stats_cache.delete(zone_id)
+        zone_chart_cache.delete_prefix(zone_id)
+
+
+# ==================== 汇总统计维护 ====================
+
+def _zone_stats_query(zone_ids: List[int]):
+    """从原始数据聚合各区域的条数、求和及最新一条测量（同步/异步会话共用）"""
+    totals = (
+        select(
+            ZoneMeasurement.zone_id,
+            func.count(ZoneMeasurement.id).label("measurements_count"),
+            func.sum(ZoneMeasurement.carbon_absorption).label("carbon_sum"),
+            func.sum(ZoneMeasurement.ndvi).label("ndvi_sum"),
+        )
+        .where(ZoneMeasurement.zone_id.in_(zone_ids))
+        .group_by(ZoneMeasurement.zone_id)
+        .subquery()
+    )
+    ranked = (
+        select(
+            ZoneMeasurement.zone_id,
+            ZoneMeasurement.id,
+            ZoneMeasurement.timestamp,
+            func.row_number().over(
+                partition_by=ZoneMeasurement.zone_id,
+                order_by=(ZoneMeasurement.timestamp.desc(), ZoneMeasurement.id.desc())
+            ).label("rank"),
+        )
+        .where(ZoneMeasurement.zone_id.in_(zone_ids))
+        .subquery()
+    )
+    return select(
+        totals.c.zone_id,
+        totals.c.measurements_count,
+        totals.c.carbon_sum,
+        totals.c.ndvi_sum,
+        ranked.c.timestamp,
+        ranked.c.id,
+    ).join(
+        ranked, (ranked.c.zone_id == totals.c.zone_id) & (ranked.c.rank == 1)
+    )
 
-def get_zone_stats(db: Session, zone_id: int) -> ZoneStats:
-    """获取碳汇监测区的统计数据"""
-    # 查询该区域的所有测量数据
-    measurements = db.query(ZoneMeasurement).filter(ZoneMeasurement.zone_id == zone_id).all()
 
+def _zone_stats_values(zone_ids: List[int], rows) -> Dict[int, dict]:
+    """将聚合结果转换为汇总行的列值（没有数据的区域为空统计）"""
+    values = {
+        zone_id: {
+            "zone_id": zone_id,
+            "measurements_count": 0,
+            "carbon_sum": 0.0,
+            "ndvi_sum": 0.0,
+            "latest_timestamp": None,
+            "latest_measurement_id": None,
+        }
+        for zone_id in zone_ids
+    }
+    for zone_id, count, carbon_sum, ndvi_sum, latest_timestamp, latest_id in rows:
+        values[zone_id].update(
+            measurements_count=count,
+            carbon_sum=carbon_sum,
+            ndvi_sum=ndvi_sum,
+            latest_timestamp=latest_timestamp,
+            latest_measurement_id=latest_id,
+        )
+    return values
+
+
+def refresh_zone_stats(db: Session, zone_ids: Iterable[int]) -> None:
+    """
+    根据 zone_measurements 重新计算指定区域的汇总统计（不提交事务）
+    用于批量写入、删除数据之后，以及汇总行缺失时的初始化
+    """
+    zone_ids = list(set(zone_ids))
+    if not zone_ids:
+        return
+
+    values = _zone_stats_values(zone_ids, db.execute(_zone_stats_query(zone_ids)).all())
+    stmt = dialect_insert(db, ZoneMeasurementStats).values(list(values.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ZoneMeasurementStats.zone_id],
+        set_={
+            "measurements_count": stmt.excluded.measurements_count,
+            "carbon_sum": stmt.excluded.carbon_sum,
+            "ndvi_sum": stmt.excluded.ndvi_sum,
+            "latest_timestamp": stmt.excluded.latest_timestamp,
+            "latest_measurement_id": stmt.excluded.latest_measurement_id,
+            "updated_at": func.now(),
+        }
+    )
+    db.execute(stmt)
+    mark_zones_changed(db, zone_ids)
+
+
+def record_measurement(db: Session, measurement: ZoneMeasurement) -> None:
+    """
+    将一条新写入（已 flush）的测量数据增量计入汇总统计（不提交事务）
+    汇总行不存在时从原始数据完整计算一次
+    """
+    table = ZoneMeasurementStats.__table__
+    is_latest = (
+        table.c.latest_timestamp.is_(None) |
+        (table.c.latest_timestamp <= measurement.timestamp)
+    )
+    result = db.execute(
+        table.update()
+        .where(table.c.zone_id == measurement.zone_id)
+        .values(
+            measurements_count=table.c.measurements_count + 1,
+            carbon_sum=table.c.carbon_sum + measurement.carbon_absorption,
+            ndvi_sum=table.c.ndvi_sum + measurement.ndvi,
+            latest_timestamp=case((is_latest, measurement.timestamp), else_=table.c.latest_timestamp),
+            latest_measurement_id=case((is_latest, measurement.id), else_=table.c.latest_measurement_id),
+            updated_at=func.now(),
+        )
+    )
+    mark_zones_changed(db, [measurement.zone_id])
+    if result.rowcount == 0:
+        refresh_zone_stats(db, [measurement.zone_id])
+
+
+def record_measurements(db: Session, measurements: Sequence[dict]) -> None:
+    """
+    将一批新写入的测量数据（含 id，每个区域至多一条）增量计入汇总统计（不提交事务）
+    汇总行已存在的区域用一条 executemany 的 UPDATE 更新，不存在的区域从原始数据完整计算
+    """
     if not measurements:
+        return
+    zone_ids = [m["zone_id"] for m in measurements]
+    existing = set(db.execute(
+        select(ZoneMeasurementStats.zone_id).where(ZoneMeasurementStats.zone_id.in_(zone_ids))
+    ).scalars())
+
+    table = ZoneMeasurementStats.__table__
+    is_latest = (
+        table.c.latest_timestamp.is_(None) |
+        (table.c.latest_timestamp <= bindparam("m_timestamp", type_=DateTime(timezone=True)))
+    )
+    params = [
+        {
+            "m_zone_id": m["zone_id"],
+            "m_id": m["id"],
+            "m_ndvi": m["ndvi"],
+            "m_carbon": m["carbon_absorption"],
+            "m_timestamp": m["timestamp"],
+        }
+        for m in measurements if m["zone_id"] in existing
+    ]
+    if params:
+        db.execute(
+            table.update()
+            .where(table.c.zone_id == bindparam("m_zone_id"))
+            .values(
+                measurements_count=table.c.measurements_count + 1,
+                carbon_sum=table.c.carbon_sum + bindparam("m_carbon"),
+                ndvi_sum=table.c.ndvi_sum + bindparam("m_ndvi"),
+                latest_timestamp=case((is_latest, bindparam("m_timestamp")), else_=table.c.latest_timestamp),
+                latest_measurement_id=case((is_latest, bindparam("m_id")), else_=table.c.latest_measurement_id),
+                updated_at=func.now(),
+            ),
+            params
+        )
+        mark_zones_changed(db, existing)
+    refresh_zone_stats(db, set(zone_ids) - existing)
+
+
+def get_latest_measurements(db: Session, zone_ids: Sequence[int]) -> Dict[int, Tuple[datetime, float]]:
+    """
+    一次查询获取多个区域最新一条测量的 (时间, NDVI)（没有数据的区域不在结果中）
+    优先通过汇总表的 latest_measurement_id 按主键读取，汇总行缺失的区域再按时间倒序取第一条
+    """
+    zone_ids = list(zone_ids)
+    if not zone_ids:
+        return {}
+    result = {
+        zone_id: (timestamp, ndvi)
+        for zone_id, timestamp, ndvi in db.execute(
+            select(ZoneMeasurementStats.zone_id, ZoneMeasurement.timestamp, ZoneMeasurement.ndvi)
+            .join(ZoneMeasurement, ZoneMeasurement.id == ZoneMeasurementStats.latest_measurement_id)
+            .where(ZoneMeasurementStats.zone_id.in_(zone_ids))
+        )
+    }
+
+    missing = [zone_id for zone_id in zone_ids if zone_id not in result]
+    if missing:
+        ranked = (
+            select(
+                ZoneMeasurement.zone_id,
+                ZoneMeasurement.timestamp,
+                ZoneMeasurement.ndvi,
+                func.row_number().over(
+                    partition_by=ZoneMeasurement.zone_id,
+                    order_by=(ZoneMeasurement.timestamp.desc(), ZoneMeasurement.id.desc())
+                ).label("rank"),
+            )
+            .where(ZoneMeasurement.zone_id.in_(missing))
+            .subquery()
+        )
+        for zone_id, timestamp, ndvi in db.execute(
+            select(ranked.c.zone_id, ranked.c.timestamp, ranked.c.ndvi).where(ranked.c.rank == 1)
+        ):
+            result[zone_id] = (timestamp, ndvi)
+    return result
+
+
+# ==================== 查询 ====================
+
+def _build_zone_stats(stats: ZoneMeasurementStats, latest_measurement) -> ZoneStats:
+    """将汇总行转换为 ZoneStats"""
+    if not stats.measurements_count:
         return ZoneStats(
             total_carbon_absorption=0.0,
             average_ndvi=0.0,
@@ -17,30 +259,372 @@ def get_zone_stats(db: Session, zone_id: int) -> ZoneStats:
             latest_measurement=None
         )
 
-    # 计算统计数据
-    total_carbon = sum(m.carbon_absorption for m in measurements)
-    avg_ndvi = sum(m.ndvi for m in measurements) / len(measurements)
-    latest_measurement = max(measurements, key=lambda m: m.timestamp)
-
     return ZoneStats(
-        total_carbon_absorption=round(total_carbon, 6),
-        average_ndvi=round(avg_ndvi, 4),
-        measurements_count=len(measurements),
+        total_carbon_absorption=round(stats.carbon_sum, 6),
+        average_ndvi=round(stats.ndvi_sum / stats.measurements_count, 4),
+        measurements_count=stats.measurements_count,
         latest_measurement=latest_measurement
     )
 
 
-def get_zone_measurements_chart_data(db: Session, zone_id: int, limit: int = 10):
-    """获取区域测量数据的图表数据"""
-    measurements = db.query(ZoneMeasurement).filter(
+def _stats_with_latest_query(zone_ids: List[int]):
+    """一次查询多个区域的汇总行及其最新测量记录（同步/异步会话共用）"""
+    return (
+        select(ZoneMeasurementStats, ZoneMeasurement)
+        .outerjoin(ZoneMeasurement, ZoneMeasurement.id == ZoneMeasurementStats.latest_measurement_id)
+        .where(ZoneMeasurementStats.zone_id.in_(zone_ids))
+    )
+
+
+def _recent_measurements_query(zone_id: int, limit: int):
+    return select(ZoneMeasurement).where(
         ZoneMeasurement.zone_id == zone_id
-    ).order_by(ZoneMeasurement.timestamp.desc()).limit(limit).all()
+    ).order_by(ZoneMeasurement.timestamp.desc()).limit(limit)
 
-    # 反转以按时间正序排列
-    measurements.reverse()
 
+def _build_chart_data(measurements: List[ZoneMeasurement]) -> dict:
+    # 查询结果按时间倒序，反转以按时间正序排列
+    measurements = list(reversed(measurements))
     return {
         "timestamps": [m.timestamp for m in measurements],
         "ndvi_values": [m.ndvi for m in measurements],
         "carbon_values": [m.carbon_absorption for m in measurements]
-    }
\ No newline at end of file
+    }
+
+
+def _split_cached_zone_stats(zone_ids: List[int]) -> Tuple[Dict[int, ZoneStats], List[int], int]:
+    """
+    从缓存取出已有的区域统计，返回 (已缓存的统计, 需要查询的区域ID, 查询前的缓存代数)
+    查询期间缓存被失效时查询结果不写入缓存
+    """
+    result = {}
+    uncached = []
+    for zone_id in zone_ids:
+        stats = zone_stats_cache.get(zone_id)
+        if stats is None:
+            uncached.append(zone_id)
+        else:
+            result[zone_id] = stats
+    # 全部命中时不需要代数（共享缓存后端上省去一次读取）
+    generation = zone_stats_cache.generation() if uncached else 0
+    return result, uncached, generation
+
+
+def _cache_zone_stats(result: Dict[int, ZoneStats], rows, generation: int) -> Dict[int, ZoneStats]:
+    for stats, latest in rows:
+        zone_stats = _build_zone_stats(stats, latest)
+        zone_stats_cache.set(stats.zone_id, zone_stats, generation=generation)
+        result[stats.zone_id] = zone_stats
+    return result
+
+
+def _missing_stats_ids(zone_ids: List[int], rows) -> List[int]:
+    found = {stats.zone_id for stats, _ in rows}
+    return [zone_id for zone_id in zone_ids if zone_id not in found]
+
+
+def _transient_stats_rows(values: Dict[int, dict], latest_rows) -> list:
+    """
+    由临时计算的列值构造 (汇总行, 最新测量) 对，不加入会话、不写入数据库
+    （汇总行缺失时的只读回退，汇总行由启动时的重建任务补齐）
+    """
+    latest_by_id = {measurement.id: measurement for measurement in latest_rows}
+    return [
+        (ZoneMeasurementStats(**value), latest_by_id.get(value["latest_measurement_id"]))
+        for value in values.values()
+    ]
+
+
+def _latest_ids(values: Dict[int, dict]) -> List[int]:
+    return [value["latest_measurement_id"] for value in values.values() if value["latest_measurement_id"]]
+
+
+def get_zones_stats(db: Session, zone_ids: Iterable[int]) -> Dict[int, ZoneStats]:
+    """
+    批量获取多个监测区的统计数据（列表接口使用，整页只需一次查询）
+    已缓存的区域不再查询；汇总行缺失的区域从原始数据临时聚合（只读，不在请求中写入）
+    """
+    result, zone_ids, generation = _split_cached_zone_stats(list(zone_ids))
+    if not zone_ids:
+        return result
+
+    rows = db.execute(_stats_with_latest_query(zone_ids)).all()
+    missing = _missing_stats_ids(zone_ids, rows)
+    if missing:
+        values = _zone_stats_values(missing, db.execute(_zone_stats_query(missing)).all())
+        latest = db.execute(select(ZoneMeasurement).where(ZoneMeasurement.id.in_(_latest_ids(values)))).scalars()
+        rows = list(rows) + _transient_stats_rows(values, latest)
+
+    return _cache_zone_stats(result, rows, generation)
+
+
+def get_zone_stats(db: Session, zone_id: int) -> ZoneStats:
+    """获取碳汇监测区的统计数据（读取汇总表，O(1)）"""
+    return get_zones_stats(db, [zone_id])[zone_id]
+
+
+@memoize(zone_chart_cache, key=lambda db, zone_id, limit=10: (zone_id, limit))
+def get_zone_measurements_chart_data(db: Session, zone_id: int, limit: int = 10):
+    """获取区域测量数据的图表数据"""
+    measurements = db.execute(_recent_measurements_query(zone_id, limit)).scalars().all()
+    return _build_chart_data(measurements)
+
+
+# ==================== 异步查询（API路由使用） ====================
+
+async def get_zones_stats_async(db: AsyncSession, zone_ids: Iterable[int]) -> Dict[int, ZoneStats]:
+    """get_zones_stats 的异步版本"""
+    result, zone_ids, generation = _split_cached_zone_stats(list(zone_ids))
+    if not zone_ids:
+        return result
+
+    rows = (await db.execute(_stats_with_latest_query(zone_ids))).all()
+    missing = _missing_stats_ids(zone_ids, rows)
+    if missing:
+        values = _zone_stats_values(missing, (await db.execute(_zone_stats_query(missing))).all())
+        latest = (await db.execute(
+            select(ZoneMeasurement).where(ZoneMeasurement.id.in_(_latest_ids(values)))
+        )).scalars()
+        rows = list(rows) + _transient_stats_rows(values, latest)
+
+    return _cache_zone_stats(result, rows, generation)
+
+
+async def get_zone_stats_async(db: AsyncSession, zone_id: int) -> ZoneStats:
+    """get_zone_stats 的异步版本"""
+    return (await get_zones_stats_async(db, [zone_id]))[zone_id]
+
+
+@memoize(zone_chart_cache, key=lambda db, zone_id, limit=10: (zone_id, limit))
+async def get_zone_measurements_chart_data_async(db: AsyncSession, zone_id: int, limit: int = 10):
+    """get_zone_measurements_chart_data 的异步版本"""
+    measurements = (await db.execute(_recent_measurements_query(zone_id, limit))).scalars().all()
+    return _build_chart_data(measurements)
+
+
+# ==================== 时间范围图表数据 ====================
+
+def as_utc(value: datetime) -> datetime:
+    """
+    统一转换为带时区的UTC时间（不带时区的时间按UTC处理）
+    测量时间以UTC写入，时间桶在Python端和数据库端都按UTC截断
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def resolve_chart_bucket(start: datetime, end: datetime, points: int) -> ChartBucket:
+    """选择使桶数量不超过 points 的最细时间桶"""
+    span = (as_utc(end) - as_utc(start)).total_seconds()
+    for bucket, seconds in CHART_BUCKET_SECONDS.items():
+        if span / seconds <= points:
+            return bucket
+    return ChartBucket.month
+
+
+def _resolve_chart_range(
+    db: Session,
+    zone_id: int,
+    start: Optional[datetime],
+    end: Optional[datetime]
+):
+    """
+    补全时间范围：未指定起点时从该区域最早的测量开始，未指定终点时到当前时间
+    返回带时区的UTC时间（没有测量数据时起点为None）
+    """
+    if end is None:
+        end = datetime.now(timezone.utc)
+    if start is None:
+        start = db.query(func.min(ZoneMeasurement.timestamp)).filter(
+            ZoneMeasurement.zone_id == zone_id
+        ).scalar()
+    return (as_utc(start) if start is not None else None), as_utc(end)
+
+
+def _range_filter(zone_id: int, start: datetime, end: datetime):
+    return (
+        ZoneMeasurement.zone_id == zone_id,
+        ZoneMeasurement.timestamp >= start,
+        ZoneMeasurement.timestamp < end,
+    )
+
+
+def _empty_chart_data(bucket: Optional[ChartBucket] = None) -> dict:
+    data = {"timestamps": [], "ndvi_values": [], "carbon_values": []}
+    if bucket is not None:
+        data.update(
+            bucket=bucket, counts=[], ndvi_min=[], ndvi_max=[],
+            carbon_min=[], carbon_max=[], carbon_sums=[]
+        )
+    return data
+
+
+def truncate_to_bucket(value: datetime, bucket: ChartBucket) -> datetime:
+    """将时间截断到所在时间桶的起点（带时区的UTC时间），与数据库端的截断规则一致"""
+    value = as_utc(value)
+    if bucket == ChartBucket.hour:
+        return value.replace(minute=0, second=0, microsecond=0)
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == ChartBucket.week:
+        return value - timedelta(days=value.weekday())
+    if bucket == ChartBucket.month:
+        return value.replace(day=1)
+    return value
+
+
+def next_bucket_start(value: datetime, bucket: ChartBucket) -> datetime:
+    """返回 value 所在时间桶的下一个桶的起点"""
+    value = truncate_to_bucket(value, bucket)
+    if bucket == ChartBucket.month:
+        return (value + timedelta(days=32)).replace(day=1)
+    return value + timedelta(seconds=CHART_BUCKET_SECONDS[bucket])
+
+
+def bucket_start_expression(db: Session, bucket: ChartBucket, column=ZoneMeasurement.timestamp):
+    """
+    时间列（默认为测量时间）截断到时间桶起点的SQL表达式
+    PostgreSQL 使用 date_trunc(unit, ts, 'UTC')，与会话时区无关；SQLite 中保存的是UTC时间
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(bucket.value, column, "UTC")
+    # strftime 返回字符串，按 DateTime 解析结果
+    return type_coerce(SQLITE_BUCKET_EXPRESSIONS[bucket](column), DateTime())
+
+
+def bucket_aggregate_columns(db: Session, bucket: ChartBucket) -> list:
+    """
+    按时间桶聚合测量数据的列（需按 zone_id、bucket_start 分组）
+    列名与 zone_measurement_rollups 一致，供图表查询和聚合表刷新共用
+    """
+    return [
+        ZoneMeasurement.zone_id.label("zone_id"),
+        bucket_start_expression(db, bucket).label("bucket_start"),
+        func.count(ZoneMeasurement.id).label("measurements_count"),
+        func.sum(ZoneMeasurement.carbon_absorption).label("carbon_sum"),
+        func.min(ZoneMeasurement.carbon_absorption).label("carbon_min"),
+        func.max(ZoneMeasurement.carbon_absorption).label("carbon_max"),
+        func.sum(ZoneMeasurement.ndvi).label("ndvi_sum"),
+        func.min(ZoneMeasurement.ndvi).label("ndvi_min"),
+        func.max(ZoneMeasurement.ndvi).label("ndvi_max"),
+    ]
+
+
+def _aggregate_raw_buckets(
+    db: Session,
+    zone_id: int,
+    bucket: ChartBucket,
+    start: datetime,
+    end: datetime
+) -> list:
+    """直接从 zone_measurements 聚合时间范围内的时间桶"""
+    columns = bucket_aggregate_columns(db, bucket)
+    return db.query(*columns).filter(
+        *_range_filter(zone_id, start, end)
+    ).group_by(columns[0], columns[1]).all()
+
+
+def _query_rollup_buckets(
+    db: Session,
+    zone_id: int,
+    bucket: ChartBucket,
+    start: datetime,
+    end: datetime
+) -> list:
+    """从聚合表读取 [start, end) 内的完整时间桶"""
+    return db.query(ZoneMeasurementRollup).filter(
+        ZoneMeasurementRollup.zone_id == zone_id,
+        ZoneMeasurementRollup.granularity == bucket.value,
+        ZoneMeasurementRollup.bucket_start >= start,
+        ZoneMeasurementRollup.bucket_start < end
+    ).all()
+
+
+def get_zone_measurements_bucketed(
+    db: Session,
+    zone_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: ChartBucket = ChartBucket.auto,
+    points: int = 200
+) -> dict:
+    """
+    按时间桶聚合区域测量数据（均值/最小/最大/求和）
+
+    日/周/月粒度下，范围内已结束的完整时间桶读取聚合表，
+    只有首尾不完整的桶和当前（进行中的）桶从原始数据聚合。
+    返回点数只取决于时间范围和桶大小，与原始数据量无关。
+    """
+    start, end = _resolve_chart_range(db, zone_id, start, end)
+    if start is None:
+        return _empty_chart_data(bucket)
+    if bucket == ChartBucket.auto:
+        bucket = resolve_chart_bucket(start, end, points)
+
+    # [first, last) 为范围内已结束的完整时间桶
+    first = truncate_to_bucket(start, bucket)
+    if first < start:
+        first = next_bucket_start(first, bucket)
+    last = min(
+        truncate_to_bucket(end, bucket),
+        truncate_to_bucket(datetime.now(timezone.utc), bucket)
+    )
+
+    if bucket in ROLLUP_BUCKETS and first < last:
+        rows = (
+            _aggregate_raw_buckets(db, zone_id, bucket, start, first) +
+            _query_rollup_buckets(db, zone_id, bucket, first, last) +
+            _aggregate_raw_buckets(db, zone_id, bucket, last, end)
+        )
+    else:
+        rows = _aggregate_raw_buckets(db, zone_id, bucket, start, end)
+
+    data = _empty_chart_data(bucket)
+    for row in sorted(rows, key=lambda row: row.bucket_start):
+        count = row.measurements_count
+        data["timestamps"].append(row.bucket_start)
+        data["counts"].append(count)
+        data["ndvi_values"].append(round(row.ndvi_sum / count, 4))
+        data["ndvi_min"].append(row.ndvi_min)
+        data["ndvi_max"].append(row.ndvi_max)
+        data["carbon_values"].append(round(row.carbon_sum / count, 6))
+        data["carbon_min"].append(row.carbon_min)
+        data["carbon_max"].append(row.carbon_max)
+        data["carbon_sums"].append(round(row.carbon_sum, 6))
+    return data
+
+
+def get_zone_measurements_lttb(
+    db: Session,
+    zone_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = 200
+) -> dict:
+    """
+    使用LTTB算法将时间范围内的原始测量数据降采样到 points 个点
+    以碳吸收量曲线选点，NDVI取相同时间点，保留曲线的峰谷形状
+    """
+    start, end = _resolve_chart_range(db, zone_id, start, end)
+    if start is None:
+        return _empty_chart_data()
+
+    rows = db.query(
+        ZoneMeasurement.timestamp,
+        ZoneMeasurement.ndvi,
+        ZoneMeasurement.carbon_absorption
+    ).filter(
+        *_range_filter(zone_id, start, end)
+    ).order_by(ZoneMeasurement.timestamp).all()
+    if not rows:
+        return _empty_chart_data()
+
+    timestamps, ndvi_values, carbon_values = zip(*rows)
+    x = np.array([timestamp.timestamp() for timestamp in timestamps])
+    indices = lttb_indices(x, np.array(carbon_values), points)
+
+    return {
+        "timestamps": [timestamps[i] for i in indices],
+        "ndvi_values": [ndvi_values[i] for i in indices],
+        "carbon_values": [carbon_values[i] for i in indices]
+    }
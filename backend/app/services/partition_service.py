@@ -0,0 +1,124 @@
+import logging
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models import ZoneMeasurement
+
+logger = logging.getLogger(__name__)
+
+MEASUREMENTS_TABLE = ZoneMeasurement.__tablename__
+DEFAULT_PARTITION = f"{MEASUREMENTS_TABLE}_default"
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    """返回 value 所在月份之后第 months 个月的第一天"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{MEASUREMENTS_TABLE}_p{month:%Y%m}"
+
+
+def _bound(month: date) -> str:
+    # 分区边界统一使用UTC，避免随会话时区漂移
+    return f"{month:%Y-%m-%d} 00:00:00+00"
+
+
+def is_measurements_partitioned(db) -> bool:
+    """zone_measurements 是否为PostgreSQL分区表（db 可为 Session 或 Connection）"""
+    dialect = db.dialect if isinstance(db, Connection) else db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return False
+    return bool(db.execute(text(
+        "SELECT EXISTS ("
+        "  SELECT 1 FROM pg_partitioned_table pt"
+        "  JOIN pg_class c ON c.oid = pt.partrelid"
+        "  WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+        ")"
+    ), {"table": MEASUREMENTS_TABLE}).scalar())
+
+
+def create_month_partition(db, month: date) -> bool:
+    """
+    创建指定月份的分区（已存在则跳过），返回是否新建
+
+    若默认分区中已有落在该月份的数据，先将其移入新表再挂载为分区，
+    否则 PostgreSQL 会拒绝创建与默认分区数据重叠的分区。
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    exists = db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+    if exists:
+        return False
+
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    db.execute(text(f"CREATE TABLE {name} (LIKE {MEASUREMENTS_TABLE} INCLUDING DEFAULTS)"))
+    has_default = db.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION}
+    ).scalar()
+    if has_default:
+        moved = db.execute(text(
+            f"WITH moved AS ("
+            f"  DELETE FROM {DEFAULT_PARTITION}"
+            f"  WHERE timestamp >= :lower AND timestamp < :upper"
+            f"  RETURNING *"
+            f") INSERT INTO {name} SELECT * FROM moved"
+        ), {"lower": lower, "upper": upper}).rowcount
+        if moved:
+            logger.info(f"Moved {moved} rows from {DEFAULT_PARTITION} into {name}")
+    db.execute(text(
+        f"ALTER TABLE {MEASUREMENTS_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+    logger.info(f"Created partition {name} [{lower}, {upper})")
+    return True
+
+
+def ensure_measurement_partitions(
+    db,
+    months_ahead: Optional[int] = None,
+    start: Optional[date] = None
+) -> List[str]:
+    """
+    确保从 start 所在月份（默认当前月）到未来 months_ahead 个月的分区都已存在（不提交事务）
+
+    Returns:
+        新建的分区名列表
+    """
+    if months_ahead is None:
+        months_ahead = settings.measurement_partition_months_ahead
+    first = month_start(start or datetime.now(timezone.utc).date())
+    last = add_months(datetime.now(timezone.utc).date(), months_ahead)
+
+    created = []
+    month = first
+    while month <= last:
+        if create_month_partition(db, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def maintain_measurement_partitions():
+    """定时任务：为分区表预建未来月份的分区"""
+    db = SessionLocal()
+    try:
+        if not is_measurements_partitioned(db):
+            return
+        created = ensure_measurement_partitions(db)
+        db.commit()
+        if created:
+            logger.info(f"Measurement partitions created: {', '.join(created)}")
+    except Exception as e:
+        logger.error(f"Error maintaining measurement partitions: {e}")
+        db.rollback()
+    finally:
+        db.close()
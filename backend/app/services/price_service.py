@@ -1,16 +1,239 @@
 import random
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models import CarbonPrice
+from ..schemas import CarbonPrice as CarbonPriceSchema, ChartBucket
+from ..core.config import settings
 from ..core.database import SessionLocal
+from ..utils.pagination import keyset_condition
+from .measurement_service import as_utc, bucket_start_expression, resolve_chart_bucket
 
 logger = logging.getLogger(__name__)
 
 
-def get_current_price(db: Session) -> CarbonPrice:
-    """获取最新的碳汇价格"""
-    return db.query(CarbonPrice).order_by(CarbonPrice.timestamp.desc()).first()
+def _sort_key(price: CarbonPriceSchema) -> Tuple[datetime, int]:
+    # 统一为带时区的UTC时间，可与解码后的分页游标比较（SQLite 读出的时间不带时区）
+    return (as_utc(price.timestamp), price.id)
+
+
+class PriceRingBuffer:
+    """
+    最近 capacity 条价格的内存环形缓冲（按 (timestamp, id) 正序）
+
+    启动时从数据库加载，本进程写入的价格直接追加；其他进程写入的价格
+    在距上次同步超过 sync_interval 秒后按 id 增量拉取
+    """
+
+    def __init__(self, capacity: int, sync_interval: float):
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        self._prices: deque = deque(maxlen=capacity)
+        self._max_id = 0
+        # 表中全部价格都在缓冲中（价格总数不超过 capacity 时成立）
+        self._complete = False
+        self._loaded = False
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> None:
+        """从数据库加载最近 capacity 条价格，替换缓冲中的内容"""
+        rows = db.execute(
+            select(CarbonPrice)
+            .order_by(CarbonPrice.timestamp.desc(), CarbonPrice.id.desc())
+            .limit(self.capacity)
+        ).scalars().all()
+        max_id = db.execute(select(func.max(CarbonPrice.id))).scalar() or 0
+        with self._lock:
+            self._prices.clear()
+            self._prices.extend(CarbonPriceSchema.model_validate(row) for row in reversed(rows))
+            self._max_id = max_id
+            self._complete = len(rows) < self.capacity
+            self._loaded = True
+            self._synced_at = time.monotonic()
+
+    def append(self, price: CarbonPriceSchema) -> None:
+        """
+        追加本进程写入的一条价格；时间早于缓冲中最新价格的数据按时间插入到对应位置
+        与已同步的ID之间有空缺（可能是其他进程写入的价格）时改为在下次读取时同步
+        """
+        with self._lock:
+            if not self._loaded or price.id <= self._max_id:
+                # 尚未加载时由 load 取回；已同步过的ID不重复追加
+                return
+            if price.id != self._max_id + 1:
+                self._synced_at = 0.0
+                return
+            self._insert(price)
+            self._max_id = price.id
+
+    def _insert(self, price: CarbonPriceSchema) -> None:
+        prices = self._prices
+        key = _sort_key(price)
+        if not prices or _sort_key(prices[-1]) <= key:
+            if len(prices) == self.capacity:
+                self._complete = False
+            prices.append(price)
+            return
+        position = len(prices)
+        while position > 0 and _sort_key(prices[position - 1]) > key:
+            position -= 1
+        if len(prices) == self.capacity:
+            self._complete = False
+            if position == 0:
+                # 比缓冲中所有价格都早，不进入缓冲（仍可从数据库查询）
+                return
+            prices.popleft()
+            position -= 1
+        prices.insert(position, price)
+
+    def needs_sync(self) -> bool:
+        return not self._loaded or time.monotonic() - self._synced_at >= self.sync_interval
+
+    def sync(self, db: Session) -> None:
+        """拉取其他进程写入的新价格（未加载时完整加载），在同步间隔内重复调用不查询数据库"""
+        if not self.needs_sync():
+            return
+        if not self._loaded:
+            self.load(db)
+            return
+        rows = db.execute(
+            select(CarbonPrice).where(CarbonPrice.id > self._max_id).order_by(CarbonPrice.id)
+        ).scalars().all()
+        with self._lock:
+            for row in rows:
+                if row.id > self._max_id:
+                    self._insert(CarbonPriceSchema.model_validate(row))
+                    self._max_id = row.id
+            self._synced_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def latest(self) -> Optional[CarbonPriceSchema]:
+        with self._lock:
+            return self._prices[-1] if self._prices else None
+
+    def history(
+        self,
+        limit: int,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> Optional[List[CarbonPriceSchema]]:
+        """
+        按时间倒序返回 (timestamp, id) 小于 before 的最多 limit 条价格
+        缓冲中的数据不足以确定结果时返回None，由调用方查询数据库
+        """
+        with self._lock:
+            if not self._loaded:
+                return None
+            result = []
+            for price in reversed(self._prices):
+                if before is not None and _sort_key(price) >= before:
+                    continue
+                result.append(price)
+                if len(result) == limit:
+                    return result
+            return result if self._complete else None
+
+
+# 最近价格的内存缓冲（/current 和近期 /history 直接读取）
+price_buffer = PriceRingBuffer(settings.price_buffer_size, settings.price_buffer_sync_seconds)
+
+
+def _price_snapshot(price: Optional[CarbonPrice]) -> Optional[CarbonPriceSchema]:
+    return CarbonPriceSchema.model_validate(price) if price else None
+
+
+def get_current_price(db: Session) -> Optional[CarbonPriceSchema]:
+    """获取最新的碳汇价格（从内存缓冲读取）"""
+    price_buffer.sync(db)
+    return price_buffer.latest()
+
+
+async def get_current_price_async(db: AsyncSession) -> Optional[CarbonPriceSchema]:
+    """get_current_price 的异步版本"""
+    if price_buffer.needs_sync():
+        await db.run_sync(price_buffer.sync)
+    return price_buffer.latest()
+
+
+def _price_history_query(limit: int, before: Optional[Tuple[datetime, int]] = None):
+    sort_columns = (CarbonPrice.timestamp, CarbonPrice.id)
+    query = select(CarbonPrice).order_by(*(column.desc() for column in sort_columns))
+    if before is not None:
+        query = query.where(keyset_condition(sort_columns, list(before)))
+    return query.limit(limit)
+
+
+async def get_price_history_async(
+    db: AsyncSession,
+    limit: int,
+    before: Optional[Tuple[datetime, int]] = None
+) -> List[CarbonPriceSchema]:
+    """
+    按时间倒序获取价格历史，before 为上一页最后一条的 (timestamp, id)
+    缓冲能覆盖的请求直接从内存返回，更早的数据通过 (timestamp, id) 索引查询
+    """
+    if price_buffer.needs_sync():
+        await db.run_sync(price_buffer.sync)
+    prices = price_buffer.history(limit, before)
+    if prices is None:
+        rows = (await db.execute(_price_history_query(limit, before))).scalars().all()
+        prices = [CarbonPriceSchema.model_validate(row) for row in rows]
+    return prices
+
+
+def get_price_history_bucketed(
+    db: Session,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    bucket: ChartBucket = ChartBucket.auto,
+    points: int = 200
+) -> dict:
+    """
+    按时间桶聚合 [start, end) 内的价格（均价/最低/最高），用于较长时间范围的走势
+    未指定起点时从最早的价格开始，未指定终点时到当前时间
+    """
+    if end is None:
+        end = datetime.now(timezone.utc)
+    if start is None:
+        start = db.execute(select(func.min(CarbonPrice.timestamp))).scalar()
+    if start is None:
+        return {
+            "bucket": ChartBucket.day if bucket == ChartBucket.auto else bucket,
+            "timestamps": [], "prices": [], "price_min": [], "price_max": [], "counts": []
+        }
+    if bucket == ChartBucket.auto:
+        bucket = resolve_chart_bucket(start, end, points)
+
+    bucket_start = bucket_start_expression(db, bucket, CarbonPrice.timestamp).label("bucket_start")
+    rows = db.execute(
+        select(
+            bucket_start,
+            func.avg(CarbonPrice.price),
+            func.min(CarbonPrice.price),
+            func.max(CarbonPrice.price),
+            func.count(CarbonPrice.id),
+        )
+        .where(CarbonPrice.timestamp >= start, CarbonPrice.timestamp < end)
+        .group_by(bucket_start)
+        .order_by(bucket_start)
+    ).all()
+
+    return {
+        "bucket": bucket,
+        "timestamps": [row[0] for row in rows],
+        "prices": [round(row[1], 2) for row in rows],
+        "price_min": [row[2] for row in rows],
+        "price_max": [row[3] for row in rows],
+        "counts": [row[4] for row in rows],
+    }
 
 
 def generate_mock_price(db: Session) -> CarbonPrice:
@@ -28,6 +251,7 @@ def generate_mock_price(db: Session) -> CarbonPrice:
     db.add(db_price)
     db.commit()
     db.refresh(db_price)
+    price_buffer.append(_price_snapshot(db_price))
     return db_price
 
 
@@ -50,9 +274,41 @@ def generate_historical_prices(db: Session, days: int = 30):
         db.add(db_price)
 
     db.commit()
+    # 历史价格的时间早于已有数据，重新加载缓冲
+    price_buffer.load(db)
     return prices
 
 
+def load_price_buffer():
+    """启动时加载价格缓冲（每个 worker 各自执行，只读）"""
+    db = SessionLocal()
+    try:
+        price_buffer.load(db)
+        logger.info(f"Loaded {len(price_buffer)} recent prices into memory")
+    except Exception as e:
+        logger.error(f"Error loading price buffer: {e}")
+    finally:
+        db.close()
+
+
+def seed_initial_price():
+    """
+    没有任何价格数据时生成一条模拟价格
+    通过调度器的 run_once 在所有进程中互斥执行，在锁内再次检查，多个 worker 同时启动也只生成一条
+    """
+    db = SessionLocal()
+    try:
+        if db.execute(select(CarbonPrice.id).limit(1)).first() is not None:
+            return
+        price = generate_mock_price(db)
+        logger.info(f"No price data found, generated initial mock price {price.price}")
+    except Exception as e:
+        logger.error(f"Error generating initial price: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 def update_price_hourly():
     """每小时更新碳汇价格数据"""
     db = SessionLocal()
@@ -63,4 +319,4 @@ def update_price_hourly():
     except Exception as e:
         logger.error(f"Error in hourly price update: {e}")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,222 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..core.cache import create_cache
+from ..core.config import settings
+from ..models import CarbonPrice, CarbonZone, ZoneMeasurement, ZoneMeasurementRollup, ZoneMeasurementStats
+
+# 会话中记录本次事务修改过的区域和价格，提交后使对应的版本失效
+CHANGED_ZONES_KEY = "response_cache_changed_zones"
+CHANGED_PRICES_KEY = "response_cache_changed_prices"
+
+# 数据版本：区域版本由区域信息、汇总表的最新测量ID/时间和聚合更新时间决定，价格版本为最新价格ID
+# 写入数据的事务提交后立即失效（使用共享缓存后端时对所有 worker 生效）；
+# 不经过本模块失效的写入最迟在 ttl 后生效
+_zone_versions = create_cache(
+    "zone_versions", settings.response_cache_size, settings.response_cache_version_ttl_seconds
+)
+_user_zone_versions = create_cache(
+    "user_zone_versions", settings.response_cache_size, settings.response_cache_version_ttl_seconds
+)
+_price_versions = create_cache("price_versions", 1, settings.response_cache_version_ttl_seconds)
+
+# 已序列化的响应体，按 (用户, 路径, 查询参数) 缓存，命中时还需 ETag 与当前版本一致
+_responses = create_cache("responses", settings.response_cache_size, settings.response_cache_ttl_seconds)
+
+# 数据变化时需要同步失效的其他缓存（如服务层的查询结果缓存）
+_zone_invalidation_hooks: List[Callable[[List[int]], None]] = []
+_price_invalidation_hooks: List[Callable[[], None]] = []
+
+
+def on_zones_invalidated(hook: Callable[[List[int]], None]) -> Callable[[List[int]], None]:
+    """注册区域数据失效时的回调（可用作装饰器）"""
+    _zone_invalidation_hooks.append(hook)
+    return hook
+
+
+def on_prices_invalidated(hook: Callable[[], None]) -> Callable[[], None]:
+    """注册价格数据失效时的回调（可用作装饰器）"""
+    _price_invalidation_hooks.append(hook)
+    return hook
+
+
+# ==================== 失效 ====================
+
+def mark_zones_changed(db: Session, zone_ids: Iterable[int]) -> None:
+    """记录本次事务修改了哪些区域的测量数据，提交后使其版本失效"""
+    db.info.setdefault(CHANGED_ZONES_KEY, set()).update(zone_ids)
+
+
+def invalidate_zones(zone_ids: Iterable[int]) -> None:
+    zone_ids = list(zone_ids)
+    for zone_id in zone_ids:
+        _zone_versions.delete(zone_id)
+    # 区域所属用户未知，用户的区域列表版本整体失效
+    _user_zone_versions.clear()
+    for hook in _zone_invalidation_hooks:
+        hook(zone_ids)
+
+
+def invalidate_prices() -> None:
+    _price_versions.clear()
+    for hook in _price_invalidation_hooks:
+        hook()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_changes(session, flush_context):
+    """ORM 方式写入的区域、价格和测量数据在 flush 时记录"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, CarbonZone):
+            mark_zones_changed(session, [obj.id])
+        elif isinstance(obj, ZoneMeasurement):
+            mark_zones_changed(session, [obj.zone_id])
+        elif isinstance(obj, CarbonPrice):
+            session.info[CHANGED_PRICES_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_changes(session):
+    zone_ids = session.info.pop(CHANGED_ZONES_KEY, None)
+    if zone_ids:
+        invalidate_zones(zone_ids)
+    if session.info.pop(CHANGED_PRICES_KEY, False):
+        invalidate_prices()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_changes(session):
+    session.info.pop(CHANGED_ZONES_KEY, None)
+    session.info.pop(CHANGED_PRICES_KEY, None)
+
+
+# ==================== 数据版本 ====================
+
+def _zone_versions_query():
+    rollups_updated_at = (
+        select(func.max(ZoneMeasurementRollup.updated_at))
+        .where(ZoneMeasurementRollup.zone_id == CarbonZone.id)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            CarbonZone.id,
+            CarbonZone.user_id,
+            CarbonZone.name,
+            CarbonZone.status,
+            CarbonZone.area,
+            CarbonZone.coordinates,
+            ZoneMeasurementStats.measurements_count,
+            ZoneMeasurementStats.latest_measurement_id,
+            ZoneMeasurementStats.latest_timestamp,
+            ZoneMeasurementStats.updated_at,
+            rollups_updated_at,
+        )
+        .outerjoin(ZoneMeasurementStats, ZoneMeasurementStats.zone_id == CarbonZone.id)
+    )
+
+
+def _version_token(values: Iterable[Any]) -> str:
+    return hashlib.sha1(repr(tuple(values)).encode("utf-8")).hexdigest()
+
+
+async def get_zone_version(db: AsyncSession, zone_id: int, user_id: int) -> Optional[str]:
+    """返回区域的数据版本，区域不存在或不属于该用户时返回None"""
+    cached = _zone_versions.get(zone_id)
+    if cached is None:
+        # 查询前读取缓存代数：查询期间提交的写入已使版本失效时，不把旧版本写回缓存
+        generation = _zone_versions.generation()
+        row = (await db.execute(_zone_versions_query().where(CarbonZone.id == zone_id))).first()
+        if row is None:
+            return None
+        cached = (row.user_id, _version_token(row))
+        _zone_versions.set(zone_id, cached, generation=generation)
+    owner_id, version = cached
+    return version if owner_id == user_id else None
+
+
+async def get_user_zones_version(db: AsyncSession, user_id: int) -> str:
+    """返回用户全部区域的数据版本（区域增删改或任一区域有新数据时变化）"""
+    version = _user_zone_versions.get(user_id)
+    if version is None:
+        zone_generation = _zone_versions.generation()
+        generation = _user_zone_versions.generation()
+        rows = (await db.execute(
+            _zone_versions_query().where(CarbonZone.user_id == user_id).order_by(CarbonZone.id)
+        )).all()
+        tokens = []
+        for row in rows:
+            token = _version_token(row)
+            _zone_versions.set(row.id, (row.user_id, token), generation=zone_generation)
+            tokens.append(token)
+        version = _version_token(tokens)
+        _user_zone_versions.set(user_id, version, generation=generation)
+    return version
+
+
+async def get_price_version(db: AsyncSession) -> str:
+    """返回价格数据的版本（最新价格ID）"""
+    version = _price_versions.get("latest")
+    if version is None:
+        generation = _price_versions.generation()
+        latest_id = (await db.execute(select(func.max(CarbonPrice.id)))).scalar()
+        version = str(latest_id or 0)
+        _price_versions.set("latest", version, generation=generation)
+    return version
+
+
+# ==================== 条件请求 ====================
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+async def cached_json_response(
+    request: Request,
+    version: str,
+    build: Callable[[Dict[str, str]], Awaitable[Any]],
+    user_id: Optional[int] = None,
+    max_age: int = 0
+) -> Response:
+    """
+    以 ETag 返回 JSON 响应，ETag 由路径、查询参数和数据版本决定
+
+    - 请求头 If-None-Match 与 ETag 一致时返回 304
+    - 同一用户以相同参数请求且数据版本未变时直接返回缓存的响应体
+    - 否则调用 build(headers) 生成响应内容，build 可向 headers 写入额外的响应头（如分页游标）
+    """
+    query = urlencode(sorted(request.query_params.multi_items()))
+    etag = '"' + hashlib.sha1(f"{request.url.path}?{query}|{version}".encode("utf-8")).hexdigest() + '"'
+    if user_id is None:
+        cache_control = f"public, max-age={max_age}"
+    else:
+        cache_control = f"private, max-age={max_age}" if max_age else "private, no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (user_id, request.url.path, query)
+    entry = _responses.get(key)
+    if entry is not None and entry[0] == etag:
+        _, body, extra_headers = entry
+    else:
+        extra_headers: Dict[str, str] = {}
+        content = await build(extra_headers)
+        body = json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        _responses.set(key, (etag, body, extra_headers))
+
+    return Response(content=body, media_type="application/json", headers={**extra_headers, **headers})
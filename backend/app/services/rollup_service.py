@@ -0,0 +1,117 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
+from ..models import ZoneMeasurement, ZoneMeasurementRollup, ZoneMeasurementStats
+from .measurement_service import ROLLUP_BUCKETS, bucket_aggregate_columns, refresh_zone_stats, truncate_to_bucket
+from .response_cache import mark_zones_changed
+
+logger = logging.getLogger(__name__)
+
+# 调度器增量刷新时回看的时间范围（大于测量数据生成间隔，覆盖两次调度之间写入的数据）
+ROLLUP_REFRESH_LOOKBACK = timedelta(days=1)
+
+ROLLUP_COLUMNS = (
+    "zone_id", "bucket_start", "measurements_count",
+    "carbon_sum", "carbon_min", "carbon_max",
+    "ndvi_sum", "ndvi_min", "ndvi_max",
+)
+
+
+def refresh_zone_rollups(
+    db: Session,
+    zone_ids: Iterable[int],
+    since: Optional[datetime] = None
+) -> None:
+    """
+    从 zone_measurements 重新计算指定区域的日/周/月聚合（不提交事务）
+
+    Args:
+        db: 数据库会话
+        zone_ids: 区域ID
+        since: 只重算包含该时间及之后数据的时间桶；为None时重建全部聚合
+    """
+    zone_ids = list(set(zone_ids))
+    if not zone_ids:
+        return
+
+    for bucket in ROLLUP_BUCKETS:
+        stale = delete(ZoneMeasurementRollup).where(
+            ZoneMeasurementRollup.zone_id.in_(zone_ids),
+            ZoneMeasurementRollup.granularity == bucket.value
+        )
+        columns = bucket_aggregate_columns(db, bucket)
+        aggregates = select(literal(bucket.value).label("granularity"), *columns).where(
+            ZoneMeasurement.zone_id.in_(zone_ids)
+        )
+        if since is not None:
+            bucket_start = truncate_to_bucket(since, bucket)
+            stale = stale.where(ZoneMeasurementRollup.bucket_start >= bucket_start)
+            aggregates = aggregates.where(ZoneMeasurement.timestamp >= bucket_start)
+        aggregates = aggregates.group_by(columns[0], columns[1])
+
+        db.execute(stale)
+        db.execute(
+            insert(ZoneMeasurementRollup).from_select(("granularity",) + ROLLUP_COLUMNS, aggregates)
+        )
+    mark_zones_changed(db, zone_ids)
+
+
+def refresh_recent_rollups(since: Optional[datetime] = None) -> List[int]:
+    """定时任务：增量刷新最近有新数据的区域的聚合（在测量数据生成之后运行），返回刷新的区域ID"""
+    if since is None:
+        since = datetime.now(timezone.utc) - ROLLUP_REFRESH_LOOKBACK
+
+    db = SessionLocal()
+    try:
+        # 通过汇总表的最新测量时间找出有新数据的区域，避免扫描原始数据
+        zone_ids = [
+            zone_id for (zone_id,) in db.query(ZoneMeasurementStats.zone_id).filter(
+                ZoneMeasurementStats.latest_timestamp >= since
+            )
+        ]
+        refresh_zone_rollups(db, zone_ids, since=since)
+        db.commit()
+        logger.info(f"Refreshed measurement rollups for {len(zone_ids)} zones since {since}")
+        return zone_ids
+    except Exception as e:
+        logger.error(f"Error refreshing measurement rollups: {e}")
+        db.rollback()
+        return []
+    finally:
+        db.close()
+
+
+def rebuild_missing_rollups():
+    """
+    为已有测量数据但尚无汇总统计或聚合的区域完整建立统计和聚合（如升级前已有的数据）
+    读接口遇到缺失的汇总行时只临时计算、不写入，由这里统一补齐
+    """
+    db = SessionLocal()
+    try:
+        stats_zone_ids = [
+            zone_id for (zone_id,) in db.query(ZoneMeasurement.zone_id).filter(
+                ~ZoneMeasurement.zone_id.in_(select(ZoneMeasurementStats.zone_id))
+            ).distinct()
+        ]
+        zone_ids = [
+            zone_id for (zone_id,) in db.query(ZoneMeasurement.zone_id).filter(
+                ~ZoneMeasurement.zone_id.in_(select(ZoneMeasurementRollup.zone_id))
+            ).distinct()
+        ]
+        if not stats_zone_ids and not zone_ids:
+            return
+        refresh_zone_stats(db, stats_zone_ids)
+        refresh_zone_rollups(db, zone_ids)
+        db.commit()
+        logger.info(
+            f"Built measurement stats for {len(stats_zone_ids)} zones and rollups for {len(zone_ids)} zones"
+        )
+    except Exception as e:
+        logger.error(f"Error building measurement rollups: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
@@ -0,0 +1,431 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from sqlalchemy import select, text
+from ..core.config import settings
+from ..core.database import SessionLocal, engine
+from ..models import ScheduledJobState
+from ..utils.cron import CronSpec
+
+logger = logging.getLogger(__name__)
+
+# 执行任务的进程标识（写入运行状态，便于排查由哪个 worker 执行）
+RUNNER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite 读出的时间不带时区，按 UTC 处理"""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+class JobInterrupted(Exception):
+    """调度器关闭时中断正在执行的任务：本次运行不记录，下次启动后重新执行该周期"""
+
+
+# 任务的执行方式：thread 在有界线程池中执行（数据库等I/O任务），process 交给进程池（CPU密集的数据生成）
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+
+
+@dataclass(frozen=True)
+class ScheduledJob:
+    """
+    按 cron 表达式（UTC）执行的定时任务，每个周期（slot）在所有进程中只执行一次
+
+    - func 为 process 方式时必须是模块级函数（子进程中按名称导入），返回值需可序列化
+    - on_result 在本进程中以 func 的返回值调用（如子进程写入数据后使本进程的缓存失效）
+    - jitter 为触发后随机延迟的最长秒数，分散多个副本同时争抢锁
+    """
+    name: str
+    func: Callable[[], Any]
+    schedule: CronSpec
+    executor: str = EXECUTOR_THREAD
+    timeout: Optional[float] = None
+    jitter: float = 0.0
+    on_result: Optional[Callable[[Any], None]] = None
+
+    def slot_for(self, now: datetime) -> datetime:
+        """返回不晚于 now 的最近一个周期起点"""
+        return self.schedule.previous(now)
+
+    def next_slot(self, now: datetime) -> datetime:
+        return self.schedule.next_after(now)
+
+    def count_missed(self, last_slot: datetime, slot: datetime, limit: int = 1000) -> int:
+        """last_slot 与 slot 之间（不含两端）错过的周期数，最多数到 limit"""
+        missed = 0
+        current = self.next_slot(last_slot)
+        while current < slot and missed < limit:
+            missed += 1
+            current = self.next_slot(current)
+        return missed
+
+
+# 本进程注册的定时任务（在 main 中注册）
+scheduled_jobs: List[ScheduledJob] = []
+
+
+def register_job(
+    name: str,
+    func: Callable[[], Any],
+    schedule: str,
+    executor: str = EXECUTOR_THREAD,
+    timeout: Optional[float] = None,
+    jitter: Optional[float] = None,
+    on_result: Optional[Callable[[Any], None]] = None
+) -> ScheduledJob:
+    """注册定时任务，timeout/jitter 为空时使用配置中的默认值"""
+    if executor not in (EXECUTOR_THREAD, EXECUTOR_PROCESS):
+        raise ValueError(f"Unknown executor: {executor}")
+    job = ScheduledJob(
+        name=name,
+        func=func,
+        schedule=CronSpec.parse(schedule),
+        executor=executor,
+        timeout=settings.scheduler_job_timeout_seconds if timeout is None else timeout,
+        jitter=settings.scheduler_jitter_seconds if jitter is None else jitter,
+        on_result=on_result,
+    )
+    scheduled_jobs.append(job)
+    return job
+
+
+# ==================== 跨进程互斥 ====================
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def _advisory_lock_key(name: str) -> int:
+    """任务名称映射为 PostgreSQL advisory lock 使用的 64 位有符号整数"""
+    digest = hashlib.sha1(f"carboncount:scheduler:{name}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+@contextmanager
+def leader_lock(name: str) -> Iterator[bool]:
+    """
+    尝试取得任务的执行权（不等待），返回是否取得
+
+    PostgreSQL 上使用会话级 advisory lock，在一条专用连接上持有到任务结束，
+    进程崩溃时随连接断开自动释放；其他数据库（SQLite，仅单进程开发环境）只在进程内互斥
+    """
+    if engine.dialect.name != "postgresql":
+        with _local_locks_guard:
+            lock = _local_locks.setdefault(name, threading.Lock())
+        acquired = lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+        return
+
+    key = _advisory_lock_key(name)
+    with engine.connect() as connection:
+        acquired = bool(connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar())
+        connection.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                    connection.commit()
+                except Exception as e:
+                    # 解锁失败时丢弃连接，避免仍持有锁的连接回到连接池
+                    logger.error(f"Error releasing scheduler lock {name}: {e}")
+                    connection.invalidate()
+
+
+# ==================== 执行 ====================
+
+def run_job_if_due(
+    job: ScheduledJob,
+    execute: Optional[Callable[[ScheduledJob], Any]] = None,
+    now: Optional[datetime] = None
+) -> Optional[dict]:
+    """
+    当前周期尚未执行时执行任务，返回本次运行的记录；未到期或其他进程正在执行时返回None
+    execute 决定任务在哪里执行（默认在当前线程中直接调用 job.func）
+
+    停机期间错过的多个周期合并为一次执行（记录错过的周期数），启动后立即补执行最近的周期。
+    任务失败同样记为该周期已执行，错误写入运行状态，下一个周期再重试。
+    """
+    now = now or utcnow()
+    slot = job.slot_for(now)
+    with leader_lock(job.name) as acquired:
+        if not acquired:
+            return None
+        # 运行状态在各自的短事务中读取和写入，任务执行期间只占用持有锁的连接
+        db = SessionLocal()
+        try:
+            last_slot = _as_utc(db.execute(
+                select(ScheduledJobState.last_slot).where(ScheduledJobState.name == job.name)
+            ).scalar())
+        except Exception as e:
+            logger.error(f"Error reading scheduled job state {job.name}: {e}")
+            return None
+        finally:
+            db.close()
+        if last_slot is not None and last_slot >= slot:
+            return None
+        missed_slots = 0 if last_slot is None else job.count_missed(last_slot, slot)
+
+        started_at = utcnow()
+        lag = (started_at - slot).total_seconds()
+        if missed_slots:
+            logger.warning(f"Scheduled job {job.name} missed {missed_slots} slot(s) since {last_slot}")
+        error = None
+        started = time.perf_counter()
+        try:
+            if execute is None:
+                job.func()
+            else:
+                execute(job)
+        except JobInterrupted:
+            logger.info(f"Scheduled job {job.name} interrupted by shutdown, slot {slot.isoformat()} will run again")
+            return None
+        except Exception as e:
+            logger.exception(f"Scheduled job {job.name} failed")
+            error = str(e) or type(e).__name__
+        duration = time.perf_counter() - started
+
+        db = SessionLocal()
+        try:
+            state = db.get(ScheduledJobState, job.name)
+            if state is None:
+                state = ScheduledJobState(name=job.name, run_count=0, failure_count=0)
+                db.add(state)
+            state.last_slot = slot
+            state.last_started_at = started_at
+            state.last_finished_at = utcnow()
+            state.last_duration_seconds = round(duration, 3)
+            state.last_lag_seconds = round(lag, 3)
+            state.last_missed_slots = missed_slots
+            state.last_error = error
+            state.last_runner = RUNNER_ID
+            state.run_count = (state.run_count or 0) + 1
+            if error is not None:
+                state.failure_count = (state.failure_count or 0) + 1
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error recording scheduled job {job.name}: {e}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+        logger.info(
+            f"Scheduled job {job.name} ran for slot {slot.isoformat()} "
+            f"in {duration:.2f}s (lag {lag:.1f}s)"
+        )
+        return {
+            "name": job.name,
+            "slot": slot,
+            "duration_seconds": duration,
+            "lag_seconds": lag,
+            "missed_slots": missed_slots,
+            "error": error,
+        }
+
+
+def run_exclusive(name: str, func: Callable[[], Any]) -> bool:
+    """在所有进程中互斥地执行一次性任务（如启动时的数据修复），其他进程正在执行时跳过"""
+    with leader_lock(name) as acquired:
+        if acquired:
+            func()
+        return acquired
+
+
+# ==================== 异步调度器 ====================
+
+def _terminate_process_pool(executor: ProcessPoolExecutor) -> None:
+    """
+    结束进程池及其正在执行的任务（用于超时和关闭）
+    ProcessPoolExecutor 没有中断单个任务的接口，只能结束其工作进程；
+    子进程中未提交的事务随连接断开由数据库回滚
+    """
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+class AsyncScheduler:
+    """
+    在事件循环中运行的调度器：每个任务一个 asyncio 任务，休眠到下一个周期（加随机抖动）后执行
+
+    - 加锁、检查运行状态等数据库操作和 thread 方式的任务在有界线程池中执行，不占用事件循环
+    - process 方式的任务交给 spawn 启动的进程池，数据生成不与API争用 GIL
+    - 同一任务在本进程中不会重叠执行，跨进程由 leader_lock 保证
+    - 超时的 process 任务会被结束；thread 任务无法强制中断，超时后记录错误日志并等待其结束
+    - stop() 取消所有调度任务并结束进程池，被中断的周期在下次启动后重新执行
+    """
+
+    def __init__(self, jobs: Optional[Sequence[ScheduledJob]] = None):
+        self.jobs = list(scheduled_jobs if jobs is None else jobs)
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Future] = {}
+        self._thread_pool = ThreadPoolExecutor(
+            max_workers=settings.scheduler_thread_workers, thread_name_prefix="scheduler"
+        )
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_lock = threading.Lock()
+        self._stopping = False
+
+    # ---------- 执行 ----------
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        with self._process_lock:
+            if self._stopping:
+                raise JobInterrupted()
+            if self._process_pool is None:
+                # 使用 spawn 启动子进程，避免 fork 继承父进程的连接池和线程锁
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=settings.scheduler_process_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._process_pool
+
+    def _reset_process_pool(self) -> None:
+        with self._process_lock:
+            pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            _terminate_process_pool(pool)
+
+    def _execute(self, job: ScheduledJob) -> Any:
+        """在调度线程中执行任务本身（由 run_job_if_due 在取得锁后调用）"""
+        if job.executor == EXECUTOR_PROCESS:
+            future = self._get_process_pool().submit(job.func)
+            try:
+                result = future.result(timeout=job.timeout or None)
+            except FutureTimeoutError:
+                self._reset_process_pool()
+                raise TimeoutError(f"Job {job.name} timed out after {job.timeout}s")
+            except BrokenProcessPool:
+                self._reset_process_pool()
+                if self._stopping:
+                    raise JobInterrupted()
+                raise
+        else:
+            result = job.func()
+        if job.on_result is not None:
+            job.on_result(result)
+        return result
+
+    async def _run(self, job: ScheduledJob) -> None:
+        if job.name in self._running:
+            logger.warning(f"Scheduled job {job.name} is still running, skipping")
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._thread_pool, run_job_if_due, job, self._execute)
+        self._running[job.name] = future
+        try:
+            if job.executor == EXECUTOR_THREAD and job.timeout:
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), job.timeout)
+                except asyncio.TimeoutError:
+                    logger.error(f"Scheduled job {job.name} exceeded its {job.timeout}s timeout, still waiting")
+            await asyncio.shield(future)
+        except Exception as e:
+            logger.error(f"Error running scheduled job {job.name}: {e}")
+        finally:
+            if future.done():
+                self._running.pop(job.name, None)
+            else:
+                # 调度任务被取消时线程仍在执行，结束后再移除
+                future.add_done_callback(lambda _: self._running.pop(job.name, None))
+
+    async def _job_loop(self, job: ScheduledJob) -> None:
+        """启动时先补执行错过的周期，之后每次休眠到下一个周期（最长 scheduler_poll_seconds 秒后重新检查）"""
+        while True:
+            await self._run(job)
+            now = utcnow()
+            next_slot = job.next_slot(now)
+            wait = (next_slot - now).total_seconds()
+            if wait > settings.scheduler_poll_seconds:
+                # 定期重新检查，执行任务的进程崩溃后由其他进程接手当前周期
+                wait = settings.scheduler_poll_seconds
+            elif job.jitter:
+                wait += random.uniform(0, job.jitter)
+            await asyncio.sleep(max(1.0, wait))
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        for job in self.jobs:
+            self._tasks.append(asyncio.create_task(self._job_loop(job), name=f"scheduler:{job.name}"))
+        logger.info(
+            "Scheduler started: " + ", ".join(f"{job.name} ({job.schedule}, {job.executor})" for job in self.jobs)
+        )
+
+    def run_once(self, name: str, func: Callable[[], Any]) -> None:
+        """在线程池中执行一次性任务（所有进程中互斥，如启动时的数据修复）"""
+        async def run():
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._thread_pool, run_exclusive, name, func)
+            except Exception as e:
+                logger.error(f"Error running {name}: {e}")
+        self._tasks.append(asyncio.create_task(run(), name=f"scheduler:{name}"))
+
+    async def stop(self) -> None:
+        """取消调度任务、结束进程池中的任务，并在 scheduler_shutdown_timeout_seconds 内等待线程中的任务结束"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._reset_process_pool()
+        pending = [future for future in self._running.values() if not future.done()]
+        if pending:
+            _, still_running = await asyncio.wait(pending, timeout=settings.scheduler_shutdown_timeout_seconds)
+            if still_running:
+                logger.warning(f"{len(still_running)} scheduled job(s) still running at shutdown")
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        logger.info("Scheduler stopped")
+
+
+def get_scheduler_states(states: Sequence[ScheduledJobState]) -> List[dict]:
+    """合并已注册的任务与数据库中的运行状态，用于导出指标"""
+    by_name = {state.name: state for state in states}
+    now = utcnow()
+    result = []
+    for job in scheduled_jobs:
+        state = by_name.get(job.name)
+        result.append({
+            "name": job.name,
+            "schedule": str(job.schedule),
+            "executor": job.executor,
+            "next_slot": job.next_slot(now),
+            "last_slot": _as_utc(state.last_slot) if state else None,
+            "last_started_at": _as_utc(state.last_started_at) if state else None,
+            "last_finished_at": _as_utc(state.last_finished_at) if state else None,
+            "last_duration_seconds": state.last_duration_seconds if state else None,
+            "last_lag_seconds": state.last_lag_seconds if state else None,
+            "last_missed_slots": state.last_missed_slots if state else 0,
+            "last_error": state.last_error if state else None,
+            "last_runner": state.last_runner if state else None,
+            "run_count": state.run_count if state else 0,
+            "failure_count": state.failure_count if state else 0,
+        })
+    return result
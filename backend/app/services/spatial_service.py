@@ -0,0 +1,251 @@
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from shapely import STRtree
+from shapely.geometry import Point, Polygon, box
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models import CarbonZone
+
+logger = logging.getLogger(__name__)
+
+# 赤道上1度经线/纬线对应的长度（米）
+METERS_PER_DEGREE = 111319.5
+
+# 会话中记录本次事务是否修改了区域的几何形状，提交后使内存索引失效
+CHANGED_GEOMETRY_KEY = "spatial_index_changed"
+
+# 经纬度范围 (west, south, east, north)
+BoundingBox = Tuple[float, float, float, float]
+
+
+# ==================== 几何计算 ====================
+
+def zone_polygon(coordinates: Sequence) -> Polygon:
+    """
+    由坐标点（{"lat", "lng"} 字典或带 lat/lng 属性的对象）构建多边形（x=经度，y=纬度）
+    坐标不足或多边形自相交时抛出 ValueError
+    """
+    points = [
+        (point["lng"], point["lat"]) if isinstance(point, dict) else (point.lng, point.lat)
+        for point in coordinates
+    ]
+    polygon = Polygon(points)
+    if len(points) < 3 or polygon.is_empty or not polygon.is_valid or polygon.area == 0:
+        raise ValueError("Invalid polygon")
+    return polygon
+
+
+def polygon_area_m2(polygon: Polygon) -> float:
+    """
+    多边形面积（平方米）：按质心纬度对经度方向做余弦修正的局部等面积近似，
+    监测区范围较小（公里级）时误差可以忽略
+    """
+    scale = math.cos(math.radians(polygon.centroid.y))
+    return polygon.area * METERS_PER_DEGREE * METERS_PER_DEGREE * scale
+
+
+def _zone_polygon_or_none(coordinates: str) -> Optional[Polygon]:
+    try:
+        return zone_polygon(json.loads(coordinates))
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+# ==================== PostGIS ====================
+
+_postgis_available: Optional[bool] = None
+
+
+def postgis_available(db: Session) -> bool:
+    """carbon_zones 表是否有迁移创建的 PostGIS 几何列（每个进程只检查一次）"""
+    global _postgis_available
+    if _postgis_available is None:
+        bind = db.get_bind()
+        if bind.dialect.name != "postgresql":
+            _postgis_available = False
+        else:
+            _postgis_available = db.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'carbon_zones' AND column_name = 'geom')"
+            )).scalar()
+            logger.info(f"PostGIS geometry column {'found' if _postgis_available else 'not found'}, "
+                        f"using {'PostGIS' if _postgis_available else 'in-memory STRtree'} for spatial queries")
+    return _postgis_available
+
+
+def _postgis_zone_ids(db: Session, user_id: int, condition: str, params: dict) -> List[int]:
+    # geom 列由迁移创建的触发器根据 coordinates 维护，ORM 模型中不声明
+    return list(db.execute(
+        text(f"SELECT id FROM carbon_zones WHERE user_id = :user_id AND {condition} ORDER BY id"),
+        {"user_id": user_id, **params}
+    ).scalars())
+
+
+# ==================== 进程内索引 ====================
+
+class ZoneSpatialIndex:
+    """
+    全部区域多边形的 STRtree 索引（没有 PostGIS 时用于地图的范围/点查询，重叠检查不使用）
+
+    本进程提交的区域增删改使索引立即失效，下次查询时重建；
+    其他进程的修改最迟在 ttl 秒后生效
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._tree: Optional[STRtree] = None
+        self._zone_ids: List[int] = []
+        self._owner_ids: List[int] = []
+        self._polygons: List[Polygon] = []
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        self._built_at = 0.0
+
+    def _ensure_built(self, db: Session) -> None:
+        if self._tree is not None and time.monotonic() - self._built_at < self.ttl:
+            return
+        rows = db.execute(select(CarbonZone.id, CarbonZone.user_id, CarbonZone.coordinates)).all()
+        zone_ids, owner_ids, polygons = [], [], []
+        for zone_id, user_id, coordinates in rows:
+            polygon = _zone_polygon_or_none(coordinates)
+            if polygon is not None:
+                zone_ids.append(zone_id)
+                owner_ids.append(user_id)
+                polygons.append(polygon)
+        with self._lock:
+            self._tree = STRtree(polygons)
+            self._zone_ids, self._owner_ids, self._polygons = zone_ids, owner_ids, polygons
+            self._built_at = time.monotonic()
+
+    def query(self, db: Session, user_id: int, geometry, predicate: str) -> List[Tuple[int, Polygon]]:
+        """返回用户区域中满足 predicate(geometry, 区域多边形) 的 (区域ID, 多边形)，按ID排序"""
+        self._ensure_built(db)
+        with self._lock:
+            tree, zone_ids, owner_ids, polygons = self._tree, self._zone_ids, self._owner_ids, self._polygons
+        matches = [
+            (zone_ids[i], polygons[i])
+            for i in tree.query(geometry, predicate=predicate)
+            if owner_ids[i] == user_id
+        ]
+        return sorted(matches, key=lambda match: match[0])
+
+
+zone_index = ZoneSpatialIndex(settings.spatial_index_ttl_seconds)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_zone_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, CarbonZone):
+            session.info[CHANGED_GEOMETRY_KEY] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_zone_index(session):
+    if session.info.pop(CHANGED_GEOMETRY_KEY, False):
+        zone_index.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_zone_changes(session):
+    session.info.pop(CHANGED_GEOMETRY_KEY, None)
+
+
+# ==================== 查询 ====================
+
+def zones_in_bbox(db: Session, user_id: int, bbox: BoundingBox) -> List[int]:
+    """与经纬度范围相交的用户区域ID（地图按视野加载）"""
+    west, south, east, north = bbox
+    if postgis_available(db):
+        return _postgis_zone_ids(
+            db, user_id,
+            "geom && ST_MakeEnvelope(:west, :south, :east, :north, 4326) "
+            "AND ST_Intersects(geom, ST_MakeEnvelope(:west, :south, :east, :north, 4326))",
+            {"west": west, "south": south, "east": east, "north": north}
+        )
+    return [zone_id for zone_id, _ in zone_index.query(db, user_id, box(west, south, east, north), "intersects")]
+
+
+def zones_at_point(db: Session, user_id: int, lat: float, lng: float) -> List[int]:
+    """包含该点（含边界）的用户区域ID"""
+    if postgis_available(db):
+        return _postgis_zone_ids(
+            db, user_id,
+            "ST_Covers(geom, ST_SetSRID(ST_MakePoint(:lng, :lat), 4326))",
+            {"lat": lat, "lng": lng}
+        )
+    return [zone_id for zone_id, _ in zone_index.query(db, user_id, Point(lng, lat), "intersects")]
+
+
+# ==================== 重叠检查 ====================
+
+# 非 PostgreSQL 数据库（SQLite，仅单进程开发环境）上按用户的进程内锁
+_user_zone_locks: Dict[int, threading.Lock] = {}
+_user_zone_locks_guard = threading.Lock()
+
+
+def _user_zones_lock_key(user_id: int) -> int:
+    """用户ID映射为 PostgreSQL advisory lock 使用的 64 位有符号整数"""
+    digest = hashlib.sha1(f"carboncount:zones:{user_id}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+@contextmanager
+def user_zones_lock(db: Session, user_id: int) -> Iterator[None]:
+    """
+    串行化同一用户的区域创建/修改：重叠检查和写入须在此上下文中完成并提交
+
+    PostgreSQL 上在当前事务中取得事务级 advisory lock（pg_advisory_xact_lock），提交或回滚时释放，
+    多个 worker 并发创建的区域不会都通过重叠检查；其他数据库只在进程内按用户互斥
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _user_zones_lock_key(user_id)})
+        yield
+        return
+
+    with _user_zone_locks_guard:
+        lock = _user_zone_locks.setdefault(user_id, threading.Lock())
+    with lock:
+        yield
+
+
+def overlapping_zones(
+    db: Session,
+    user_id: int,
+    polygon: Polygon,
+    exclude_ids: Iterable[int] = ()
+) -> List[int]:
+    """
+    与多边形内部重叠（仅边界相接不算）的用户区域ID
+    直接查询数据库中该用户当前的区域（不使用可能过期的进程内索引），应在 user_zones_lock 中调用
+    """
+    exclude_ids = set(exclude_ids)
+    if postgis_available(db):
+        zone_ids = _postgis_zone_ids(
+            db, user_id,
+            "ST_Intersects(geom, ST_GeomFromText(:wkt, 4326)) "
+            "AND NOT ST_Touches(geom, ST_GeomFromText(:wkt, 4326))",
+            {"wkt": polygon.wkt}
+        )
+    else:
+        rows = db.execute(
+            select(CarbonZone.id, CarbonZone.coordinates)
+            .where(CarbonZone.user_id == user_id)
+            .order_by(CarbonZone.id)
+        ).all()
+        zone_ids = []
+        for zone_id, coordinates in rows:
+            candidate = _zone_polygon_or_none(coordinates)
+            if candidate is not None and polygon.intersects(candidate) and not polygon.touches(candidate):
+                zone_ids.append(zone_id)
+    return [zone_id for zone_id in zone_ids if zone_id not in exclude_ids]
@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import FrozenSet
+
+# 常用别名
+CRON_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+# 查找下一个/上一个触发时间时最多跨越的年数（如 2 月 30 日这类永远不会触发的表达式）
+_SEARCH_YEARS = 5
+
+_MINUTE = timedelta(minutes=1)
+
+
+def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    """解析 cron 的一个字段，支持 *、数字、a-b 范围、/n 步长和逗号分隔的列表"""
+    values = set()
+    for part in field.split(","):
+        part, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step <= 0:
+            raise ValueError(f"Invalid step in cron field: {field}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step_text else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field out of range [{low}, {high}]: {field}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronSpec:
+    """
+    五段式 cron 表达式（分 时 日 月 周，周日为0或7），按传入时间的时区计算
+    日和周都不是 * 时，满足其一即触发（与 cron 一致）
+    """
+    expression: str
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]
+    any_day: bool
+    any_weekday: bool
+
+    @classmethod
+    def parse(cls, expression: str) -> "CronSpec":
+        fields = CRON_ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression}")
+        minute, hour, day, month, weekday = fields
+        weekdays = {value % 7 for value in _parse_field(weekday, 0, 7)}
+        return cls(
+            expression=expression,
+            minutes=_parse_field(minute, 0, 59),
+            hours=_parse_field(hour, 0, 23),
+            days=_parse_field(day, 1, 31),
+            months=_parse_field(month, 1, 12),
+            weekdays=frozenset(weekdays),
+            any_day=day == "*",
+            any_weekday=weekday == "*",
+        )
+
+    def _day_matches(self, value: datetime) -> bool:
+        day_ok = value.day in self.days
+        weekday_ok = (value.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, value: datetime) -> datetime:
+        """返回严格晚于 value 的下一个触发时间"""
+        current = value.replace(second=0, microsecond=0) + _MINUTE
+        limit = value.year + _SEARCH_YEARS
+        while current.year <= limit:
+            if current.month not in self.months:
+                month_start = current.replace(day=1, hour=0, minute=0)
+                current = (month_start + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(current):
+                current = current.replace(hour=0, minute=0) + timedelta(days=1)
+            elif current.hour not in self.hours:
+                current = current.replace(minute=0) + timedelta(hours=1)
+            elif current.minute not in self.minutes:
+                current += _MINUTE
+            else:
+                return current
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+    def previous(self, value: datetime) -> datetime:
+        """返回不晚于 value 的最近一个触发时间"""
+        current = value.replace(second=0, microsecond=0)
+        limit = value.year - _SEARCH_YEARS
+        while current.year >= limit:
+            if current.month not in self.months:
+                current = current.replace(day=1, hour=0, minute=0) - _MINUTE
+            elif not self._day_matches(current):
+                current = current.replace(hour=0, minute=0) - _MINUTE
+            elif current.hour not in self.hours:
+                current = current.replace(minute=0) - _MINUTE
+            elif current.minute not in self.minutes:
+                current -= _MINUTE
+            else:
+                return current
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+    def __str__(self) -> str:
+        return self.expression
@@ -0,0 +1,51 @@
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    LTTB（Largest-Triangle-Three-Buckets）降采样，返回保留点的下标
+
+    首尾两点固定保留；其余点均分为 threshold-2 个桶，每个桶中选出与
+    “上一个已选点”和“下一个桶的平均点”构成三角形面积最大的点，
+    从而在点数大幅减少时仍保留曲线的峰谷形状。
+
+    Args:
+        x: 横坐标（单调递增，如时间戳秒数）
+        y: 纵坐标
+        threshold: 目标点数
+
+    Returns:
+        递增排列的下标数组
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # 中间 n-2 个点划分为 threshold-2 个桶的边界
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # 下一个桶的平均点（最后一个桶使用终点）
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous]) -
+            (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+
+    return selected
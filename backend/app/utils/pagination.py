@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional, Sequence
+from sqlalchemy import and_, or_
+
+# 下一页游标通过响应头返回，列表接口的响应体保持为数组，兼容旧客户端
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any, expected: type):
+    """按期望类型解码一个排序键，类型不符时抛出 ValueError；时间统一转换为带时区的UTC时间"""
+    if expected is datetime:
+        if not (isinstance(value, dict) and set(value) == {"dt"} and isinstance(value["dt"], str)):
+            raise ValueError("Invalid cursor")
+        parsed = datetime.fromisoformat(value["dt"])
+        if parsed.tzinfo is None:
+            return parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc)
+    if not isinstance(value, expected):
+        raise ValueError("Invalid cursor")
+    # bool 是 int 的子类需要排除；超出 64 位整数范围的ID在数据库中会溢出
+    if expected is int and (isinstance(value, bool) or not -2 ** 63 <= value < 2 ** 63):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """将排序键编码为不透明的游标字符串"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """
+    解码游标，返回排序键列表，types 为各位置排序键的类型（如 (datetime, int)）
+    游标格式错误、键数量或任一位置的类型不符时抛出 ValueError
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    return [_decode_value(value, expected) for value, expected in zip(values, types)]
+
+
+def keyset_condition(columns: Sequence, values: Sequence[Any], descending: bool = True):
+    """
+    生成“位于游标之后”的过滤条件，columns 为排序列（最后一列须唯一，如主键）
+
+    以 (timestamp, id) 倒序为例生成：
+        timestamp <= :t AND (timestamp < :t OR id < :id)
+    首列的范围条件可直接使用索引，翻到第几页代价都相同。
+    """
+    def after(column, value):
+        return column < value if descending else column > value
+
+    def at_or_after(column, value):
+        return column <= value if descending else column >= value
+
+    if len(columns) == 1:
+        return after(columns[0], values[0])
+
+    ties = [after(columns[-1], values[-1])]
+    for index in range(len(columns) - 2, -1, -1):
+        ties = [or_(after(columns[index], values[index]), and_(columns[index] == values[index], *ties))]
+    return and_(at_or_after(columns[0], values[0]), *ties)
+
+
+def next_cursor(items: Sequence, limit: int, key: Callable[[Any], Sequence[Any]]) -> Optional[str]:
+    """本页已满时返回指向最后一条记录之后的游标，否则返回None（没有下一页）"""
+    if limit <= 0 or len(items) < limit:
+        return None
+    return encode_cursor(key(items[-1]))
@@ -9,8 +9,9 @@ export const measurementsAPI = {
     return response.data
   },
 
-  getZoneChartData: async (zoneId) => {
-    const response = await axios.get(`${API_BASE_URL}/measurements/zone/${zoneId}/chart`)
+  // params 可选：{ start, end, bucket: 'hour' | 'day' | 'week' | 'month' | 'auto', points, lttb }
+  getZoneChartData: async (zoneId, params = {}) => {
+    const response = await axios.get(`${API_BASE_URL}/measurements/zone/${zoneId}/chart`, { params })
     return response.data
   },
 
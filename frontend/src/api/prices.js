@@ -5,8 +5,8 @@ const API_BASE_URL = '/api'
 
 export const pricesAPI = {
   getCurrentPrice: async () => {
+    // 服务端返回 ETag，浏览器带 If-None-Match 重新验证，价格未变时返回 304
     const response = await axios.get(`${API_BASE_URL}/prices/current`, {
-      params: { _t: Date.now() }, // 添加时间戳防止缓存
       headers: { 'Cache-Control': 'no-cache' }
     })
     return response.data
@@ -9,6 +9,25 @@ export const zonesAPI = {
     return response.data
   },
 
+  // 获取与地图视野相交的监测区（bounds 为 Leaflet 的 LatLngBounds）
+  getZonesInBounds: async (bounds) => {
+    const response = await axios.get(`${API_BASE_URL}/zones/bbox`, {
+      params: {
+        west: Math.max(-180, bounds.getWest()),
+        south: Math.max(-90, bounds.getSouth()),
+        east: Math.min(180, bounds.getEast()),
+        north: Math.min(90, bounds.getNorth())
+      }
+    })
+    return response.data
+  },
+
+  // 获取包含某个点的监测区
+  getZonesAtPoint: async (lat, lng) => {
+    const response = await axios.get(`${API_BASE_URL}/zones/at`, { params: { lat, lng } })
+    return response.data
+  },
+
   createZone: async (zoneData) => {
     const response = await axios.post(`${API_BASE_URL}/zones/`, zoneData)
     return response.data